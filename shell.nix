@@ -13,6 +13,7 @@ pkgs.mkShell {
         venvShellHook
         debugpy
         pytest
+        brotli # optional, for --precompress br
       ]
     ))
   ];
@@ -0,0 +1,415 @@
+"""Benchmarks for the site generator, end to end and of its hot paths.
+
+Each benchmark prints one line per case and records its metrics, all of
+which are lower-is-better (seconds or bytes). Run them all from the
+repository root with ./bench.sh, or pick some by name:
+
+python3 src/benchmarks.py inline_links site --json bench.json
+
+Metrics can be saved with --json and compared against an earlier run with
+--baseline; any metric slower than the baseline by more than --threshold
+is reported as a regression and the exit status is non-zero.
+"""
+
+from argparse import ArgumentParser
+from contextlib import redirect_stdout
+import json
+import re
+import tempfile
+import timeit
+import tracemalloc
+from os import devnull, makedirs, path
+from time import perf_counter
+
+from corpus import generate_corpus
+from generate_files import generate_pages_recursive
+from htmlnode import HTMLNode, LeafNode, ParentNode
+from markdown_blocks import BlockType, block_to_block_type, markdown_to_html_node
+from markdown_manipulation import (
+    markdown_to_textnodes,
+    split_nodes_delimiter,
+    split_nodes_image,
+    split_nodes_link,
+)
+from textnode import TextNode, TextType
+
+
+def measure(fn, repeat: int = 5) -> float:
+    """Returns the best time, in seconds, of a single call to fn."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def split_pipeline(text: str) -> list[TextNode]:
+    """The original five-pass inline parser, kept as a baseline to compare to."""
+    nodes = [TextNode(text, TextType.TEXT, None)]
+    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+    nodes = split_nodes_image(nodes)
+    nodes = split_nodes_link(nodes)
+    return nodes
+
+
+def link_paragraph(links: int, bold_every: int = 0) -> str:
+    """Returns a paragraph with the given number of links.
+
+    Args:
+        links: Number of links in the paragraph.
+        bold_every: If set, adds bold text and an image after every this many
+                    links, which breaks the paragraph into shorter text runs.
+    """
+    parts: list[str] = []
+    for i in range(links):
+        parts.append(f"see [link {i}](/blog/post-{i})")
+        if bold_every and i % bold_every == 0:
+            parts.append(f"**bold {i}** and ![image {i}](/images/{i}.png)")
+    return " ".join(parts)
+
+
+def bench_inline_links(results: dict[str, float]) -> None:
+    """Inline parsing throughput on paragraphs with hundreds of links."""
+    for shape, bold_every in (("links", 0), ("mixed", 10)):
+        for links in (10, 100, 1000, 5000):
+            text = link_paragraph(links, bold_every)
+            mb = len(text) / 1_000_000
+            pipeline = measure(lambda: split_pipeline(text))
+            single_pass = measure(lambda: markdown_to_textnodes(text))
+            print(
+                f"inline_links[{shape}, {links}]: "
+                f"split pipeline {pipeline * 1e6:,.0f} us ({mb / pipeline:.1f} MB/s), "
+                f"single pass {single_pass * 1e6:,.0f} us "
+                f"({mb / single_pass:.1f} MB/s), "
+                f"{pipeline / single_pass:.1f}x"
+            )
+            results[f"inline_links[{shape},{links}].seconds"] = single_pass
+
+
+def sample_document(size: int) -> str:
+    """Returns a Markdown document of roughly size characters.
+
+    Mixes headings, paragraphs with inline markup and links, lists, quotes
+    and code blocks, so every node type is represented.
+    """
+    sections: list[str] = []
+    length: int = 0
+    i: int = 0
+    while length < size:
+        section = (
+            f"## Section {i}\n\n"
+            f"Some **bold** and _italic_ text with `code` and a "
+            f"[link {i}](/blog/post-{i}) in a paragraph.\n\n"
+            f"- first item\n- second [item](/items/{i})\n- third item\n\n"
+            f"1. one\n2. two\n3. three\n\n"
+            f"> a quote about section {i}\n\n"
+            f"```\nprint({i})\n```\n\n"
+        )
+        sections.append(section)
+        length += len(section)
+        i += 1
+    return "# Sample document\n\n" + "".join(sections)
+
+
+class _DictHTMLNode:
+    """HTMLNode as it was before __slots__, its attributes in a __dict__.
+
+    Standalone rather than a subclass, which would still inherit the slots.
+    Only the constructor is kept, as node_memory() only builds trees.
+    """
+
+    def __init__(
+        self,
+        tag: str | None = None,
+        value: str | None = None,
+        children: list["_DictHTMLNode"] | None = None,
+        props: dict[str, str] | None = None,
+    ) -> None:
+        self.tag: str | None = tag
+        self.value: str | None = value
+        self.children: list["_DictHTMLNode"] | None = children
+        self.props: dict[str, str] | None = props
+
+
+class _DictLeafNode(_DictHTMLNode):
+    """LeafNode as it was before __slots__, see _DictHTMLNode."""
+
+    def __init__(
+        self, tag: str | None, value: str, props: dict[str, str] | None = None
+    ) -> None:
+        super().__init__(tag=tag, value=value, props=props)
+
+
+class _DictParentNode(_DictHTMLNode):
+    """ParentNode as it was before __slots__, see _DictHTMLNode."""
+
+    def __init__(
+        self,
+        tag: str,
+        children: list[_DictHTMLNode],
+        props: dict[str, str] | None = None,
+    ) -> None:
+        super().__init__(tag=tag, value=None, children=children, props=props)
+
+
+class _DictTextNode:
+    """TextNode as it was before __slots__, see _DictHTMLNode."""
+
+    def __init__(
+        self, text: str, text_type: TextType = TextType.TEXT, url: str | None = None
+    ) -> None:
+        self.text: str = text
+        self.text_type: TextType = text_type
+        self.url: str | None = url
+
+
+def _copy_tree(node: HTMLNode, leaf_cls: type, parent_cls: type) -> object:
+    if isinstance(node, ParentNode):
+        children = [_copy_tree(c, leaf_cls, parent_cls) for c in node.children or []]
+        return parent_cls(node.tag, children, node.props)
+    return leaf_cls(node.tag, node.value, node.props)
+
+
+def _count_nodes(node: HTMLNode) -> int:
+    return 1 + sum(_count_nodes(child) for child in node.children or [])
+
+
+def traced_bytes(fn) -> tuple[int, object]:
+    """Returns the bytes still allocated after calling fn, and its result."""
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        result = fn()
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return after - before, result
+
+
+def node_memory(markdown: str) -> dict[str, float]:
+    """Measures the bytes per node of the trees built for markdown.
+
+    The same trees are rebuilt with the current (slotted) node classes and
+    with dict-backed equivalents, so only the per-node overhead differs.
+
+    Returns:
+        Dictionary of bytes per node for "html_slots", "html_dict",
+        "text_slots", and "text_dict".
+    """
+    tree = markdown_to_html_node(markdown)
+    nodes = _count_nodes(tree)
+    text_nodes = markdown_to_textnodes(markdown.replace("\n", " "))
+    results: dict[str, float] = {}
+    for name, leaf_cls, parent_cls, text_cls in (
+        ("slots", LeafNode, ParentNode, TextNode),
+        ("dict", _DictLeafNode, _DictParentNode, _DictTextNode),
+    ):
+        size, _ = traced_bytes(lambda: _copy_tree(tree, leaf_cls, parent_cls))
+        results[f"html_{name}"] = size / nodes
+        size, _ = traced_bytes(
+            lambda: [text_cls(n.text, n.text_type, n.url) for n in text_nodes]
+        )
+        results[f"text_{name}"] = size / len(text_nodes)
+    return results
+
+
+def bench_node_memory(results: dict[str, float]) -> None:
+    """Bytes per HTMLNode and TextNode on a 5 MB Markdown document."""
+    sizes = node_memory(sample_document(5_000_000))
+    for kind in ("html", "text"):
+        slots, dict_backed = sizes[f"{kind}_slots"], sizes[f"{kind}_dict"]
+        print(
+            f"node_memory[{kind}]: slots {slots:.0f} bytes/node, "
+            f"dict-backed {dict_backed:.0f} bytes/node, "
+            f"{1 - slots / dict_backed:.0%} smaller"
+        )
+        results[f"node_memory[{kind}].bytes_per_node"] = slots
+
+
+def regex_block_to_block_type(markdown: str) -> BlockType:
+    """The original regex-chain block classifier, kept as a baseline."""
+    if re.match(r"^#{1,6}\s.+", markdown):
+        return BlockType.HEADING
+    if re.match(r"^```[\s\S]*?```$", markdown):
+        return BlockType.CODE
+    if re.match(r"^>([^\n]*\n>?)*", markdown):
+        return BlockType.QUOTE
+    if re.match(r"^- (?:[^\n]*(?:\n- [^\n]*)*)", markdown):
+        return BlockType.ULIST
+    if re.match(r"^1\. .*(?:\n(?:\d+)\. .*)*$", markdown):
+        return BlockType.OLIST
+    return BlockType.PARAGRAPH
+
+
+def pathological_blocks(lines: int) -> dict[str, str]:
+    """Returns long blocks that are worst cases for block classification."""
+    return {
+        "quote": "\n".join(f"> quoted line {i}" for i in range(lines)),
+        "ulist": "\n".join(f"- item {i}" for i in range(lines)),
+        "olist": "\n".join(f"{i + 1}. item {i}" for i in range(lines)),
+        "olist_broken": "\n".join(f"{i + 1}. item" for i in range(lines)) + "\nx",
+        "code_unclosed": "```\n" + "\n".join(f"x = {i}" for i in range(lines)),
+        "paragraph": "\n".join(f"plain text line {i}" for i in range(lines)),
+    }
+
+
+def bench_block_type(results: dict[str, float]) -> None:
+    """Block classification time on pathological blocks of growing length."""
+    for lines in (1_000, 10_000, 100_000):
+        for name, block in pathological_blocks(lines).items():
+            regex_chain = measure(lambda: regex_block_to_block_type(block), 3)
+            dispatch = measure(lambda: block_to_block_type(block), 3)
+            print(
+                f"block_type[{name}, {lines} lines]: "
+                f"regex chain {regex_chain * 1e6:,.1f} us, "
+                f"first-char dispatch {dispatch * 1e6:,.1f} us"
+            )
+            results[f"block_type[{name},{lines}].seconds"] = dispatch
+
+
+def bench_hot_functions(results: dict[str, float]) -> None:
+    """Time of the per-page hot functions on a 1 MB Markdown document."""
+    markdown = sample_document(1_000_000)
+    paragraph = markdown.replace("\n", " ")
+    tree = markdown_to_html_node(markdown)
+    mb = len(markdown) / 1_000_000
+    for name, fn in (
+        ("markdown_to_html_node", lambda: markdown_to_html_node(markdown)),
+        ("markdown_to_textnodes", lambda: markdown_to_textnodes(paragraph)),
+        ("ParentNode.to_html", tree.to_html),
+    ):
+        seconds = measure(fn, 3)
+        print(f"hot[{name}]: {seconds * 1e3:,.1f} ms ({mb / seconds:.1f} MB/s)")
+        results[f"hot[{name}].seconds"] = seconds
+
+
+SITE_CORPORA = {
+    "small_posts": 2000,
+    "huge_pages": 4,
+    "link_dense": 100,
+    "list_heavy": 100,
+    "deep_dirs": 1000,
+}
+
+SITE_TEMPLATE = (
+    '<html><head><title>{{ Title }}</title><link href="/index.css" /></head>'
+    "<body><article>{{ Content }}</article></body></html>"
+)
+
+
+def bench_site(results: dict[str, float], scale: float = 1.0) -> None:
+    """End-to-end generate_pages_recursive() throughput per corpus shape.
+
+    Args:
+        results: Dictionary to record the metrics in.
+        scale: Multiplier for the number of pages in each corpus.
+    """
+    for shape, pages in SITE_CORPORA.items():
+        pages = max(1, round(pages * scale))
+        with tempfile.TemporaryDirectory() as root:
+            content_dir = path.join(root, "content")
+            template_path = path.join(root, "template.html")
+            with open(template_path, "w") as f:
+                _ = f.write(SITE_TEMPLATE)
+            mb = generate_corpus(content_dir, shape, pages) / 1_000_000
+            best = float("inf")
+            for run in range(3):
+                dest_dir = path.join(root, f"docs{run}")
+                makedirs(dest_dir)
+                # Progress lines still cost a write each, just not to the terminal.
+                with open(devnull, "w") as sink, redirect_stdout(sink):
+                    start = perf_counter()
+                    generate_pages_recursive(content_dir, template_path, dest_dir, "/")
+                    best = min(best, perf_counter() - start)
+        print(
+            f"site[{shape}, {pages} pages]: {best:,.2f} s "
+            f"({pages / best:,.0f} pages/s, {mb / best:.1f} MB/s)"
+        )
+        results[f"site[{shape}].seconds_per_page"] = best / pages
+
+
+BENCHMARKS = {
+    "inline_links": bench_inline_links,
+    "block_type": bench_block_type,
+    "node_memory": bench_node_memory,
+    "hot_functions": bench_hot_functions,
+    "site": bench_site,
+}
+
+
+def compare_results(
+    results: dict[str, float], baseline: dict[str, float], threshold: float
+) -> list[str]:
+    """Compares benchmark metrics against a baseline run.
+
+    Args:
+        results: Dictionary of metric name to value, lower is better.
+        baseline: Metrics of an earlier run. Metrics missing from either are
+                  not compared.
+        threshold: Allowed relative slowdown, e.g. 0.1 for 10%.
+
+    Returns:
+        List of descriptions of each metric that regressed past threshold.
+    """
+    regressions: list[str] = []
+    for name, value in results.items():
+        before = baseline.get(name)
+        if before is None or before <= 0:
+            continue
+        change = value / before - 1
+        if change > threshold:
+            regressions.append(f"{name}: {before:.6g} -> {value:.6g} (+{change:.0%})")
+    return regressions
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Run the site generator benchmarks.")
+    _ = parser.add_argument(
+        "names", nargs="*", metavar="NAME", help=f"one of {', '.join(BENCHMARKS)}"
+    )
+    _ = parser.add_argument("--json", metavar="PATH", help="write metrics to PATH")
+    _ = parser.add_argument(
+        "--baseline", metavar="PATH", help="compare against metrics in PATH"
+    )
+    _ = parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="relative slowdown to flag as a regression (default: 0.1)",
+    )
+    _ = parser.add_argument(
+        "--scale",
+        type=float,
+        default=1.0,
+        help="multiplier for the page counts of the site benchmark",
+    )
+    args = parser.parse_args()
+
+    names: list[str] = args.names or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            parser.error(f"Unknown benchmark: {name}")
+    results: dict[str, float] = {}
+    for name in names:
+        if name == "site":
+            bench_site(results, args.scale)
+        else:
+            BENCHMARKS[name](results)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            _ = f.write("\n")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline: dict[str, float] = json.load(f)
+        regressions = compare_results(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            raise SystemExit(1)
+        print(f"No regressions over {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Module for recording what each generated page was built from.
+
+The manifest maps every output file to the hash of its Markdown source,
+the hash of the template, and the base_path used when it was rendered.
+Incremental builds use it to skip pages whose inputs are unchanged and to
+find outputs whose sources have since been removed.
+
+Typical usage example:
+
+manifest = BuildManifest.load(".build-manifest.json")
+if manifest.is_stale(dest_path, source_hash, template_hash, base_path):
+    ...
+manifest.save()
+"""
+
+from hashlib import file_digest, sha256
+import json
+from os import makedirs, path, replace
+
+MANIFEST_PATH = ".build-manifest.json"
+MANIFEST_VERSION = 1
+
+
+def hash_bytes(data: bytes) -> str:
+    """Returns the hex SHA-256 digest of the given bytes."""
+    return sha256(data).hexdigest()
+
+
+def hash_file(file_path: str) -> str:
+    """Returns the hex SHA-256 digest of the file at the given path.
+
+    Raises:
+        FileNotFoundError: If the file doesn't exist.
+    """
+    with open(file_path, "rb") as f:
+        return file_digest(f, sha256).hexdigest()
+
+
+class BuildManifest:
+    """On-disk record of the inputs each output file was rendered from.
+
+    Attributes:
+        manifest_path: File path the manifest is loaded from and saved to.
+        entries: Dictionary keyed by output path, holding the source path,
+                 source hash, template hash, and base_path for that output.
+    """
+
+    def __init__(
+        self, manifest_path: str, entries: dict[str, dict[str, str]] | None = None
+    ) -> None:
+        """Initialises BuildManifest instance.
+
+        Args:
+            manifest_path: File path the manifest is saved to.
+            entries: Optional existing entries, keyed by output path.
+        """
+        self.manifest_path: str = manifest_path
+        self.entries: dict[str, dict[str, str]] = entries if entries else {}
+
+    @classmethod
+    def load(cls, manifest_path: str = MANIFEST_PATH) -> "BuildManifest":
+        """Loads the manifest from disk.
+
+        A missing, unreadable, or outdated manifest results in an empty one,
+        which makes every page stale and so forces a full build.
+
+        Args:
+            manifest_path: File path of the manifest JSON file.
+
+        Returns:
+            BuildManifest instance.
+        """
+        try:
+            with open(manifest_path, "r") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return cls(manifest_path)
+        if not isinstance(data, dict) or data.get("version") != MANIFEST_VERSION:
+            return cls(manifest_path)
+        return cls(manifest_path, data.get("outputs", {}))
+
+    def is_stale(
+        self, dest_path: str, source_hash: str, template_hash: str, base_path: str
+    ) -> bool:
+        """Checks whether the output needs to be re-rendered.
+
+        Args:
+            dest_path: File path of the generated HTML file.
+            source_hash: Current hash of the Markdown source.
+            template_hash: Current hash of the HTML template.
+            base_path: Current base_path for the build.
+
+        Returns:
+            True if the output is missing, unrecorded, or any input changed.
+        """
+        entry = self.entries.get(dest_path)
+        if entry is None or not path.exists(dest_path):
+            return True
+        return (
+            entry.get("source_hash") != source_hash
+            or entry.get("template_hash") != template_hash
+            or entry.get("base_path") != base_path
+        )
+
+    def record(
+        self,
+        dest_path: str,
+        source_path: str,
+        source_hash: str,
+        template_hash: str,
+        base_path: str,
+    ) -> None:
+        """Records the inputs the output at dest_path was rendered from."""
+        self.entries[dest_path] = {
+            "source": source_path,
+            "source_hash": source_hash,
+            "template_hash": template_hash,
+            "base_path": base_path,
+        }
+
+    def remove(self, dest_path: str) -> None:
+        """Forgets the output at dest_path, if it was recorded."""
+        _ = self.entries.pop(dest_path, None)
+
+    def outputs(self) -> list[str]:
+        """Returns the list of recorded output paths."""
+        return list(self.entries)
+
+    def save(self) -> None:
+        """Writes the manifest to disk.
+
+        Writes to a temporary file first, so an interrupted build never
+        leaves a half-written manifest behind.
+
+        Raises:
+            IOError: If it fails to write the manifest.
+        """
+        manifest_dir = path.dirname(self.manifest_path)
+        if manifest_dir != "":
+            makedirs(manifest_dir, exist_ok=True)
+        tmp_path = f"{self.manifest_path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(
+                    {"version": MANIFEST_VERSION, "outputs": self.entries},
+                    f,
+                    indent=1,
+                    sort_keys=True,
+                )
+            replace(tmp_path, self.manifest_path)
+        except IOError:
+            raise IOError(f"Error writing to {self.manifest_path}")
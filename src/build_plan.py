@@ -0,0 +1,140 @@
+"""Module for discovering every page of a site before any are rendered.
+
+plan_build() walks the content directory once with os.scandir(), reusing
+the type and stat information each DirEntry caches, and returns a
+BuildPlan: an immutable list of the pages to generate, with their output
+paths, the inputs they depend on and their sizes, plus every output
+directory. The build is then driven from the plan, so the output
+directories can all be created before rendering starts.
+
+Typical usage example:
+
+plan = plan_build("content", "docs", "template.html")
+print(plan.summary())
+plan.make_dirs()
+generate_pages(plan.page_paths(), "template.html", base_path)
+"""
+
+from os import makedirs, path, scandir
+import posixpath
+from typing import NamedTuple
+
+from sizes import format_size
+
+
+class PlannedPage(NamedTuple):
+    """A page the build will generate.
+
+    Attributes:
+        source: File path of the Markdown source.
+        dest: File path of the HTML page generated from it.
+        size: Size of the source, in bytes.
+        mtime_ns: Modification time of the source, in nanoseconds.
+        dependencies: File paths of the other inputs of the page, such as
+                      the template.
+    """
+
+    source: str
+    dest: str
+    size: int
+    mtime_ns: int
+    dependencies: tuple[str, ...]
+
+
+class BuildPlan(NamedTuple):
+    """Every page of a site and the directories they are generated into.
+
+    Attributes:
+        pages: Planned pages, in discovery order.
+        dest_dirs: Output directories, each listed after its parent.
+    """
+
+    pages: tuple[PlannedPage, ...]
+    dest_dirs: tuple[str, ...]
+
+    @property
+    def total_size(self) -> int:
+        """Combined size of every page's source, in bytes."""
+        return sum(page.size for page in self.pages)
+
+    def page_paths(self) -> list[tuple[str, str]]:
+        """Returns (source path, destination path) tuples of every page."""
+        return [(page.source, page.dest) for page in self.pages]
+
+    def outputs(self) -> set[str]:
+        """Returns the destination path of every page."""
+        return {page.dest for page in self.pages}
+
+    def make_dirs(self) -> None:
+        """Creates every output directory that doesn't exist yet."""
+        for dest_dir in self.dest_dirs:
+            makedirs(dest_dir, exist_ok=True)
+
+    def summary(self) -> str:
+        """Returns a line describing the plan for the build output."""
+        return (
+            f"Planned {len(self.pages)} page(s) from {format_size(self.total_size)} "
+            f"of Markdown in {len(self.dest_dirs)} director(ies)"
+        )
+
+
+def page_url(relative_path: str) -> str:
+    """Returns the root-relative URL of a page, given its path in the site.
+
+    An "index.html" is linked to by its directory, e.g. "/blog/tom/".
+    """
+    url = "/" + relative_path.replace(path.sep, "/")
+    if posixpath.basename(url) == "index.html":
+        return posixpath.dirname(url).rstrip("/") + "/"
+    return url
+
+
+def plan_build(
+    content_dir_path: str, dest_dir_path: str, template_path: str | None = None
+) -> BuildPlan:
+    """Find every Markdown file under content_dir_path and plan its page.
+
+    Pages are listed in the order generate_pages_recursive() used to find
+    them: directory order, descending into each subdirectory as it is met.
+
+    Args:
+        content_dir_path:
+            Directory path to search for Markdown files.
+        dest_dir_path:
+            Directory path the HTML files are generated into. Its structure
+            mirrors content_dir_path, with ".html" file extensions.
+        template_path:
+            Optional file path of the HTML template, recorded as a
+            dependency of every page.
+
+    Returns:
+        Immutable BuildPlan of the pages and output directories.
+
+    Raises:
+        FileNotFoundError: If content_dir_path doesn't exist.
+    """
+    dependencies: tuple[str, ...] = (template_path,) if template_path else ()
+    pages: list[PlannedPage] = []
+    dest_dirs: list[str] = []
+
+    def walk(content_dir: str, dest_dir: str) -> None:
+        dest_dirs.append(dest_dir)
+        with scandir(content_dir) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    st = entry.stat()
+                    name = entry.name.rsplit(".", 1)[0] + ".html"
+                    pages.append(
+                        PlannedPage(
+                            entry.path,
+                            path.join(dest_dir, name),
+                            st.st_size,
+                            st.st_mtime_ns,
+                            dependencies,
+                        )
+                    )
+                else:
+                    walk(entry.path, path.join(dest_dir, entry.name))
+
+    walk(content_dir_path, dest_dir_path)
+    return BuildPlan(tuple(pages), tuple(dest_dirs))
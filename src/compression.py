@@ -0,0 +1,269 @@
+"""Module for writing pre-compressed siblings of the generated files.
+
+Static file servers such as nginx (gzip_static) can send "page.html.gz" or
+"page.html.br" in place of "page.html" to clients that accept it, without
+compressing on every request. Precompressor writes those siblings as the
+site is built, in a pool of threads, or directly when called from a
+worker process that is already one of many.
+
+A sibling is given the modification time of the file it was compressed
+from, so files that didn't change since the last build are skipped with a
+stat() each. Files smaller than min_size, or that don't get smaller when
+compressed, have no siblings. A sibling missing beside a current one is
+taken to be for a format that didn't make the file smaller, so a format
+added to an existing site is only written for files as they change.
+
+Brotli support needs the optional brotli package; without it only gzip
+siblings can be written.
+
+Typical usage example:
+
+precompressor = Precompressor(("gzip", "br"), min_size=1024)
+precompressor.submit("docs/index.html")
+precompressor.wait()
+print(precompressor.summary())
+"""
+
+from concurrent.futures import Future, ThreadPoolExecutor
+import gzip
+from os import getpid, path, remove, replace, stat, utime
+from threading import Lock
+
+try:
+    import brotli
+except ImportError:  # Optional dependency
+    brotli = None
+
+# Sibling file extension of each compression format.
+FORMATS = {"gzip": ".gz", "br": ".br"}
+# Formats written when none are given, brotli only if it is installed.
+DEFAULT_FORMATS = ("gzip", "br") if brotli is not None else ("gzip",)
+DEFAULT_MIN_SIZE = 1024
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+# Images, fonts and archives are compressed already.
+COMPRESSIBLE_EXTENSIONS = frozenset(
+    (".css", ".html", ".js", ".json", ".map", ".svg", ".txt", ".xml")
+)
+
+
+def compress(data: bytes, compression_format: str) -> bytes:
+    """Returns data compressed with "gzip" or "br" at their highest level.
+
+    gzip output has no timestamp, so it is the same for the same data.
+
+    Raises:
+        ValueError: If the format is unknown, or is "br" and the brotli
+            package isn't installed.
+    """
+    if compression_format == "gzip":
+        return gzip.compress(data, GZIP_LEVEL, mtime=0)
+    if compression_format == "br":
+        if brotli is None:
+            raise ValueError("Brotli compression needs the brotli package")
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    raise ValueError(f"Unknown compression format: {compression_format}")
+
+
+def parse_formats(formats: str) -> tuple[str, ...]:
+    """Parses a comma-separated list of compression formats, e.g. "gzip,br".
+
+    Raises:
+        ValueError: If a format is unknown, or is "br" and the brotli
+            package isn't installed.
+    """
+    parsed = tuple(f.strip() for f in formats.split(",") if f.strip() != "")
+    for compression_format in parsed:
+        if compression_format not in FORMATS:
+            raise ValueError(
+                f"Unknown compression format: {compression_format}, "
+                f"expected {' or '.join(FORMATS)}"
+            )
+    if "br" in parsed and brotli is None:
+        raise ValueError("Brotli compression needs the brotli package")
+    if not parsed:
+        raise ValueError("No compression format given")
+    return parsed
+
+
+def variant_paths(file_path: str) -> list[str]:
+    """Returns the paths the compressed siblings of a file would have."""
+    return [file_path + extension for extension in FORMATS.values()]
+
+
+def is_variant(file_path: str) -> bool:
+    """Checks whether the file path is that of a compressed sibling."""
+    return file_path.endswith(tuple(FORMATS.values()))
+
+
+def remove_variants(file_path: str) -> None:
+    """Removes any compressed siblings of a file."""
+    for variant_path in variant_paths(file_path):
+        if path.exists(variant_path):
+            remove(variant_path)
+
+
+class Precompressor:
+    """Writes compressed siblings of files, in the background.
+
+    Attributes:
+        formats: Compression formats to write, "gzip" and/or "br".
+        min_size: Size in bytes below which files aren't compressed.
+        threads: Number of threads to compress with. 0 compresses each file
+                 as it is submitted, which is used in worker processes.
+        compressed: Number of files compressed.
+        skipped: Number of files skipped as unchanged, too small, or not
+                 compressible.
+    """
+
+    def __init__(
+        self,
+        formats: tuple[str, ...] = DEFAULT_FORMATS,
+        min_size: int = DEFAULT_MIN_SIZE,
+        threads: int | None = None,
+    ) -> None:
+        """Initialises Precompressor instance.
+
+        Args:
+            formats: Compression formats to write, "gzip" and/or "br".
+            min_size: Size in bytes below which files aren't compressed.
+            threads: Number of threads to compress with, None for the default
+                     of ThreadPoolExecutor, or 0 for none.
+
+        Raises:
+            ValueError: If a format is unknown, or is "br" and the brotli
+                package isn't installed.
+        """
+        self.formats: tuple[str, ...] = parse_formats(",".join(formats))
+        self.min_size: int = min_size
+        self.threads: int | None = threads
+        self.compressed: int = 0
+        self.skipped: int = 0
+        self._lock: Lock = Lock()
+        self._executor: ThreadPoolExecutor | None = None
+        self._pending: list[Future[bool]] = []
+
+    def __getstate__(self) -> dict[str, object]:
+        """Pickles the settings only, so workers compress without threads."""
+        state = self.__dict__.copy()
+        for attribute in ("_lock", "_executor", "_pending"):
+            del state[attribute]
+        state["threads"] = 0
+        return state
+
+    def __setstate__(self, state: dict[str, object]) -> None:
+        self.__dict__.update(state)
+        self._lock = Lock()
+        self._executor = None
+        self._pending = []
+
+    def compress_file(self, file_path: str) -> bool:
+        """Writes the compressed siblings of a file, unless they are current.
+
+        Siblings are written to a temporary file and renamed into place, so
+        the server never sends a partial one. Stale siblings of files that
+        are now too small, or no longer compress, are removed.
+
+        Returns:
+            True if any sibling was written, False if the file was skipped.
+
+        Raises:
+            FileNotFoundError: If the file doesn't exist.
+        """
+        st = stat(file_path)
+        variants = [(f, file_path + FORMATS[f]) for f in self.formats]
+        if (
+            st.st_size < self.min_size
+            or path.splitext(file_path)[1] not in COMPRESSIBLE_EXTENSIONS
+        ):
+            remove_variants(file_path)
+            return False
+        current = [_is_current(p, st.st_mtime_ns) for _, p in variants]
+        # None is a missing sibling, which a current one shows didn't help.
+        if True in current and False not in current:
+            return False
+        with open(file_path, "rb") as f:
+            data = f.read()
+        written: bool = False
+        for compression_format, variant_path in variants:
+            compressed = compress(data, compression_format)
+            if len(compressed) >= len(data):
+                if path.exists(variant_path):
+                    remove(variant_path)
+                continue
+            tmp_path = f"{variant_path}.{getpid()}.tmp"
+            try:
+                with open(tmp_path, "wb") as f:
+                    _ = f.write(compressed)
+                utime(tmp_path, ns=(st.st_atime_ns, st.st_mtime_ns))
+                replace(tmp_path, variant_path)
+            except BaseException:
+                if path.exists(tmp_path):
+                    remove(tmp_path)
+                raise
+            written = True
+        return written
+
+    def submit(self, file_path: str) -> None:
+        """Compresses a file in the thread pool, or now if it has no threads.
+
+        Errors of files compressed in the pool are raised by wait().
+        """
+        if self.threads == 0:
+            self._count(self.compress_file(file_path))
+            return
+        with self._lock:  # Pages may be submitted from several threads
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.threads)
+            future = self._executor.submit(self.compress_file, file_path)
+            self._pending.append(future)
+        future.add_done_callback(self._count_future)
+
+    def wait(self) -> None:
+        """Waits for every submitted file to be compressed.
+
+        Raises:
+            The first error raised while compressing a file, if any.
+        """
+        pending, self._pending = self._pending, []
+        for future in pending:
+            _ = future.result()
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def add_counts(self, compressed: int, skipped: int) -> None:
+        """Adds the counts of a pickled copy, e.g. from a worker process."""
+        with self._lock:
+            self.compressed += compressed
+            self.skipped += skipped
+
+    def summary(self) -> str:
+        """Returns a line of compression statistics for the build output."""
+        return (
+            f"Precompressed {self.compressed} file(s) as {', '.join(self.formats)}, "
+            f"skipped {self.skipped} unchanged or small"
+        )
+
+    def _count(self, written: bool) -> None:
+        with self._lock:
+            if written:
+                self.compressed += 1
+            else:
+                self.skipped += 1
+
+    def _count_future(self, future: Future[bool]) -> None:
+        if not future.cancelled() and future.exception() is None:
+            self._count(future.result())
+
+
+def _is_current(variant_path: str, mtime_ns: int) -> bool | None:
+    """Checks whether a sibling was compressed from the file as it is now.
+
+    Returns:
+        None if the sibling doesn't exist.
+    """
+    try:
+        return stat(variant_path).st_mtime_ns == mtime_ns
+    except FileNotFoundError:
+        return None
@@ -0,0 +1,137 @@
+"""Module for generating synthetic content trees to benchmark builds with.
+
+Every shape stresses a different part of the generator:
+
+- small_posts: many short blog posts with a little of every element
+- huge_pages: few pages of around a megabyte each
+- link_dense: paragraphs with hundreds of links and images
+- list_heavy: long unordered and ordered lists
+- deep_dirs: short pages nested many directories deep
+
+Generation is seeded, so the same arguments always produce the same tree.
+
+Typical usage example:
+
+python3 src/corpus.py /tmp/content --shape small_posts --pages 10000
+"""
+
+from argparse import ArgumentParser
+from collections.abc import Callable
+from os import makedirs, path
+import random
+
+WORDS = (
+    "ring hobbit wizard elf dwarf shire mountain river forest road tower "
+    "king sword song star night journey fellowship council dragon gold"
+).split()
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def _inline_paragraph(rng: random.Random, links: int) -> str:
+    parts: list[str] = []
+    for i in range(links):
+        parts.append(_sentence(rng, rng.randint(3, 12)))
+        match rng.randrange(5):
+            case 0:
+                parts.append(f"**{_sentence(rng, 2)}**")
+            case 1:
+                parts.append(f"_{_sentence(rng, 2)}_")
+            case 2:
+                parts.append(f"`{rng.choice(WORDS)}()`")
+            case 3:
+                parts.append(f"![{rng.choice(WORDS)}](/images/{i}.png)")
+        parts.append(f"[{_sentence(rng, 2)}](/blog/{rng.choice(WORDS)}-{i})")
+    return " ".join(parts)
+
+
+def _mixed_page(rng: random.Random, title: str, sections: int) -> str:
+    blocks: list[str] = [f"# {title}"]
+    for i in range(sections):
+        blocks.append(f"## {_sentence(rng, 4)}")
+        blocks.append(_inline_paragraph(rng, rng.randint(1, 4)))
+        blocks.append("\n".join(f"- {_sentence(rng, 5)}" for _ in range(3)))
+        blocks.append(f"> {_sentence(rng, 10)}")
+        blocks.append(f"```\nfor x in range({i}):\n    print(x)\n```")
+    return "\n\n".join(blocks) + "\n"
+
+
+def small_post(rng: random.Random, i: int) -> tuple[str, str]:
+    return f"blog/post-{i}/index.md", _mixed_page(rng, f"Post {i}", 2)
+
+
+def huge_page(rng: random.Random, i: int) -> tuple[str, str]:
+    return f"reference/page-{i}/index.md", _mixed_page(rng, f"Reference {i}", 2500)
+
+
+def link_dense_page(rng: random.Random, i: int) -> tuple[str, str]:
+    paragraphs = [_inline_paragraph(rng, 200) for _ in range(5)]
+    return f"links/page-{i}/index.md", "\n\n".join([f"# Links {i}"] + paragraphs)
+
+
+def list_heavy_page(rng: random.Random, i: int) -> tuple[str, str]:
+    blocks: list[str] = [f"# Lists {i}"]
+    for _ in range(5):
+        items = rng.randint(50, 200)
+        blocks.append("\n".join(f"- {_inline_paragraph(rng, 1)}" for _ in range(items)))
+        blocks.append("\n".join(f"{n + 1}. {_sentence(rng, 6)}" for n in range(items)))
+    return f"lists/page-{i}/index.md", "\n\n".join(blocks)
+
+
+def deep_dirs_page(rng: random.Random, i: int) -> tuple[str, str]:
+    dirs = "/".join(f"level-{d}-{(i >> d) % 2}" for d in range(10))
+    return f"deep/{dirs}/page-{i}/index.md", _mixed_page(rng, f"Deep {i}", 1)
+
+
+SHAPES: dict[str, Callable[[random.Random, int], tuple[str, str]]] = {
+    "small_posts": small_post,
+    "huge_pages": huge_page,
+    "link_dense": link_dense_page,
+    "list_heavy": list_heavy_page,
+    "deep_dirs": deep_dirs_page,
+}
+
+
+def generate_corpus(content_dir: str, shape: str, pages: int, seed: int = 0) -> int:
+    """Writes a synthetic content tree of Markdown pages.
+
+    Args:
+        content_dir: Directory to write the Markdown files under.
+        shape: Name of the shape of content to generate, see SHAPES.
+        pages: Number of pages to generate.
+        seed: Seed for the random content, for reproducible trees.
+
+    Returns:
+        Total number of characters written.
+
+    Raises:
+        ValueError: If shape is not one of SHAPES.
+    """
+    if shape not in SHAPES:
+        raise ValueError(f"Unknown corpus shape: {shape}")
+    rng = random.Random(f"{shape}-{seed}")
+    written: int = 0
+    for i in range(pages):
+        relative_path, markdown = SHAPES[shape](rng, i)
+        file_path = path.join(content_dir, relative_path)
+        makedirs(path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w") as f:
+            written += f.write(markdown)
+    return written
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Generate a synthetic content tree.")
+    _ = parser.add_argument("content_dir", help="directory to write pages under")
+    _ = parser.add_argument("--shape", choices=sorted(SHAPES), default="small_posts")
+    _ = parser.add_argument("--pages", type=int, default=1000)
+    _ = parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    written = generate_corpus(args.content_dir, args.shape, args.pages, args.seed)
+    print(f"Wrote {args.pages} {args.shape} pages ({written:,} characters)")
+
+
+if __name__ == "__main__":
+    main()
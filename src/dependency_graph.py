@@ -0,0 +1,350 @@
+"""Module for tracking which inputs every generated page was built from.
+
+The DependencyGraph records, for each output, the files it read: its
+Markdown source, the template, and with --fingerprint the static files its
+links and images point to, whose fingerprinted URLs it contains. Listing
+pages depend on the sources of every post they list, and on which other
+listing pages they link to. Each input is recorded with a fingerprint:
+the hash of a source, the layout digest of the template, or the
+fingerprinted URL of a static file.
+
+When a build starts, only sources whose size or modification time changed
+are hashed, and the outputs to rebuild are found through a reverse index
+from each changed input to the outputs that read it, so the work grows
+with the change rather than the site. The reason each output is rebuilt
+is kept, for --explain.
+
+The graph is saved to .dependency-graph.json between builds.
+
+Typical usage example:
+
+graph = DependencyGraph.load(".dependency-graph.json")
+reasons = graph.invalidate(plan, "template.html", template, base_path)
+...
+graph.save()
+"""
+
+from collections.abc import Iterable
+import json
+from os import makedirs, path, replace
+
+from build_manifest import hash_bytes
+from build_plan import BuildPlan
+from link_checker import LINK_URL_PATTERN
+from template import AssetMap, Template
+
+DEPENDENCY_GRAPH_PATH = ".dependency-graph.json"
+DEPENDENCY_GRAPH_VERSION = 1
+
+
+class DependencyGraph:
+    """In-memory and on-disk graph of the inputs of every output.
+
+    Inputs are file paths, except for static files, which are named by
+    their root-relative URL, e.g. "/images/tom.png".
+
+    Attributes:
+        graph_path: File path the graph is loaded from and saved to.
+        inputs: Dictionary of each source and template to its fingerprint
+                when last read.
+        static: Dictionary of the URL of each static file an output
+                depends on to its fingerprinted URL, or "" if it has none.
+        stamps: Dictionary of each source to its size and modification time
+                when it was last hashed.
+        outputs: Dictionary of each output to the inputs it was built from,
+                 its source first.
+        options: Build options every output depends on, e.g. the base_path.
+        reasons: Dictionary of each output found stale since the graph was
+                 loaded, to why it is rebuilt.
+    """
+
+    def __init__(
+        self,
+        graph_path: str,
+        inputs: dict[str, str] | None = None,
+        static: dict[str, str] | None = None,
+        stamps: dict[str, tuple[int, int]] | None = None,
+        outputs: dict[str, tuple[str, ...]] | None = None,
+        options: dict[str, str] | None = None,
+    ) -> None:
+        self.graph_path: str = graph_path
+        self.inputs: dict[str, str] = inputs if inputs else {}
+        self.static: dict[str, str] = static if static else {}
+        self.stamps: dict[str, tuple[int, int]] = stamps if stamps else {}
+        self.outputs: dict[str, tuple[str, ...]] = {}
+        self.options: dict[str, str] = options if options else {}
+        self.reasons: dict[str, str] = {}
+        self._dependents: dict[str, set[str]] = {}
+        # Inputs whose fingerprint changed in this build, see invalidate()
+        self._changed: set[str] = set()
+        self._options_changed: str | None = None
+        self._modified: bool = False
+        for output, output_inputs in (outputs if outputs else {}).items():
+            self.record(output, output_inputs)
+        self._modified = False
+
+    @classmethod
+    def load(cls, graph_path: str = DEPENDENCY_GRAPH_PATH) -> "DependencyGraph":
+        """Loads the graph from disk.
+
+        A missing, unreadable, or outdated file results in an empty graph,
+        which makes every output be rebuilt.
+        """
+        try:
+            with open(graph_path, "r") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return cls(graph_path)
+        if (
+            not isinstance(data, dict)
+            or data.get("version") != DEPENDENCY_GRAPH_VERSION
+        ):
+            return cls(graph_path)
+        try:
+            stamps = {
+                source: (size, mtime_ns)
+                for source, (size, mtime_ns) in data.get("stamps", {}).items()
+            }
+            outputs = {
+                output: tuple(output_inputs)
+                for output, output_inputs in data.get("outputs", {}).items()
+            }
+        except (TypeError, ValueError):
+            return cls(graph_path)
+        return cls(
+            graph_path,
+            data.get("inputs", {}),
+            data.get("static", {}),
+            stamps,
+            outputs,
+            data.get("options", {}),
+        )
+
+    def record(self, output: str, inputs: Iterable[str]) -> None:
+        """Records the inputs an output was built from, replacing any before."""
+        self.remove(output)
+        self.outputs[output] = tuple(inputs)
+        self._modified = True
+        for input_path in self.outputs[output]:
+            self._dependents.setdefault(input_path, set()).add(output)
+
+    def remove(self, output: str) -> None:
+        """Forgets an output, if it was recorded."""
+        recorded = self.outputs.pop(output, None)
+        if recorded is None:
+            return
+        self._modified = True
+        for input_path in recorded:
+            dependents = self._dependents[input_path]
+            dependents.discard(output)
+            if not dependents:
+                del self._dependents[input_path]
+
+    def dependents(self, input_path: str) -> set[str]:
+        """Returns the outputs built from an input."""
+        return set(self._dependents.get(input_path, ()))
+
+    def invalidate(
+        self,
+        plan: BuildPlan,
+        template_path: str,
+        template: Template,
+        base_path: str,
+    ) -> dict[str, str]:
+        """Works out which planned pages must be rebuilt, and records them.
+
+        The fingerprints of the template, the static files any output
+        depends on, and every source whose size or modification time changed
+        are brought up to date. A page is stale if the base_path or an input
+        it read changed, if it wasn't built before, or if its output is
+        missing. Stale pages are recorded as built, along with the static
+        files their source links to, and should then be generated before
+        the graph is saved.
+
+        Args:
+            plan: BuildPlan of the pages to generate.
+            template_path: File path of the HTML template.
+            template: Template compiled from it for this build.
+            base_path: Path prefix for root-relative links in the generated HTML.
+
+        Returns:
+            Dictionary of each stale page's output to why it is rebuilt.
+
+        Raises:
+            FileNotFoundError: If a source file doesn't exist.
+        """
+        options = {"base_path": base_path, "fingerprint": str(bool(template.assets))}
+        for name, value in options.items():
+            if self.options.get(name, value) != value:
+                self._options_changed = f"the {name} option changed"
+        if options != self.options:
+            self.options = options
+            self._modified = True
+        self._update(template_path, template.layout_digest)
+        for url, fingerprinted in self.static.items():
+            if template.assets.get(url, "") != fingerprinted:
+                self.static[url] = template.assets.get(url, "")
+                self._modified = True
+                self._changed.add(url)
+
+        scanned: dict[str, tuple[str, ...]] = {}
+        for page in plan.pages:
+            if self.stamps.get(page.source) != (page.size, page.mtime_ns):
+                digest, scanned[page.source] = _scan(page.source, template.assets)
+                self.stamps[page.source] = (page.size, page.mtime_ns)
+                self._modified = True
+                self._update(page.source, digest)
+        planned = {page.source for page in plan.pages}
+        for source_path in [s for s in self.stamps if s not in planned]:
+            del self.stamps[source_path]
+            self._modified = True
+            _ = self.inputs.pop(source_path, None)
+            self._changed.add(source_path)
+
+        # Outputs reading a changed input, found without visiting the rest
+        dirty: dict[str, str] = {}
+        for input_path in self._changed:
+            for output in self._dependents.get(input_path, ()):
+                _ = dirty.setdefault(output, f"{input_path} changed")
+        reasons: dict[str, str] = {}
+        for page in plan.pages:
+            recorded = self.outputs.get(page.dest)
+            reason: str | None = self._options_changed or dirty.get(page.dest)
+            if recorded is None:
+                reason = "it wasn't built before"
+            elif recorded[0] != page.source:
+                reason = f"it is now generated from {page.source}"
+            elif reason is None and not path.exists(page.dest):
+                reason = "its output is missing"
+            if reason is None:
+                continue
+            reasons[page.dest] = reason
+            if page.source not in scanned:
+                _, scanned[page.source] = _scan(page.source, template.assets)
+            for url in scanned[page.source]:
+                self.static[url] = template.assets[url]
+            self.record(page.dest, (page.source, template_path, *scanned[page.source]))
+        self.reasons.update(reasons)
+        return reasons
+
+    def invalidate_output(self, output: str, inputs: Iterable[str]) -> str | None:
+        """Checks whether an output built from the given inputs is stale.
+
+        Meant for outputs whose inputs are known without reading them, such
+        as listing pages, after invalidate() brought the fingerprints up to
+        date. A stale output is recorded as built from the given inputs.
+
+        Returns:
+            Why the output must be rebuilt, or None if it is up to date.
+        """
+        inputs = tuple(inputs)
+        recorded = self.outputs.get(output)
+        reason: str | None = self._options_changed
+        if recorded is None:
+            reason = "it wasn't built before"
+        elif recorded != inputs:
+            recorded_set, inputs_set = set(recorded), set(inputs)
+            added = [i for i in inputs if i not in recorded_set]
+            removed = [i for i in recorded if i not in inputs_set]
+            if added:
+                reason = f"{added[0]} was added"
+            elif removed:
+                reason = f"{removed[0]} was removed"
+            else:
+                reason = "its inputs were reordered"
+        elif reason is None:
+            changed = [i for i in inputs if i in self._changed]
+            if changed:
+                reason = f"{changed[0]} changed"
+            elif not path.exists(output):
+                reason = "its output is missing"
+        if reason is not None:
+            self.reasons[output] = reason
+            self.record(output, inputs)
+        return reason
+
+    def prune(self, outputs: Iterable[str]) -> list[str]:
+        """Forgets every recorded output that isn't in outputs.
+
+        Returns:
+            List of the outputs forgotten.
+        """
+        keep = set(outputs)
+        removed = [output for output in self.outputs if output not in keep]
+        for output in removed:
+            self.remove(output)
+        for input_path in [i for i in self.inputs if i not in self._dependents]:
+            del self.inputs[input_path]
+            _ = self.stamps.pop(input_path, None)
+            self._modified = True
+        for url in [u for u in self.static if u not in self._dependents]:
+            del self.static[url]
+            self._modified = True
+        return removed
+
+    def save(self) -> None:
+        """Writes the graph to disk, through a temporary file, if it changed.
+
+        Raises:
+            IOError: If it fails to write the graph.
+        """
+        if not self._modified and path.exists(self.graph_path):
+            return
+        graph_dir = path.dirname(self.graph_path)
+        if graph_dir != "":
+            makedirs(graph_dir, exist_ok=True)
+        tmp_path = f"{self.graph_path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(
+                    {
+                        "version": DEPENDENCY_GRAPH_VERSION,
+                        "options": self.options,
+                        "inputs": self.inputs,
+                        "static": self.static,
+                        "stamps": self.stamps,
+                        "outputs": self.outputs,
+                    },
+                    f,
+                    separators=(",", ":"),
+                    sort_keys=True,
+                )
+            replace(tmp_path, self.graph_path)
+        except IOError:
+            raise IOError(f"Error writing to {self.graph_path}")
+        self._modified = False
+
+    def explain(self) -> list[str]:
+        """Returns a line for every output rebuilt, saying why."""
+        return [
+            f"Rebuilt {output}: {reason}" for output, reason in self.reasons.items()
+        ]
+
+    def _update(self, input_path: str, fingerprint: str) -> None:
+        """Records an input's fingerprint, noting whether it changed."""
+        if self.inputs.get(input_path) != fingerprint:
+            if input_path in self.inputs:
+                self._changed.add(input_path)
+            self.inputs[input_path] = fingerprint
+            self._modified = True
+
+
+def _scan(source_path: str, assets: AssetMap) -> tuple[str, tuple[str, ...]]:
+    """Reads a source once, for its hash and the static files it links to.
+
+    Only links and images to fingerprinted static files make a page depend
+    on them, as those are the only ones whose URL changes with the file.
+
+    Raises:
+        FileNotFoundError: If the source file doesn't exist.
+    """
+    try:
+        with open(source_path, "rb") as f:
+            data: bytes = f.read()
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Cannot find file: {source_path}")
+    static: tuple[str, ...] = ()
+    if assets:
+        urls = LINK_URL_PATTERN.findall(data.decode("utf-8", errors="replace"))
+        static = tuple(sorted({url for url in urls if url in assets}))
+    return hash_bytes(data), static
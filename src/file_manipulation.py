@@ -1,7 +1,35 @@
-from os import chdir, getcwd, listdir, mkdir, path
-from shutil import copy, rmtree
+from concurrent.futures import ThreadPoolExecutor
+from os import (
+    chdir,
+    getcwd,
+    link,
+    listdir,
+    makedirs,
+    mkdir,
+    path,
+    remove,
+    replace,
+    rmdir,
+    scandir,
+    stat,
+    stat_result,
+    utime,
+)
+import os
+from shutil import copy, copyfile, rmtree
 import subprocess
 
+from build_manifest import hash_file
+from compression import Precompressor, is_variant
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
+
+# ioctl request to clone a file's extents, from <linux/fs.h>
+FICLONE = 0x40049409
+
 
 def get_git_root():
     return subprocess.run(
@@ -9,7 +37,9 @@ def get_git_root():
     ).stdout.strip()
 
 
-def overwrite_directory_files(source: str, destination: str) -> None:
+def overwrite_directory_files(
+    source: str, destination: str, precompressor: Precompressor | None = None
+) -> None:
     # git_root = get_git_root()
     # chdir(git_root)
     print(f"Current working directory: {getcwd()}")
@@ -18,17 +48,284 @@ def overwrite_directory_files(source: str, destination: str) -> None:
         mkdir(destination)
     else:
         mkdir(destination)
-    copy_files(source, destination)
-
-
-def copy_files(source: str, destination: str) -> None:
-    dir_items = listdir(source)
-    for item in dir_items:
-        source_path = path.join(source, item)
-        dest_path = path.join(destination, item)
-        if path.isfile(source_path):  # File
-            copy(source_path, dest_path)
-            print(f"Copying {source_path} to {dest_path}")
-        else:  # Directory
-            mkdir(dest_path)
-            copy_files(source_path, dest_path)
+    copy_files(source, destination, precompressor)
+
+
+def copy_files(
+    source: str, destination: str, precompressor: Precompressor | None = None
+) -> None:
+    with scandir(source) as entries:
+        for entry in entries:
+            dest_path = path.join(destination, entry.name)
+            if entry.is_file():  # File
+                copy(entry.path, dest_path)
+                print(f"Copying {entry.path} to {dest_path}")
+                if precompressor is not None:
+                    precompressor.submit(dest_path)
+            else:  # Directory
+                makedirs(dest_path, exist_ok=True)
+                copy_files(entry.path, dest_path, precompressor)
+
+
+def remove_empty_dirs(directory: str, stop: str) -> None:
+    """Remove directory, and its parents, while they are empty.
+
+    Stops at (and never removes) the stop directory, so that removing the
+    last file of a nested output directory doesn't leave empty folders behind.
+
+    Args:
+        directory: Directory path to start removing from.
+        stop: Directory path to stop at, typically the output root.
+    """
+    stop = path.normpath(stop)
+    directory = path.normpath(directory)
+    while directory != stop and directory.startswith(stop + path.sep):
+        if not path.isdir(directory) or listdir(directory):
+            return
+        rmdir(directory)
+        directory = path.dirname(directory)
+
+
+class SyncStats:
+    """Counts of what sync_directory() did.
+
+    Attributes:
+        copied: Number of files copied or linked because they changed.
+        skipped: Number of files left alone because they were unchanged.
+        removed: Number of files removed because their source is gone.
+    """
+
+    def __init__(self) -> None:
+        self.copied: int = 0
+        self.skipped: int = 0
+        self.removed: int = 0
+
+
+def sync_directory(
+    source: str,
+    destination: str,
+    keep: set[str] | None = None,
+    checksum: bool = False,
+    hardlink: bool = False,
+    threads: int | None = None,
+    precompressor: Precompressor | None = None,
+    rename: dict[str, str] | None = None,
+) -> SyncStats:
+    """Make destination mirror source, copying only the files that changed.
+
+    A file is unchanged when its size and modification time match the copy
+    in destination, or, with checksum, when its contents hash the same.
+    Changed files are copied across a pool of threads, each written to a
+    temporary file and renamed into place so readers never see a partial
+    file. Files in destination that are not in source are removed, unless
+    they are listed in keep.
+
+    Args:
+        source: Directory path to copy files from.
+        destination: Directory path to copy files to.
+        keep: Paths of files under destination to never remove, such as
+              the generated pages.
+        checksum: Compare file contents, rather than size and modification
+                  time, to find changed files.
+        hardlink: Hard link files instead of copying them, falling back to a
+                  copy when that isn't possible, e.g. across filesystems.
+        threads: Number of threads to copy with, or None for the default of
+                 ThreadPoolExecutor.
+        precompressor: Optional Precompressor to write compressed siblings of
+                       each file in the same pass. Siblings are kept for as
+                       long as the file they were compressed from.
+        rename: Optional dictionary of source file paths, relative to source,
+                to the path they are copied to instead, relative to
+                destination, e.g. their fingerprinted names.
+
+    Returns:
+        SyncStats of the files copied, skipped and removed.
+    """
+    stats = SyncStats()
+    source_files, source_dirs = scan_tree(source)
+    makedirs(destination, exist_ok=True)
+    dest_files, dest_dirs = scan_tree(destination)
+    kept: set[str] = {path.relpath(p, destination) for p in keep or ()}
+    # Path under destination of each source file, to the path under source.
+    targets: dict[str, str] = {
+        (rename or {}).get(relative_path, relative_path): relative_path
+        for relative_path in source_files
+    }
+
+    for relative_path in sorted(dest_files):
+        if relative_path in targets or relative_path in kept:
+            continue
+        if precompressor is not None and is_variant(relative_path):
+            original, _ = path.splitext(relative_path)
+            if original in targets or original in kept:
+                continue
+        dest_path = path.join(destination, relative_path)
+        print(f"Removing {dest_path}, it is no longer in {source}")
+        remove(dest_path)
+        remove_empty_dirs(path.dirname(dest_path), destination)
+        stats.removed += 1
+    for relative_path in sorted(source_dirs):
+        makedirs(path.join(destination, relative_path), exist_ok=True)
+
+    def sync_file(relative_path: str) -> bool:
+        dest_path = path.join(destination, relative_path)
+        if relative_path in dest_dirs and path.isdir(dest_path):
+            rmtree(dest_path)
+        source_path = targets[relative_path]
+        copied = _sync_file(
+            path.join(source, source_path),
+            dest_path,
+            source_files[source_path],
+            dest_files.get(relative_path),
+            checksum,
+            hardlink,
+        )
+        if precompressor is not None:
+            precompressor.submit(dest_path)
+        return copied
+
+    with ThreadPoolExecutor(threads) as pool:
+        for copied in pool.map(sync_file, sorted(targets)):
+            if copied:
+                stats.copied += 1
+            else:
+                stats.skipped += 1
+    print(
+        f"Synced {source} to {destination}: copied {stats.copied}, "
+        f"skipped {stats.skipped} unchanged, removed {stats.removed}"
+    )
+    return stats
+
+
+def scan_tree(root: str) -> tuple[dict[str, stat_result], set[str]]:
+    """Returns the stat of every file under root, and every directory.
+
+    Both are keyed by their path relative to root.
+    """
+    files: dict[str, stat_result] = {}
+    dirs: set[str] = set()
+    pending: list[str] = [""]
+    while pending:
+        relative_dir = pending.pop()
+        with scandir(path.join(root, relative_dir)) as entries:
+            for entry in entries:
+                relative_path = path.join(relative_dir, entry.name)
+                if entry.is_dir():
+                    dirs.add(relative_path)
+                    pending.append(relative_path)
+                else:
+                    files[relative_path] = entry.stat()
+    return files, dirs
+
+
+def sync_file(
+    source_path: str, dest_path: str, checksum: bool = False, hardlink: bool = False
+) -> bool:
+    """Copies a single file like sync_directory(), unless it is unchanged.
+
+    Returns:
+        True if the file was copied, False if it was unchanged.
+
+    Raises:
+        FileNotFoundError: If the source file doesn't exist.
+    """
+    try:
+        dest_stat: stat_result | None = stat(dest_path)
+    except FileNotFoundError:
+        dest_stat = None
+    makedirs(path.dirname(dest_path), exist_ok=True)
+    return _sync_file(
+        source_path, dest_path, stat(source_path), dest_stat, checksum, hardlink
+    )
+
+
+def _sync_file(
+    source_path: str,
+    dest_path: str,
+    source_stat: stat_result,
+    dest_stat: stat_result | None,
+    checksum: bool,
+    hardlink: bool,
+) -> bool:
+    """Copies source_path to dest_path unless it is unchanged.
+
+    Returns:
+        True if the file was copied, False if it was unchanged.
+    """
+    if dest_stat is not None and source_stat.st_size == dest_stat.st_size:
+        if (source_stat.st_ino, source_stat.st_dev) == (
+            dest_stat.st_ino,
+            dest_stat.st_dev,
+        ):
+            return False  # Already hard linked
+        if not checksum:
+            if source_stat.st_mtime_ns == dest_stat.st_mtime_ns:
+                return False
+        elif hash_file(source_path) == hash_file(dest_path):
+            if source_stat.st_mtime_ns != dest_stat.st_mtime_ns:
+                utime(dest_path, ns=(source_stat.st_atime_ns, source_stat.st_mtime_ns))
+            return False
+
+    tmp_path = dest_path + ".sync-tmp"
+    try:
+        if not (hardlink and _hardlink(source_path, tmp_path)):
+            copy_file_fast(source_path, tmp_path)
+            utime(tmp_path, ns=(source_stat.st_atime_ns, source_stat.st_mtime_ns))
+        replace(tmp_path, dest_path)
+    except BaseException:
+        if path.lexists(tmp_path):
+            remove(tmp_path)
+        raise
+    return True
+
+
+def copy_file_fast(source_path: str, dest_path: str) -> None:
+    """Copies the contents of a file, letting the kernel do the work.
+
+    Tries, in order, a reflink (a copy-on-write clone, on filesystems such
+    as Btrfs and XFS), copy_file_range(), and finally shutil.copyfile(),
+    which uses sendfile() where it can.
+
+    Args:
+        source_path: File path to copy from.
+        dest_path: File path to copy to, overwritten if it exists.
+    """
+    with open(source_path, "rb") as src, open(dest_path, "wb") as dst:
+        if _reflink(src.fileno(), dst.fileno()):
+            return
+        if _copy_file_range(src.fileno(), dst.fileno()):
+            return
+    copyfile(source_path, dest_path)
+
+
+def _hardlink(source_path: str, dest_path: str) -> bool:
+    try:
+        link(source_path, dest_path)
+    except OSError:
+        return False
+    return True
+
+
+def _reflink(src_fd: int, dst_fd: int) -> bool:
+    if fcntl is None:
+        return False
+    try:
+        _ = fcntl.ioctl(dst_fd, FICLONE, src_fd)
+    except OSError:
+        return False
+    return True
+
+
+def _copy_file_range(src_fd: int, dst_fd: int) -> bool:
+    if not hasattr(os, "copy_file_range"):
+        return False
+    remaining: int = os.fstat(src_fd).st_size
+    try:
+        while remaining > 0:
+            copied = os.copy_file_range(src_fd, dst_fd, remaining)
+            if copied == 0:
+                break
+            remaining -= copied
+    except OSError:
+        return False
+    return True
@@ -0,0 +1,166 @@
+"""Module for giving static files content-hashed names.
+
+A fingerprinted file has the start of its content hash in its name, e.g.
+"index.css" is copied as "index.3f9a1c2b.css", so a CDN can cache it for
+as long as it likes: any change to the file changes its URL. The AssetMap
+of original to fingerprinted URLs is applied to the template when it is
+compiled, and to content links and images as they are emitted.
+
+Hashes are cached by file size and modification time, so only the static
+files that changed since the last build are read.
+
+Typical usage example:
+
+fingerprints = FingerprintCache.load(".fingerprint-cache.json")
+renames = fingerprint_directory("static", fingerprints)
+fingerprints.save()
+assets = asset_map(renames)
+template = Template.load("template.html", base_path, assets=assets)
+"""
+
+import json
+from os import makedirs, path, replace, stat_result
+
+from build_manifest import hash_file
+from file_manipulation import scan_tree
+from template import AssetMap
+
+FINGERPRINT_CACHE_PATH = ".fingerprint-cache.json"
+FINGERPRINT_CACHE_VERSION = 1
+# Number of hex digits of the content hash put in each name.
+FINGERPRINT_LENGTH = 8
+# Pages are linked to by their own names, so static HTML keeps its name too.
+UNFINGERPRINTED_EXTENSIONS = frozenset((".html",))
+
+
+def fingerprinted_name(relative_path: str, file_hash: str) -> str:
+    """Returns the path with the start of the hash before its extension.
+
+    e.g. fingerprinted_name("images/tom.png", "3f9a1c2b...") returns
+    "images/tom.3f9a1c2b.png".
+    """
+    root, extension = path.splitext(relative_path)
+    return f"{root}.{file_hash[:FINGERPRINT_LENGTH]}{extension}"
+
+
+class FingerprintCache:
+    """On-disk record of the content hash of each static file.
+
+    Attributes:
+        cache_path: File path the cache is loaded from and saved to.
+        entries: Dictionary keyed by file path, holding the size,
+                 modification time and hash of the file when it was hashed.
+        hashed: Number of files hashed, because they weren't cached or had
+                changed, since the cache was loaded.
+    """
+
+    def __init__(
+        self, cache_path: str, entries: dict[str, dict[str, int | str]] | None = None
+    ) -> None:
+        self.cache_path: str = cache_path
+        self.entries: dict[str, dict[str, int | str]] = entries if entries else {}
+        self.hashed: int = 0
+
+    @classmethod
+    def load(cls, cache_path: str = FINGERPRINT_CACHE_PATH) -> "FingerprintCache":
+        """Loads the cache from disk.
+
+        A missing, unreadable, or outdated file results in an empty cache,
+        which makes every file be hashed again.
+        """
+        try:
+            with open(cache_path, "r") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return cls(cache_path)
+        if (
+            not isinstance(data, dict)
+            or data.get("version") != FINGERPRINT_CACHE_VERSION
+        ):
+            return cls(cache_path)
+        return cls(cache_path, data.get("files", {}))
+
+    def file_hash(self, file_path: str, st: stat_result) -> str:
+        """Returns the hash of a file, reading it only if it changed.
+
+        Args:
+            file_path: Path of the file.
+            st: Current stat of the file.
+        """
+        entry = self.entries.get(file_path)
+        if (
+            entry is not None
+            and entry.get("size") == st.st_size
+            and entry.get("mtime_ns") == st.st_mtime_ns
+        ):
+            return str(entry["hash"])
+        file_hash = hash_file(file_path)
+        self.hashed += 1
+        self.entries[file_path] = {
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "hash": file_hash,
+        }
+        return file_hash
+
+    def save(self) -> None:
+        """Writes the cache to disk, through a temporary file.
+
+        Raises:
+            IOError: If it fails to write the cache.
+        """
+        cache_dir = path.dirname(self.cache_path)
+        if cache_dir != "":
+            makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{self.cache_path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(
+                    {"version": FINGERPRINT_CACHE_VERSION, "files": self.entries},
+                    f,
+                    indent=1,
+                    sort_keys=True,
+                )
+            replace(tmp_path, self.cache_path)
+        except IOError:
+            raise IOError(f"Error writing to {self.cache_path}")
+
+
+def asset_map(renames: dict[str, str]) -> AssetMap:
+    """Builds the AssetMap of relative file paths, see fingerprint_directory()."""
+    return AssetMap(
+        {
+            "/" + original.replace(path.sep, "/"): "/" + renamed.replace(path.sep, "/")
+            for original, renamed in renames.items()
+        }
+    )
+
+
+def fingerprint_directory(directory: str, cache: FingerprintCache) -> dict[str, str]:
+    """Works out the fingerprinted name of every file under directory.
+
+    Files that were removed are dropped from the cache.
+
+    Args:
+        directory: Directory path of the static files.
+        cache: FingerprintCache of the file hashes.
+
+    Returns:
+        Dictionary of each file's path, relative to directory, to its
+        fingerprinted path. HTML files aren't included, as they keep their
+        names.
+    """
+    files, _ = scan_tree(directory)
+    renames: dict[str, str] = {}
+    seen: set[str] = set()
+    for relative_path, st in sorted(files.items()):
+        if path.splitext(relative_path)[1] in UNFINGERPRINTED_EXTENSIONS:
+            continue
+        file_path = path.join(directory, relative_path)
+        seen.add(file_path)
+        file_hash = cache.file_hash(file_path, st)
+        renames[relative_path] = fingerprinted_name(relative_path, file_hash)
+    for file_path in list(cache.entries):
+        if file_path not in seen and file_path.startswith(path.join(directory, "")):
+            del cache.entries[file_path]
+    return renames
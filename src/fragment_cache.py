@@ -0,0 +1,152 @@
+"""Module for caching the rendered HTML of repeated Markdown blocks.
+
+Documentation sites repeat many identical blocks, such as admonitions,
+footers and license paragraphs. FragmentCache maps a block's type, text,
+and the base_path it was rendered for to its HTML, so each distinct block
+is only parsed once per build. The least recently used fragments are
+evicted once max_entries is reached, and the cache can be saved to disk to
+be reused by the next build.
+
+The bounded, persisted LRU itself is LRUCache, which the HighlightCache of
+highlight.py shares.
+
+Typical usage example:
+
+cache = FragmentCache.load("build-fragments.json", max_entries=4096)
+node = markdown_to_html_node(markdown, base_path, cache)
+print(cache.summary())
+cache.save()
+"""
+
+from collections import OrderedDict
+import json
+from os import makedirs, path, replace
+from typing import Self
+
+FRAGMENT_CACHE_VERSION = 3
+DEFAULT_MAX_ENTRIES = 4096
+
+# (block type, base_path, block text), the type of code blocks suffixed
+# with the LEXER_VERSION they were highlighted with, e.g. "code@1"
+FragmentKey = tuple[str, str, str]
+
+
+class LRUCache:
+    """Bounded LRU cache of HTML, keyed by tuples of strings.
+
+    Subclasses set version, which is saved with the cache, and can add
+    other fields that must match for a saved cache to be loaded, see
+    header().
+
+    Attributes:
+        max_entries: Number of entries to keep before evicting the least
+                     recently used.
+        cache_path: Optional file path the cache is loaded from and saved to.
+        entries: Ordered dictionary of key to HTML, least recently used first.
+        hits: Number of lookups that found an entry.
+        misses: Number of lookups that didn't.
+    """
+
+    version: int = 1
+
+    def __init__(
+        self, max_entries: int = DEFAULT_MAX_ENTRIES, cache_path: str | None = None
+    ) -> None:
+        if max_entries < 1:
+            raise ValueError(f"{type(self).__name__} must hold at least one entry.")
+        self.max_entries: int = max_entries
+        self.cache_path: str | None = cache_path
+        self.entries: OrderedDict[tuple[str, ...], str] = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+
+    @classmethod
+    def load(cls, cache_path: str, max_entries: int = DEFAULT_MAX_ENTRIES) -> Self:
+        """Loads a cache saved by save().
+
+        A missing, unreadable, or outdated file, including one whose header()
+        doesn't match, results in an empty cache.
+
+        Args:
+            cache_path: File path of the cache JSON file.
+            max_entries: Number of entries to keep.
+
+        Returns:
+            Instance of the class load() is called on.
+        """
+        cache = cls(max_entries, cache_path)
+        try:
+            with open(cache_path, "r") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return cache
+        if not isinstance(data, dict) or any(
+            data.get(field) != value for field, value in cache.header().items()
+        ):
+            return cache
+        try:
+            for *key, html in data.get("entries", []):
+                cache.put(tuple(key), html)
+        except (TypeError, ValueError):
+            return cls(max_entries, cache_path)
+        return cache
+
+    def header(self) -> dict[str, object]:
+        """Returns the fields saved with the cache, which must all match for
+        it to be loaded again."""
+        return {"version": self.version}
+
+    def get(self, key: tuple[str, ...]) -> str | None:
+        """Returns the HTML cached for key, or None, counting a hit or miss."""
+        html = self.entries.get(key)
+        if html is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return html
+
+    def put(self, key: tuple[str, ...], html: str) -> None:
+        """Caches the HTML for key, evicting the least recently used if full."""
+        self.entries[key] = html
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            _ = self.entries.popitem(last=False)
+
+    def save(self) -> None:
+        """Writes the cache to cache_path, if set.
+
+        Writes to a temporary file first, so an interrupted build never
+        leaves a half-written cache behind.
+
+        Raises:
+            IOError: If it fails to write the cache.
+        """
+        if self.cache_path is None:
+            return
+        cache_dir = path.dirname(self.cache_path)
+        if cache_dir != "":
+            makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{self.cache_path}.tmp"
+        entries = [[*key, html] for key, html in self.entries.items()]
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump({**self.header(), "entries": entries}, f)
+            replace(tmp_path, self.cache_path)
+        except IOError:
+            raise IOError(f"Error writing to {self.cache_path}")
+
+
+class FragmentCache(LRUCache):
+    """Bounded LRU cache of rendered HTML fragments, keyed by FragmentKey."""
+
+    version: int = FRAGMENT_CACHE_VERSION
+
+    def summary(self) -> str:
+        """Returns a line of hit and miss statistics for the build output."""
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups if lookups else 0.0
+        return (
+            f"Fragment cache: {self.hits} hits, {self.misses} misses "
+            f"({rate:.0%} hit rate), {len(self.entries)} entries"
+        )
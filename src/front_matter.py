@@ -0,0 +1,245 @@
+"""Module for reading the front matter at the head of Markdown pages.
+
+Front matter is a block of metadata before the Markdown, between two
+"---" lines (YAML) or two "+++" lines (TOML):
+
+    ---
+    title: Why Tom Bombadil Was a Mistake
+    date: 2024-03-01
+    tags: [tolkien, opinion]
+    draft: false
+    slug: tom
+    ---
+    # Why Tom Bombadil Was a Mistake
+
+TOML is parsed with tomllib. YAML is parsed as the flat subset front
+matter uses: "key: value" pairs of strings, numbers, booleans, and lists
+written either inline ([a, b]) or as "- item" lines, so no YAML package is
+needed. Front matter is removed from the Markdown before it is rendered.
+
+read_page_metadata() reads a page only as far as its front matter and
+title, without reading the body.
+
+Typical usage example:
+
+front_matter, markdown = split_front_matter(md)
+title = page_title(front_matter, markdown)
+"""
+
+from collections.abc import Iterable
+from datetime import date
+import re
+import tomllib
+from typing import NamedTuple, TextIO
+
+from markdown_manipulation import (
+    extract_markdown_title,
+    extract_markdown_title_from_lines,
+)
+
+# Opening and closing line of the front matter, and the format it is in.
+DELIMITERS = {"---": "yaml", "+++": "toml"}
+# An integer, optionally signed, as YAML reads one.
+INTEGER_PATTERN = re.compile(r"[-+]?\d+")
+
+FrontMatter = dict[str, object]
+
+
+class PageMetadata(NamedTuple):
+    """The metadata of a page, from its front matter and title.
+
+    Attributes:
+        title: Title from the front matter, or else the page's H1, or "".
+        date: ISO 8601 date, e.g. "2024-03-01", or "" if it has none.
+        tags: Tags of the page, in the order given.
+        draft: Whether the page is a draft, which isn't published.
+        slug: Name replacing the page's own in its URL, or "" to keep it.
+    """
+
+    title: str
+    date: str
+    tags: tuple[str, ...]
+    draft: bool
+    slug: str
+
+
+def parse_front_matter(text: str, front_matter_format: str) -> FrontMatter:
+    """Parses the text between the front matter delimiters.
+
+    Args:
+        text: Front matter without its delimiter lines.
+        front_matter_format: "yaml" or "toml", see DELIMITERS.
+
+    Raises:
+        ValueError: If the front matter is malformed.
+    """
+    if front_matter_format == "toml":
+        try:
+            return tomllib.loads(text)
+        except tomllib.TOMLDecodeError as e:
+            raise ValueError(f"Invalid front matter: {e}")
+    data: FrontMatter = {}
+    key: str | None = None
+    for number, line in enumerate(text.splitlines(), 1):
+        stripped = line.strip()
+        if stripped == "" or stripped.startswith("#"):
+            continue
+        if stripped.startswith("- ") or stripped == "-":
+            items = data.get(key) if key is not None else None
+            if not isinstance(items, list):
+                raise ValueError(f"Invalid front matter line {number}: {line}")
+            items.append(_yaml_scalar(stripped[1:].strip()))
+            continue
+        name, separator, value = line.partition(":")
+        if separator == "" or name.strip() == "" or name[0].isspace():
+            raise ValueError(f"Invalid front matter line {number}: {line}")
+        key = name.strip()
+        value = value.strip()
+        if value == "":
+            data[key] = []  # Filled by the "- item" lines that follow
+        elif value.startswith("[") and value.endswith("]"):
+            values = value[1:-1].split(",")
+            data[key] = [_yaml_scalar(v.strip()) for v in values if v.strip() != ""]
+        else:
+            data[key] = _yaml_scalar(value)
+    return data
+
+
+def _yaml_scalar(value: str) -> object:
+    """Converts a YAML scalar to a bool, int or str."""
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1]
+    if value.lower() in ("true", "yes"):
+        return True
+    if value.lower() in ("false", "no"):
+        return False
+    if INTEGER_PATTERN.fullmatch(value):
+        return int(value)
+    return value
+
+
+def split_front_matter(markdown: str) -> tuple[FrontMatter, str]:
+    """Separates the front matter from the Markdown after it.
+
+    Returns:
+        Tuple of the parsed front matter, empty if there is none, and the
+        Markdown without it.
+
+    Raises:
+        ValueError: If the front matter is malformed or never closed.
+    """
+    first_line, newline, rest = markdown.partition("\n")
+    delimiter = first_line.rstrip()
+    front_matter_format = DELIMITERS.get(delimiter)
+    if front_matter_format is None or newline == "":
+        return {}, markdown
+    lines: list[str] = []
+    offset: int = len(first_line) + 1
+    for line in rest.splitlines(keepends=True):
+        offset += len(line)
+        if line.rstrip() == delimiter:
+            text = "".join(lines)
+            return parse_front_matter(text, front_matter_format), markdown[offset:]
+        lines.append(line)
+    raise ValueError(f"Front matter is never closed with {delimiter}")
+
+
+def read_front_matter(f: TextIO) -> tuple[FrontMatter, int]:
+    """Reads the front matter from the start of an open file.
+
+    The file is left positioned at the first line of Markdown after the
+    front matter, or at its start if it has none, so the body can then be
+    read or streamed from it.
+
+    Returns:
+        Tuple of the parsed front matter, empty if there is none, and the
+        number of lines it took up.
+
+    Raises:
+        ValueError: If the front matter is malformed or never closed.
+    """
+    first_line = f.readline()
+    delimiter = first_line.rstrip()
+    front_matter_format = DELIMITERS.get(delimiter)
+    if front_matter_format is None or not first_line.endswith("\n"):
+        _ = f.seek(0)
+        return {}, 0
+    lines: list[str] = []
+    while line := f.readline():
+        if line.rstrip() == delimiter:
+            text = "".join(lines)
+            return parse_front_matter(text, front_matter_format), len(lines) + 2
+        lines.append(line)
+    raise ValueError(f"Front matter is never closed with {delimiter}")
+
+
+def page_title(front_matter: FrontMatter, markdown: str | Iterable[str]) -> str:
+    """Returns the title from the front matter, or else the Markdown's H1.
+
+    Args:
+        front_matter: Parsed front matter of the page.
+        markdown: Markdown after the front matter, as a string or lines.
+
+    Raises:
+        ValueError: If neither has a title.
+    """
+    title = front_matter.get("title")
+    if isinstance(title, str) and title.strip() != "":
+        return title.strip()
+    if isinstance(markdown, str):
+        return extract_markdown_title(markdown)
+    return extract_markdown_title_from_lines(markdown)
+
+
+def page_metadata(front_matter: FrontMatter, title: str) -> PageMetadata:
+    """Normalises the known front matter fields of a page.
+
+    Dates may be written as TOML dates or ISO 8601 strings, and tags as a
+    list or a comma-separated string.
+
+    Raises:
+        ValueError: If the date isn't an ISO 8601 date, or the slug isn't a
+            single path segment.
+    """
+    value = front_matter.get("date", "")
+    page_date = value.isoformat() if isinstance(value, date) else str(value)
+    if page_date != "":
+        try:
+            _ = date.fromisoformat(page_date[:10])
+        except ValueError:
+            raise ValueError(f"Invalid date in front matter: {page_date}")
+    value = front_matter.get("tags", [])
+    if isinstance(value, str):
+        items = value.split(",")
+    elif isinstance(value, list):
+        items = [str(tag) for tag in value]
+    else:
+        items = [str(value)]
+    tags = tuple(tag.strip() for tag in items if tag.strip() != "")
+    slug = str(front_matter.get("slug", "")).strip()
+    if "/" in slug or "\\" in slug or slug in (".", ".."):
+        raise ValueError(f"Invalid slug in front matter: {slug}")
+    return PageMetadata(title, page_date, tags, front_matter.get("draft") is True, slug)
+
+
+def read_page_metadata(source_path: str) -> PageMetadata:
+    """Reads the metadata of a page, reading no further than its title.
+
+    A page without a title gets "" here, as it fails when generated.
+
+    Raises:
+        FileNotFoundError: If the source file doesn't exist.
+        ValueError: If the front matter is malformed.
+    """
+    try:
+        with open(source_path, "r") as f:
+            front_matter, _ = read_front_matter(f)
+            try:
+                title = page_title(front_matter, f)
+            except ValueError:
+                title = ""
+        return page_metadata(front_matter, title)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Cannot find file: {source_path}")
+    except ValueError as e:
+        raise ValueError(f"{source_path}: {e}")
@@ -1,13 +1,60 @@
-from os import chdir, listdir, makedirs, mkdir, path
+import asyncio
+from collections.abc import Iterator
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from os import chdir, cpu_count, makedirs, path, remove
 from os.path import dirname, join, splitext
 from shutil import copy
-from file_manipulation import get_git_root
-from markdown_blocks import markdown_to_html_node
-from markdown_manipulation import extract_markdown_title
+from typing import TextIO
+from build_manifest import BuildManifest, hash_file
+from build_plan import BuildPlan, plan_build
+from dependency_graph import DependencyGraph
+from compression import Precompressor, remove_variants
+from fragment_cache import FragmentCache
+from highlight import HighlightCache
+from file_manipulation import get_git_root, remove_empty_dirs
+from htmlnode import ParentNode
+from markdown_blocks import iter_markdown_html, markdown_to_html_node
+from front_matter import page_title, read_front_matter, split_front_matter
+from profiling import BuildProfiler, PageProfile
+from render_cache import RenderCache
+from template import AssetMap, Template
+
+# Markdown files at least this large are converted one block at a time.
+STREAM_THRESHOLD = 32 * 1024 * 1024
+# Default number of pages generate_pages_async() keeps between read and write.
+MAX_IN_FLIGHT = 32
+
+
+class PageGenerationError(Exception):
+    """Raised when one or more pages fail to generate.
+
+    Attributes:
+        failures: List of (source path, error message) tuples, in the order
+                  the pages were discovered.
+    """
+
+    def __init__(self, failures: list[tuple[str, str]]) -> None:
+        self.failures: list[tuple[str, str]] = failures
+        source_path, message = failures[0]
+        summary = f"Failed to generate page from {source_path}: {message}"
+        if len(failures) > 1:
+            summary += f" (and {len(failures) - 1} more)"
+        super().__init__(summary)
 
 
 def generate_page(
-    from_path: str, template_path: str, dest_path: str, base_path: str
+    from_path: str,
+    template_path: str,
+    dest_path: str,
+    base_path: str,
+    template: Template | None = None,
+    stream: bool | None = None,
+    cache: FragmentCache | None = None,
+    render_cache: RenderCache | None = None,
+    precompressor: Precompressor | None = None,
+    highlight_cache: HighlightCache | None = None,
+    profile: PageProfile | None = None,
 ) -> None:
     """Generate a page using an incoming file, template, and destination path.
 
@@ -21,6 +68,28 @@ def generate_page(
             File path to get the HTML template text from.
         dest_path:
             File path to write the HTML file to.
+        base_path:
+            Path prefix for root-relative links in the generated HTML.
+        template:
+            Optional Template already compiled for this base_path. If None,
+            the template is read and compiled from template_path.
+        stream:
+            Whether to read and convert the Markdown one block at a time,
+            bounding memory by the largest block rather than the file size.
+            If None, files of at least STREAM_THRESHOLD bytes are streamed.
+        cache:
+            Optional FragmentCache of rendered blocks, shared across pages.
+        render_cache:
+            Optional RenderCache to copy the page from, skipping parsing, if
+            it was rendered from the same inputs before, and to store the
+            page in otherwise.
+        precompressor:
+            Optional Precompressor to write compressed siblings of the page.
+        highlight_cache:
+            Optional HighlightCache of highlighted code, shared across pages.
+        profile:
+            Optional PageProfile to record the time spent in each stage in,
+            see BuildProfiler.profile_page().
 
     Returns: None.
 
@@ -30,54 +99,719 @@ def generate_page(
     """
     # chdir(get_git_root())
 
+    if template is None:
+        template = Template.load(template_path, base_path)
+    render_key: str | None = None
+    if render_cache is not None:
+        try:
+            render_key = render_cache.key(from_path, template, base_path)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Cannot find file: {from_path}")
+        if render_cache.fetch(render_key, dest_path):
+            print(f"Copying cached page for {from_path} to {dest_path}")
+            if profile is not None:
+                profile.lap("cache")
+            if precompressor is not None:
+                precompressor.submit(dest_path)
+            return
+
+    if profile is not None:
+        profile.lap("cache")
     print(f"Generating page from {from_path} to {dest_path} using {template_path}")
+    from_file: TextIO | None = None
     try:
-        from_file = open(from_path, "r")
-        md: str = from_file.read()
-        from_file.close()
+        if stream is None:
+            stream = path.getsize(from_path) >= STREAM_THRESHOLD
+        if stream:
+            with open(from_path, "r") as title_file:
+                front_matter, _ = read_front_matter(title_file)
+                title: str = page_title(front_matter, title_file)
+            from_file = open(from_path, "r")
+            _ = read_front_matter(from_file)
+            content: ParentNode | Iterator[str] = iter_markdown_html(
+                from_file, base_path, cache, template.assets, highlight_cache
+            )
+            if profile is not None:
+                profile.lap("read")
+        else:
+            with open(from_path, "r") as md_file:
+                front_matter, md = split_front_matter(md_file.read())
+            title = page_title(front_matter, md)
+            if profile is not None:
+                profile.lap("read")
+            content = markdown_to_html_node(
+                md, base_path, cache, template.assets, highlight_cache
+            )
+            if profile is not None:
+                profile.lap("render")
     except FileNotFoundError:
         raise FileNotFoundError(f"Cannot find file: {from_path}")
-    try:
-        template_file = open(template_path, "r")
-        template_html: str = template_file.read()
-        template_file.close()
-    except FileNotFoundError:
-        raise FileNotFoundError(f"Cannot find file: {template_path}")
-
-    content_html: str = markdown_to_html_node(md).to_html()
-    title: str = extract_markdown_title(md)
-    placeholders: dict[str, str] = {
-        "{{ Title }}": title,
-        "{{ Content }}": content_html,
-        'href="/': f'href="{base_path}',
-        'src="/': f'src="{base_path}',
-    }
-    html: str = template_html
-
-    for placeholder, replacement in placeholders.items():
-        html = html.replace(placeholder, replacement)
 
     dest_dir = dirname(dest_path)
     makedirs(dest_dir, exist_ok=True)
 
     try:
         with open(dest_path, "w") as f:
-            _ = f.write(html)
+            template.write(f, {"Title": title, "Content": content})
     except IOError:
         raise IOError(f"Error writing to {dest_path}")
+    except ValueError:
+        # Streamed blocks are parsed while writing, don't leave half a page.
+        remove(dest_path)
+        raise
+    finally:
+        if from_file is not None:
+            from_file.close()
+    if profile is not None:
+        profile.lap("write")
+    if render_cache is not None and render_key is not None:
+        render_cache.store(render_key, dest_path)
+        if profile is not None:
+            profile.lap("cache")
+    if precompressor is not None:
+        precompressor.submit(dest_path)
+
+
+def render_page(
+    md: str,
+    template: Template,
+    base_path: str,
+    cache: FragmentCache | None = None,
+    highlight_cache: HighlightCache | None = None,
+) -> str:
+    """Renders Markdown text into the template, as generate_page() does.
+
+    Args:
+        md: Markdown-formatted text of the page.
+        template: Template compiled for this base_path.
+        base_path: Path prefix for root-relative links in the generated HTML.
+        cache: Optional FragmentCache of rendered blocks, shared across pages.
+        highlight_cache: Optional HighlightCache of highlighted code, shared
+                         across pages.
+
+    Returns:
+        The HTML of the page.
+
+    Raises:
+        ValueError: If the Markdown has no title, or it or its front matter
+            is malformed.
+    """
+    front_matter, md = split_front_matter(md)
+    content: str = markdown_to_html_node(
+        md, base_path, cache, template.assets, highlight_cache
+    ).to_html()
+    title: str = page_title(front_matter, md)
+    return template.render({"Title": title, "Content": content})
 
 
 def generate_pages_recursive(
-    content_dir_path: str, template_path: str, dest_dir_path: str, base_path: str
+    content_dir_path: str,
+    template_path: str,
+    dest_dir_path: str,
+    base_path: str,
+    template: Template | None = None,
+    cache: FragmentCache | None = None,
+    render_cache: RenderCache | None = None,
+    plan: BuildPlan | None = None,
+    precompressor: Precompressor | None = None,
+    minify: bool = False,
+    assets: AssetMap | None = None,
+    highlight_cache: HighlightCache | None = None,
+) -> None:
+    """Generate a page for every Markdown file under content_dir_path.
+
+    Every output directory is created before the first page is rendered.
+
+    Args:
+        content_dir_path:
+            Directory path to get the Markdown files from.
+        template_path:
+            File path to get the HTML template text from.
+        dest_dir_path:
+            Directory path to write the HTML files to.
+        base_path:
+            Path prefix for root-relative links in the generated HTML.
+        template:
+            Optional Template already compiled for this base_path, which
+            minify and assets are ignored for.
+        cache:
+            Optional FragmentCache of rendered blocks, shared across pages.
+        render_cache:
+            Optional RenderCache of whole pages, see generate_page().
+        plan:
+            Optional BuildPlan of content_dir_path, if it was already planned.
+        precompressor:
+            Optional Precompressor to write compressed siblings of each page.
+        minify:
+            Whether to minify the template, see Template.compile().
+        assets:
+            Optional AssetMap of fingerprinted static files, applied to the
+            template and to every page's links and images.
+        highlight_cache:
+            Optional HighlightCache of highlighted code, shared across pages.
+    """
+    if template is None:
+        template = Template.load(template_path, base_path, minify, assets)
+    if plan is None:
+        plan = plan_build(content_dir_path, dest_dir_path, template_path)
+    plan.make_dirs()
+    for page in plan.pages:
+        generate_page(
+            page.source,
+            template_path,
+            page.dest,
+            base_path,
+            template,
+            cache=cache,
+            render_cache=render_cache,
+            precompressor=precompressor,
+            highlight_cache=highlight_cache,
+        )
+
+
+def find_content_files(
+    content_dir_path: str, dest_dir_path: str
+) -> list[tuple[str, str]]:
+    """Find every Markdown file under content_dir_path and its output path.
+
+    Args:
+        content_dir_path:
+            Directory path to search for Markdown files.
+        dest_dir_path:
+            Directory path the HTML files are generated into.
+
+    Returns:
+        A list of (source path, destination path) tuples, where the
+        destination mirrors the source with a ".html" extension.
+    """
+    return plan_build(content_dir_path, dest_dir_path).page_paths()
+
+
+def generate_pages_incremental(
+    content_dir_path: str,
+    template_path: str,
+    dest_dir_path: str,
+    base_path: str,
+    manifest: BuildManifest,
+    jobs: int = 1,
+    profiler: BuildProfiler | None = None,
+    cache: FragmentCache | None = None,
+    render_cache: RenderCache | None = None,
+    max_in_flight: int = 0,
+    plan: BuildPlan | None = None,
+    precompressor: Precompressor | None = None,
+    minify: bool = False,
+    assets: AssetMap | None = None,
+    graph: DependencyGraph | None = None,
+    highlight_cache: HighlightCache | None = None,
+) -> None:
+    """Generate only the pages whose inputs changed since the last build.
+
+    A page is re-rendered when its Markdown source, the template, or the
+    base_path differ from what the manifest recorded for its output, or when
+    the output is missing. Outputs recorded in the manifest whose sources no
+    longer exist are deleted. The manifest is saved once the build finishes.
+
+    With a DependencyGraph, the graph decides instead, from the inputs each
+    page actually read, and only sources whose size or modification time
+    changed are hashed. The graph is saved by the caller, as other outputs
+    may be recorded in it.
+
+    Args:
+        content_dir_path:
+            Directory path to get the Markdown files from.
+        template_path:
+            File path to get the HTML template text from.
+        dest_dir_path:
+            Directory path to write the HTML files to.
+        base_path:
+            Path prefix for root-relative links in the generated HTML.
+        manifest:
+            BuildManifest holding the inputs of the previous build.
+        jobs:
+            Number of worker processes to render with, see generate_pages().
+        profiler:
+            Optional BuildProfiler to time each re-rendered page with.
+        cache:
+            Optional FragmentCache of rendered blocks, see generate_pages().
+        render_cache:
+            Optional RenderCache of whole pages, see generate_page().
+        max_in_flight:
+            If set, render through generate_pages_async(), see generate_pages().
+        plan:
+            Optional BuildPlan of content_dir_path, if it was already planned.
+        precompressor:
+            Optional Precompressor to write compressed siblings of each page.
+            Unchanged pages only have them written if they are missing.
+        minify:
+            Whether to minify the template, see Template.compile().
+        assets:
+            Optional AssetMap of fingerprinted static files, applied to the
+            template and to every page's links and images.
+        graph:
+            Optional DependencyGraph to find the stale pages with.
+        highlight_cache:
+            Optional HighlightCache of highlighted code, see generate_pages().
+    """
+    if plan is None:
+        plan = plan_build(content_dir_path, dest_dir_path, template_path)
+    template = Template.load(template_path, base_path, minify, assets)
+    # The compiled template, so toggling minify or changing a fingerprinted
+    # file also makes every page stale
+    template_hash: str = template.digest
+    reasons: dict[str, str] = {}
+    if graph is not None:
+        reasons = graph.invalidate(plan, template_path, template, base_path)
+    seen: set[str] = set()
+    stale: list[tuple[str, str]] = []
+    hashes: dict[str, str] = {}
+    skipped: int = 0
+    for source_path, dest_path in plan.page_paths():
+        seen.add(dest_path)
+        if graph is not None:
+            source_hash: str = graph.inputs[source_path]
+            up_to_date = dest_path not in reasons
+        else:
+            source_hash = hash_file(source_path)
+            up_to_date = not manifest.is_stale(
+                dest_path, source_hash, template_hash, base_path
+            )
+        if up_to_date:
+            skipped += 1
+            if precompressor is not None:
+                precompressor.submit(dest_path)
+            continue
+        stale.append((source_path, dest_path))
+        hashes[dest_path] = source_hash
+    plan.make_dirs()
+    generate_pages(
+        stale,
+        template_path,
+        base_path,
+        jobs,
+        profiler,
+        cache,
+        render_cache,
+        max_in_flight,
+        precompressor,
+        minify,
+        assets,
+        highlight_cache,
+    )
+    for source_path, dest_path in stale:
+        manifest.record(
+            dest_path, source_path, hashes[dest_path], template_hash, base_path
+        )
+
+    for dest_path in manifest.outputs():
+        if dest_path in seen:
+            continue
+        print(f"Removing {dest_path}, its source no longer exists")
+        if path.exists(dest_path):
+            remove(dest_path)
+        remove_variants(dest_path)
+        remove_empty_dirs(dirname(dest_path), dest_dir_path)
+        manifest.remove(dest_path)
+
+    print(f"Skipped {skipped} unchanged page(s)")
+    manifest.save()
+
+
+def _generate_page_task(
+    task: tuple[str, str, str, str],
+    template: Template | None,
+    cache: FragmentCache | None = None,
+    render_cache: RenderCache | None = None,
+    precompressor: Precompressor | None = None,
+    highlight_cache: HighlightCache | None = None,
+) -> tuple[str | None, int, int]:
+    """Runs generate_page() in a worker, returning the error message on failure.
+
+    Errors are returned rather than raised, so the parent process can report
+    every failure in discovery order instead of whichever finished first.
+
+    Returns:
+        Tuple of the error message, or None, and the number of files the
+        precompressor compressed and skipped for the page, which a worker's
+        copy of it can't count in the parent process.
+    """
+    compressed, skipped = 0, 0
+    if precompressor is not None:
+        compressed, skipped = precompressor.compressed, precompressor.skipped
+    error: str | None = None
+    try:
+        generate_page(
+            *task,
+            template=template,
+            cache=cache,
+            render_cache=render_cache,
+            precompressor=precompressor,
+            highlight_cache=highlight_cache,
+        )
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    if precompressor is not None:
+        compressed = precompressor.compressed - compressed
+        skipped = precompressor.skipped - skipped
+    return error, compressed, skipped
+
+
+def generate_pages(
+    pages: list[tuple[str, str]],
+    template_path: str,
+    base_path: str,
+    jobs: int = 1,
+    profiler: BuildProfiler | None = None,
+    cache: FragmentCache | None = None,
+    render_cache: RenderCache | None = None,
+    max_in_flight: int = 0,
+    precompressor: Precompressor | None = None,
+    minify: bool = False,
+    assets: AssetMap | None = None,
+    highlight_cache: HighlightCache | None = None,
 ) -> None:
-    dir_items = listdir(content_dir_path)
-    for item in dir_items:
-        source_path = path.join(content_dir_path, item)
-        if path.isfile(source_path):  # File
-            item = item.rsplit(".", 1)[0] + ".html"
-            dest_path = path.join(dest_dir_path, item)
-            generate_page(source_path, template_path, dest_path, base_path)
-        else:  # Directory
-            dest_path = path.join(dest_dir_path, item)
-            mkdir(dest_path)
-            generate_pages_recursive(source_path, template_path, dest_path, base_path)
+    """Generate every page in the list, optionally across a process pool.
+
+    The output is identical whichever number of jobs is used; only the order
+    the pages are written in differs.
+
+    Args:
+        pages:
+            List of (source path, destination path) tuples to render.
+        template_path:
+            File path to get the HTML template text from.
+        base_path:
+            Path prefix for root-relative links in the generated HTML.
+        jobs:
+            Number of worker processes. 1 renders in this process,
+            0 or less uses one worker per CPU.
+        profiler:
+            Optional BuildProfiler to time each page's stages with. Profiled
+            pages are always rendered in this process, with every cache.
+        cache:
+            Optional FragmentCache of rendered blocks. Only used when pages
+            are rendered in this process, as workers can't share it.
+        render_cache:
+            Optional RenderCache of whole pages, see generate_page(). Workers
+            share it through the filesystem.
+        max_in_flight:
+            If set and rendering in this process, overlap reading sources and
+            writing pages with rendering, see generate_pages_async().
+        precompressor:
+            Optional Precompressor to write compressed siblings of each page.
+            Workers compress the pages they render themselves.
+        minify:
+            Whether to minify the template, see Template.compile().
+        assets:
+            Optional AssetMap of fingerprinted static files, applied to the
+            template and to every page's links and images.
+        highlight_cache:
+            Optional HighlightCache of highlighted code. Like cache, only
+            used when pages are rendered in this process.
+
+    Raises:
+        PageGenerationError: If any page fails; lists every failing source
+            path in discovery order.
+    """
+    if jobs <= 0:
+        jobs = cpu_count() or 1
+    if len(pages) == 0:
+        return
+    # Compiled once here, then shipped to each worker with its chunk of tasks.
+    template: Template = Template.load(template_path, base_path, minify, assets)
+    task_fn = partial(
+        _generate_page_task,
+        template=template,
+        render_cache=render_cache,
+        precompressor=precompressor,
+    )
+    tasks = [(source, template_path, dest, base_path) for source, dest in pages]
+    failures: list[tuple[str, str]] = []
+    if profiler is not None:
+        for source, dest in pages:
+            generate = partial(
+                generate_page,
+                source,
+                template_path,
+                dest,
+                base_path,
+                template,
+                cache=cache,
+                render_cache=render_cache,
+                precompressor=precompressor,
+                highlight_cache=highlight_cache,
+            )
+            try:
+                _ = profiler.profile_page(source, dest, generate)
+            except Exception as e:
+                failures.append((source, f"{type(e).__name__}: {e}"))
+    elif max_in_flight > 0 and jobs == 1:
+        failures = generate_pages_async(
+            pages,
+            template_path,
+            template,
+            base_path,
+            max_in_flight,
+            cache,
+            render_cache,
+            precompressor,
+            highlight_cache,
+        )
+    elif jobs == 1 or len(tasks) <= 1:
+        task_fn = partial(task_fn, cache=cache, highlight_cache=highlight_cache)
+        results = map(task_fn, tasks)
+        failures = [
+            (t[0], err) for t, (err, _, _) in zip(tasks, results) if err is not None
+        ]
+    else:
+        chunksize = max(1, len(tasks) // (jobs * 4))
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(task_fn, tasks, chunksize=chunksize))
+        failures = [
+            (t[0], err) for t, (err, _, _) in zip(tasks, results) if err is not None
+        ]
+        if precompressor is not None:
+            precompressor.add_counts(
+                sum(compressed for _, compressed, _ in results),
+                sum(skipped for _, _, skipped in results),
+            )
+    if failures:
+        raise PageGenerationError(failures)
+
+
+def generate_pages_parallel(
+    content_dir_path: str,
+    template_path: str,
+    dest_dir_path: str,
+    base_path: str,
+    jobs: int,
+    profiler: BuildProfiler | None = None,
+    cache: FragmentCache | None = None,
+    render_cache: RenderCache | None = None,
+    max_in_flight: int = 0,
+    plan: BuildPlan | None = None,
+    precompressor: Precompressor | None = None,
+    minify: bool = False,
+    assets: AssetMap | None = None,
+    highlight_cache: HighlightCache | None = None,
+) -> None:
+    """Discover every Markdown file, then render them across a process pool.
+
+    Equivalent to generate_pages_recursive(), but the rendering can be
+    spread over the given number of jobs, or profiled page by page. Takes
+    an optional BuildPlan of content_dir_path, if it was already planned,
+    and the optional precompressor, minify, assets and highlight_cache, see
+    generate_pages().
+
+    Raises:
+        PageGenerationError: If any page fails to generate.
+    """
+    if plan is None:
+        plan = plan_build(content_dir_path, dest_dir_path, template_path)
+    plan.make_dirs()
+    generate_pages(
+        plan.page_paths(),
+        template_path,
+        base_path,
+        jobs,
+        profiler,
+        cache,
+        render_cache,
+        max_in_flight,
+        precompressor,
+        minify,
+        assets,
+        highlight_cache,
+    )
+
+
+def generate_pages_async(
+    pages: list[tuple[str, str]],
+    template_path: str,
+    template: Template,
+    base_path: str,
+    max_in_flight: int = MAX_IN_FLIGHT,
+    cache: FragmentCache | None = None,
+    render_cache: RenderCache | None = None,
+    precompressor: Precompressor | None = None,
+    highlight_cache: HighlightCache | None = None,
+) -> list[tuple[str, str]]:
+    """Render pages while their sources are read and outputs written in threads.
+
+    Rendering happens one page at a time on this thread, in discovery order.
+    Meanwhile a thread pool reads the upcoming sources and writes finished
+    pages, so per-file latency, e.g. of a network filesystem, overlaps with
+    rendering instead of adding to it. At most max_in_flight pages are held
+    between being read and written, which bounds the memory used. Output
+    directories are all created before rendering starts.
+
+    Pages at least STREAM_THRESHOLD bytes long are generated with
+    generate_page(), streaming them as usual.
+
+    Args:
+        pages:
+            List of (source path, destination path) tuples to render.
+        template_path:
+            File path the template was loaded from, for progress messages.
+        template:
+            Template compiled for this base_path.
+        base_path:
+            Path prefix for root-relative links in the generated HTML.
+        max_in_flight:
+            Maximum number of pages read but not yet written.
+        cache:
+            Optional FragmentCache of rendered blocks, shared across pages.
+        render_cache:
+            Optional RenderCache of whole pages, see generate_page().
+        precompressor:
+            Optional Precompressor to write compressed siblings of each page.
+        highlight_cache:
+            Optional HighlightCache of highlighted code, shared across pages.
+
+    Returns:
+        List of (source path, error message) tuples of the pages that
+        failed, in discovery order.
+    """
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        return asyncio.run(
+            _page_pipeline(
+                pages,
+                template_path,
+                template,
+                base_path,
+                max_in_flight,
+                cache,
+                render_cache,
+                precompressor,
+                highlight_cache,
+                executor,
+            )
+        )
+
+
+class _CachedPage:
+    """Read result of a page copied out of the render cache instead."""
+
+
+# Source text and render cache key, a cached page, or None if too large to read
+_ReadResult = tuple[str, str | None] | _CachedPage | None
+
+
+async def _page_pipeline(
+    pages: list[tuple[str, str]],
+    template_path: str,
+    template: Template,
+    base_path: str,
+    max_in_flight: int,
+    cache: FragmentCache | None,
+    render_cache: RenderCache | None,
+    precompressor: Precompressor | None,
+    highlight_cache: HighlightCache | None,
+    executor: ThreadPoolExecutor,
+) -> list[tuple[str, str]]:
+    """Runs generate_pages_async() on the event loop."""
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(max_in_flight)
+    queue: asyncio.Queue[tuple[str, str, asyncio.Future[_ReadResult]] | None]
+    queue = asyncio.Queue()
+    errors: dict[int, str] = {}
+
+    dest_dirs = sorted({dirname(dest) for _, dest in pages})
+    _ = await asyncio.gather(
+        *(
+            loop.run_in_executor(executor, partial(makedirs, d, exist_ok=True))
+            for d in dest_dirs
+        )
+    )
+
+    def read(source_path: str, dest_path: str) -> _ReadResult:
+        """Reads a source in a worker thread, see _ReadResult."""
+        render_key: str | None = None
+        try:
+            if render_cache is not None:
+                render_key = render_cache.key(source_path, template, base_path)
+                if render_cache.fetch(render_key, dest_path):
+                    return _CachedPage()
+            if path.getsize(source_path) >= STREAM_THRESHOLD:
+                return None
+            with open(source_path, "r") as f:
+                return f.read(), render_key
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Cannot find file: {source_path}")
+
+    def write(dest_path: str, html: str, render_key: str | None) -> None:
+        try:
+            with open(dest_path, "w") as f:
+                _ = f.write(html)
+        except IOError:
+            raise IOError(f"Error writing to {dest_path}")
+        if render_cache is not None and render_key is not None:
+            render_cache.store(render_key, dest_path)
+        if precompressor is not None:
+            precompressor.submit(dest_path)
+
+    async def produce() -> None:
+        for source_path, dest_path in pages:
+            await slots.acquire()
+            future = loop.run_in_executor(executor, read, source_path, dest_path)
+            await queue.put((source_path, dest_path, future))
+        await queue.put(None)
+
+    def finish_write(index: int, future: asyncio.Future[None]) -> None:
+        slots.release()
+        if (error := future.exception()) is not None:
+            errors[index] = f"{type(error).__name__}: {error}"
+
+    producer = asyncio.create_task(produce())
+    writes: list[asyncio.Future[None]] = []
+    index: int = 0
+    while (item := await queue.get()) is not None:
+        source_path, dest_path, read_future = item
+        released: bool = False
+        try:
+            result = await read_future
+            if isinstance(result, tuple):
+                md, render_key = result
+                print(
+                    f"Generating page from {source_path} to {dest_path} "
+                    f"using {template_path}"
+                )
+                html = render_page(md, template, base_path, cache, highlight_cache)
+                write_future = loop.run_in_executor(
+                    executor, write, dest_path, html, render_key
+                )
+                # The slot is released once the page is written.
+                write_future.add_done_callback(partial(finish_write, index))
+                writes.append(write_future)
+                released = True
+            else:
+                slots.release()
+                released = True
+                if isinstance(result, _CachedPage):
+                    print(f"Copying cached page for {source_path} to {dest_path}")
+                    if precompressor is not None:
+                        precompressor.submit(dest_path)
+                else:
+                    generate_page(
+                        source_path,
+                        template_path,
+                        dest_path,
+                        base_path,
+                        template,
+                        stream=True,
+                        cache=cache,
+                        render_cache=render_cache,
+                        precompressor=precompressor,
+                        highlight_cache=highlight_cache,
+                    )
+        except Exception as e:
+            if not released:
+                slots.release()
+            errors[index] = f"{type(e).__name__}: {e}"
+        index += 1
+        # Awaiting a read that already finished doesn't yield, so let the
+        # producer queue more reads and the finished writes free their slots.
+        await asyncio.sleep(0)
+    await producer
+    _ = await asyncio.gather(*writes, return_exceptions=True)
+    return [(pages[i][0], errors[i]) for i in sorted(errors)]
@@ -0,0 +1,256 @@
+"""Module for highlighting the syntax of fenced code blocks at build time.
+
+A code block fenced with a language, e.g. ```python, is split into tokens
+by a lexer for that language, and each token is wrapped in a <span> with a
+short class name, the same ones Pygments uses, so any Pygments stylesheet
+colours the page:
+
+    c: comment, s: string, m: number, k: keyword, kt: type,
+    nb: builtin, nf: function name, nv: variable, nt: key
+
+Lexers are pure Python, made of regular expressions tried at each position
+in order. Lexers for Python, JavaScript, shell, JSON and Go are bundled, and
+others can be added with register_lexer(). Blocks in other languages, or
+without one, are left as they were.
+
+Lexing is much slower than rendering the rest of a block, and the same
+samples repeat across pages, so highlighted code can be kept in a
+HighlightCache by language and hash of the code, in memory and on disk. A
+cache saved with another LEXER_VERSION is discarded when loaded.
+
+Typical usage example:
+
+cache = HighlightCache.load(".highlight-cache.json")
+html = highlight('print("Tom")', "python", cache)
+cache.save()
+"""
+
+from collections.abc import Callable, Iterable, Iterator
+from hashlib import sha256
+from html import escape
+import re
+from typing import override
+
+from fragment_cache import LRUCache
+
+HIGHLIGHT_CACHE_PATH = ".highlight-cache.json"
+HIGHLIGHT_CACHE_VERSION = 1
+# Bump whenever a bundled lexer changes, to stop reusing cached output.
+LEXER_VERSION = "1"
+
+# (language, SHA-256 hex digest of the code)
+HighlightKey = tuple[str, str]
+
+# Yields (class name, text) tokens covering the code, "" for plain text.
+Lexer = Callable[[str], Iterable[tuple[str, str]]]
+
+
+def regex_lexer(rules: list[tuple[str, str]]) -> Lexer:
+    """Makes a Lexer from (class name, regular expression) rules.
+
+    The rules are combined into one expression, so at each position the
+    first rule to match wins, and text no rule matches is left plain.
+    """
+    pattern = re.compile(
+        "|".join(f"(?P<t{i}>{expression})" for i, (_, expression) in enumerate(rules))
+    )
+    classes = {f"t{i}": name for i, (name, _) in enumerate(rules)}
+
+    def lex(code: str) -> Iterator[tuple[str, str]]:
+        end: int = 0
+        for match in pattern.finditer(code):
+            if match.start() > end:
+                yield "", code[end : match.start()]
+            yield classes[str(match.lastgroup)], match[0]
+            end = match.end()
+        if end < len(code):
+            yield "", code[end:]
+
+    return lex
+
+
+def _words(words: str) -> str:
+    """Returns an expression matching any of the space separated words."""
+    return rf"\b(?:{'|'.join(words.split())})\b"
+
+
+NUMBER = r"\b(?:0[xXoObB][\da-fA-F_]+|\d[\d_]*(?:\.\d*)?(?:[eE][+-]?\d+)?)\b"
+DOUBLE_QUOTED = r'"(?:\\.|[^"\\\n])*"'
+SINGLE_QUOTED = r"'(?:\\.|[^'\\\n])*'"
+
+LEXERS: dict[str, Lexer] = {}
+
+
+def register_lexer(lexer: Lexer, *languages: str) -> None:
+    """Highlights code fenced with any of the languages with lexer.
+
+    Replaces any lexer registered for those languages before. Lexers should
+    be registered before any code is highlighted, as a HighlightCache may
+    still hold the output of a replaced lexer.
+    """
+    for language in languages:
+        LEXERS[language.lower()] = lexer
+
+
+register_lexer(
+    regex_lexer(
+        [
+            ("c", r"#[^\n]*"),
+            ("s", r"""(?i:[rbfu]{0,2})(?:'''[\s\S]*?'''|\"\"\"[\s\S]*?\"\"\")"""),
+            ("s", rf"(?i:[rbfu]{{0,2}})(?:{DOUBLE_QUOTED}|{SINGLE_QUOTED})"),
+            ("nf", r"(?<=\bdef )\w+|(?<=\bclass )\w+"),
+            (
+                "k",
+                _words(
+                    "and as assert async await break class continue def del "
+                    "elif else except finally for from global if import in is "
+                    "lambda match case nonlocal not or pass raise return try "
+                    "while with yield None True False"
+                ),
+            ),
+            (
+                "nb",
+                _words(
+                    "print len range enumerate zip open str int float bool list "
+                    "dict set tuple isinstance super self"
+                ),
+            ),
+            ("m", NUMBER),
+        ]
+    ),
+    "python",
+    "py",
+)
+register_lexer(
+    regex_lexer(
+        [
+            ("c", r"//[^\n]*|/\*[\s\S]*?\*/"),
+            ("s", rf"{DOUBLE_QUOTED}|{SINGLE_QUOTED}|`(?:\\.|[^`\\])*`"),
+            ("nf", r"(?<=\bfunction )\w+|(?<=\bclass )\w+"),
+            (
+                "k",
+                _words(
+                    "async await break case catch class const continue default "
+                    "delete do else export extends finally for from function if "
+                    "import in instanceof let new of return switch this throw "
+                    "try typeof var void while yield null undefined true false"
+                ),
+            ),
+            ("m", NUMBER),
+        ]
+    ),
+    "javascript",
+    "js",
+)
+register_lexer(
+    regex_lexer(
+        [
+            ("c", r"(?<![^\s;])#[^\n]*"),
+            ("s", rf"{DOUBLE_QUOTED}|'[^']*'"),
+            ("nv", r"\$(?:\{[^}\n]*\}|\w+|[@#?$!*-])"),
+            (
+                "k",
+                _words(
+                    "if then else elif fi for while until do done case esac "
+                    "function in return export local"
+                ),
+            ),
+            ("m", r"\b\d+\b"),
+        ]
+    ),
+    "bash",
+    "sh",
+    "shell",
+    "zsh",
+)
+register_lexer(
+    regex_lexer(
+        [
+            ("nt", rf"{DOUBLE_QUOTED}(?=\s*:)"),
+            ("s", DOUBLE_QUOTED),
+            ("k", _words("true false null")),
+            ("m", r"-?\b\d+(?:\.\d+)?(?:[eE][+-]?\d+)?\b"),
+        ]
+    ),
+    "json",
+)
+register_lexer(
+    regex_lexer(
+        [
+            ("c", r"//[^\n]*|/\*[\s\S]*?\*/"),
+            ("s", rf"{DOUBLE_QUOTED}|`[^`]*`|'(?:\\.|[^'\\\n])+'"),
+            ("nf", r"(?<=\bfunc )\w+"),
+            (
+                "k",
+                _words(
+                    "break case chan const continue default defer else "
+                    "fallthrough for func go goto if import interface map "
+                    "package range return select struct switch type var nil "
+                    "true false iota"
+                ),
+            ),
+            (
+                "kt",
+                _words(
+                    "bool byte rune string error any int int8 int16 int32 int64 "
+                    "uint uint8 uint16 uint32 uint64 uintptr float32 float64 "
+                    "complex64 complex128"
+                ),
+            ),
+            ("m", NUMBER),
+        ]
+    ),
+    "go",
+    "golang",
+)
+
+
+class HighlightCache(LRUCache):
+    """Bounded LRU cache of highlighted code, keyed by HighlightKey.
+
+    A cache saved with another LEXER_VERSION is discarded when loaded.
+    """
+
+    version: int = HIGHLIGHT_CACHE_VERSION
+
+    @override
+    def header(self) -> dict[str, object]:
+        return {**super().header(), "lexers": LEXER_VERSION}
+
+    def summary(self) -> str:
+        """Returns a line of hit and miss statistics for the build output."""
+        return (
+            f"Highlight cache: {self.misses} code block(s) highlighted, "
+            f"{self.hits} reused, {len(self.entries)} entries"
+        )
+
+
+def highlight(
+    code: str, language: str, cache: HighlightCache | None = None
+) -> str | None:
+    """Highlights code in the given language, see the module docstring.
+
+    Args:
+        code: Text of the code block, without its fences.
+        language: Language the block is fenced with, e.g. "python".
+        cache: Optional HighlightCache to look the code up in, and store it to.
+
+    Returns:
+        The HTML of the code, with its text escaped and its tokens wrapped
+        in <span>(s), or None if there is no lexer for the language.
+    """
+    language = language.lower()
+    lexer = LEXERS.get(language)
+    if lexer is None:
+        return None
+    key: HighlightKey = (language, sha256(code.encode("utf-8")).hexdigest())
+    html = cache.get(key) if cache is not None else None
+    if html is None:
+        parts: list[str] = []
+        for name, text in lexer(code):
+            text = escape(text, quote=False)
+            parts.append(f'<span class="{name}">{text}</span>' if name else text)
+        html = "".join(parts)
+        if cache is not None:
+            cache.put(key, html)
+    return html
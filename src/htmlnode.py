@@ -1,4 +1,5 @@
-from typing import override
+from collections.abc import Iterator
+from typing import TextIO, override
 
 
 class HTMLNode:
@@ -14,6 +15,9 @@ class HTMLNode:
                For example, a link (<a> tag) might have {"href": "https://www.google.com"}
     """
 
+    # No per-instance __dict__; large documents build millions of nodes.
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(
         self,
         tag: str | None = None,
@@ -43,6 +47,23 @@ class HTMLNode:
         """Unimplimented method to be overridden by child classes."""
         raise NotImplementedError("to_html method not implemented")
 
+    def iter_html(self) -> Iterator[str]:
+        """Yields the HTML of self as a sequence of string chunks.
+
+        Child classes that only override to_html() yield it as a single chunk.
+        """
+        yield self.to_html()
+
+    def write_html(self, fp: TextIO) -> None:
+        """Writes the HTML of self to a file object, chunk by chunk.
+
+        Unlike to_html(), the HTML is never held in memory as a single string.
+
+        Args:
+            fp: Text file object to write the HTML to.
+        """
+        fp.writelines(self.iter_html())
+
     def props_to_html(self) -> str:
         """Converts attributes of the HTML tag to raw HTML as a string.
 
@@ -55,11 +76,9 @@ class HTMLNode:
         Returns:
             A string of HTML representing the HTML attributes in the props attribute.
         """
-        htmlString: str = ""
-        if not self.props is None:
-            for k, v in self.props.items():
-                htmlString += f' {k}="{v}"'
-        return htmlString
+        if not self.props:
+            return ""
+        return "".join(f' {k}="{v}"' for k, v in self.props.items())
 
 
 class LeafNode(HTMLNode):
@@ -74,6 +93,8 @@ class LeafNode(HTMLNode):
                For example, a link (<a> tag) might have {"href": "https://www.google.com"}
     """
 
+    __slots__ = ()
+
     def __init__(
         self,
         tag: str | None,
@@ -121,6 +142,8 @@ class ParentNode(HTMLNode):
                 For example, a link (<a> tag) might have {"href": "https://www.google.com"}
     """
 
+    __slots__ = ()
+
     def __init__(
         self,
         tag: str,
@@ -146,6 +169,44 @@ class ParentNode(HTMLNode):
             A string of HTML from self and children.
             It includes self.props if that is not None.
 
+        Raises:
+            ValueError: self.tag and self.children must have a value.
+        """
+        return "".join(self.iter_html())
+
+    @override
+    def iter_html(self) -> Iterator[str]:
+        """Yields the HTML of self and children as a sequence of string chunks.
+
+        Walks the tree with an explicit stack rather than recursing, so each
+        chunk is yielded once instead of being copied into every enclosing
+        tag's string.
+
+        Raises:
+            ValueError: self.tag and self.children, and those of any ParentNode
+                descendants, must have a value.
+        """
+        yield self._open_tag()
+        stack: list[tuple[ParentNode, Iterator[HTMLNode]]] = [
+            (self, iter(self.children or []))
+        ]
+        while stack:
+            node, children = stack[-1]
+            child = next(children, None)
+            if child is None:
+                _ = stack.pop()
+                yield f"</{node.tag}>"
+            elif isinstance(child, ParentNode):
+                yield child._open_tag()
+                stack.append((child, iter(child.children or [])))
+            elif isinstance(child, LeafNode):
+                yield child.to_html()
+            else:
+                yield from child.iter_html()
+
+    def _open_tag(self) -> str:
+        """Validates self and returns its opening tag.
+
         Raises:
             ValueError: self.tag and self.children must have a value.
         """
@@ -153,11 +214,7 @@ class ParentNode(HTMLNode):
             raise ValueError(f"{type(self)} must have a tag.")
         if self.children is None:
             raise ValueError(f"{type(self)} must have children.")
-
-        childhtml: str = "".join(map(lambda child: child.to_html(), self.children))
-        html = f"<{self.tag}{self.props_to_html()}>{childhtml}</{self.tag}>"
-
-        return html
+        return f"<{self.tag}{self.props_to_html()}>"
 
     @override
     def __repr__(self):
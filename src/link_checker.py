@@ -0,0 +1,277 @@
+"""Module for finding links between pages that lead nowhere.
+
+LinkIndex holds a hash set of the site paths that exist, meaning the
+generated pages and copied static files, known up front from the build
+plan. The URLs each page's Markdown links to are rewritten with the
+base_path as in the HTML, then checked with a set lookup each, so the
+check is O(links) and never reads the generated pages back. Pages with a
+broken URL are parsed into the same TextNode(s) they are rendered from, so
+only real links and images are reported, with their line numbers.
+
+Typical usage example:
+
+index = LinkIndex(base_path)
+index.check_plan(plan, "docs", "static")
+for link in index.broken:
+    print(f"{link.source_path}:{link.line}: broken link to {link.url}")
+"""
+
+from collections.abc import Iterable, Iterator
+import posixpath
+from os import path
+import re
+from typing import NamedTuple
+
+from build_plan import BuildPlan
+from file_manipulation import scan_tree
+from front_matter import read_front_matter
+from markdown_blocks import BlockType, block_to_block_type
+from markdown_manipulation import markdown_to_textnodes
+from template import rewrite_url
+from textnode import TextType
+
+# URLs with a scheme, e.g. "https:" or "mailto:", lead outside the site.
+EXTERNAL_URL_PATTERN = re.compile(r"[a-zA-Z][a-zA-Z0-9+.-]*:|//")
+# URL of every link and image, and of text that only looks like one, e.g. in code
+LINK_URL_PATTERN = re.compile(r"\]\(([^()]*)\)")
+
+
+class Link(NamedTuple):
+    """A link or image in a page's Markdown.
+
+    Attributes:
+        source_path: File path of the Markdown source.
+        line: Line number of the link in the source, starting at 1.
+        url: URL of the link as written in the HTML, after base_path rewriting.
+        image: Whether it is the source of an image rather than a link.
+    """
+
+    source_path: str
+    line: int
+    url: str
+    image: bool
+
+
+class BrokenLinksError(Exception):
+    """Raised when pages link to paths that aren't part of the site.
+
+    Attributes:
+        links: List of the broken Link(s), in discovery order.
+    """
+
+    def __init__(self, links: list[Link]) -> None:
+        self.links: list[Link] = links
+        link = links[0]
+        summary = f"Broken link in {link.source_path}:{link.line} to {link.url}"
+        if len(links) > 1:
+            summary += f" (and {len(links) - 1} more)"
+        super().__init__(summary)
+
+
+def iter_markdown_links(
+    lines: Iterable[str], first_line: int = 1
+) -> Iterator[tuple[int, str, bool]]:
+    """Yield the line number, URL and kind of each link in the Markdown.
+
+    Splits the Markdown into blocks as markdown_to_blocks() does, and
+    parses the inline Markdown of each block with markdown_to_textnodes(),
+    so exactly the links and images that render as such are found. Links
+    in code blocks and code spans are ignored. Blocks without "](" can't
+    contain a link and are skipped without parsing.
+
+    Args:
+        lines:
+            Lines of Markdown-formatted text, e.g. an open file.
+        first_line:
+            Line number of the first of lines, e.g. after front matter.
+
+    Returns:
+        An iterator of (line number, URL, is image) tuples, in the order the
+        links appear.
+    """
+    block_lines: list[str] = []
+    start: int = first_line
+    for number, line in enumerate(lines, first_line):
+        line = line.removesuffix("\n")
+        if line != "":
+            if not block_lines and line.strip() == "":
+                continue  # Stripped from the start of the block
+            if not block_lines:
+                start = number
+            block_lines.append(line)
+            continue
+        yield from _block_links("\n".join(block_lines).strip(), start)
+        block_lines = []
+    yield from _block_links("\n".join(block_lines).strip(), start)
+
+
+def _block_links(block: str, start: int) -> Iterator[tuple[int, str, bool]]:
+    """Yield the links of a block whose first line is number start."""
+    if "](" not in block or block_to_block_type(block) == BlockType.CODE:
+        return
+    try:
+        # Newlines are replaced with spaces before inline parsing, which keeps
+        # each link's offset in the block.
+        nodes = markdown_to_textnodes(block.replace("\n", " "))
+    except ValueError:
+        return  # Malformed, reported when the page is generated
+    offset: int = 0
+    for node in nodes:
+        image: bool = node.text_type is TextType.IMAGE
+        if not image and node.text_type is not TextType.LINK:
+            continue
+        url = str(node.url)
+        found = block.find(f"]({url})", offset)
+        if found != -1:
+            offset = found
+        yield start + block.count("\n", 0, offset), url, image
+
+
+class LinkIndex:
+    """Hash index of the paths of a site, to check the links between them.
+
+    Every target must be added before the pages linking to it are checked.
+
+    Attributes:
+        base_path: Path prefix of the site, e.g. "/static-site-generator/".
+        targets: Set of site paths, relative to base_path, that exist.
+        pages: Number of pages checked.
+        urls: Number of link and image URLs found across the checked pages,
+              including text that only looks like one, e.g. in code.
+        broken: List of every broken Link found, in discovery order.
+    """
+
+    def __init__(self, base_path: str = "/") -> None:
+        self.base_path: str = base_path
+        self.targets: set[str] = set()
+        self.pages: int = 0
+        self.urls: int = 0
+        self.broken: list[Link] = []
+        # Root-relative URLs lead to the same path from every page, so their
+        # result is shared across pages.
+        self._valid: set[str] = set()
+        self._invalid: set[str] = set()
+
+    def add_target(self, relative_path: str) -> None:
+        """Adds a file of the site, given by its path relative to its root.
+
+        An "index.html" also makes its directory a valid link target, with
+        or without a trailing "/".
+        """
+        site_path = "/" + relative_path.replace(path.sep, "/")
+        self.targets.add(site_path)
+        if posixpath.basename(site_path) == "index.html":
+            directory = posixpath.dirname(site_path)
+            self.targets.add(directory)
+            self.targets.add(directory.rstrip("/") + "/")
+
+    def check_page(self, source_path: str, relative_path: str) -> None:
+        """Checks the links and images of a page, adding any broken to broken.
+
+        The URLs are found with a single regular expression over the whole
+        source, which may also match text the parser doesn't turn into a
+        link, e.g. in code. A page whose URLs are all known to be valid is
+        done with one set operation. Otherwise the page is parsed into the
+        TextNode(s) it is rendered from, to report only the real links and
+        images to broken URLs, with their line numbers.
+
+        Args:
+            source_path: File path of the Markdown source.
+            relative_path: Path of the generated page relative to the site root.
+
+        Raises:
+            FileNotFoundError: If the source file doesn't exist.
+        """
+        try:
+            with open(source_path, "r") as f:
+                urls: list[str] = LINK_URL_PATTERN.findall(f.read())
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Cannot find file: {source_path}")
+        self.pages += 1
+        self.urls += len(urls)
+        if self._valid.issuperset(urls):
+            return
+        page = "/" + relative_path.replace(path.sep, "/")
+        suspects: set[str] = set()
+        for url in set(urls).difference(self._valid):
+            if url in self._invalid:
+                suspects.add(url)
+            elif self.is_broken(url, page):
+                suspects.add(url)
+                if url.startswith("/"):
+                    self._invalid.add(url)
+            elif url.startswith("/"):
+                self._valid.add(url)
+        if not suspects:
+            return
+        with open(source_path, "r") as f:
+            try:
+                _, skipped = read_front_matter(f)
+            except ValueError:
+                return  # Malformed, reported when the page is generated
+            for line, url, image in iter_markdown_links(f, skipped + 1):
+                if url in suspects:
+                    url = rewrite_url(url, self.base_path)
+                    self.broken.append(Link(source_path, line, url, image))
+
+    def check_plan(
+        self, plan: BuildPlan, dest_dir_path: str, static_dir_path: str
+    ) -> None:
+        """Checks every planned page against the pages and static files.
+
+        Args:
+            plan: BuildPlan of the pages generated into dest_dir_path.
+            dest_dir_path: Directory path the site is generated into.
+            static_dir_path: Directory path the static files are copied from.
+        """
+        if path.isdir(static_dir_path):
+            static_files, _ = scan_tree(static_dir_path)
+            for relative_path in static_files:
+                self.add_target(relative_path)
+        # Planned destinations all start with dest_dir_path, and slicing it
+        # off is much cheaper than path.relpath() on large sites.
+        prefix = path.join(dest_dir_path, "")
+        pages = [(p.source, p.dest.removeprefix(prefix)) for p in plan.pages]
+        for _, relative_path in pages:
+            self.add_target(relative_path)
+        for source_path, relative_path in pages:
+            self.check_page(source_path, relative_path)
+
+    def site_path(self, url: str, page: str) -> str | None:
+        """Returns the site path a URL in the HTML of the given page leads to.
+
+        Returns:
+            The path relative to base_path, without any query or fragment,
+            or None if the URL is root-relative but outside the base_path.
+        """
+        url = url.split("#", 1)[0].split("?", 1)[0]
+        if url == "":
+            return page  # Only a fragment, e.g. "#usage"
+        if url.startswith("/"):
+            if not url.startswith(self.base_path):
+                return None
+            url = "/" + url[len(self.base_path) :]
+        else:
+            url = posixpath.join(posixpath.dirname(page), url)
+        site_path = posixpath.normpath(url)
+        if url.endswith("/") and site_path != "/":
+            site_path += "/"
+        return site_path
+
+    def is_broken(self, url: str, page: str) -> bool:
+        """Checks whether a Markdown URL on the given page leads nowhere.
+
+        The URL is rewritten with the base_path first, as in the HTML. URLs
+        with a scheme, e.g. "https:", lead outside the site and never break.
+        """
+        url = rewrite_url(url, self.base_path)
+        if EXTERNAL_URL_PATTERN.match(url):
+            return False
+        return self.site_path(url, page) not in self.targets
+
+    def summary(self) -> str:
+        """Returns a line of link statistics for the build output."""
+        return (
+            f"Checked {self.urls} URL(s) on {self.pages} page(s), "
+            f"{len(self.broken)} broken"
+        )
@@ -0,0 +1,274 @@
+"""Module for generating the listing pages of a section of the site.
+
+A section is a directory of content, e.g. "blog". Its listing pages are
+generated from the MetadataIndex in one pass over the planned pages,
+without reading any of them:
+
+- "blog/index.html": the newest posts, unless the section has its own
+  "index.md", linking to older ones on "blog/page/<n>/index.html".
+- "blog/tags/index.html": every tag, with its number of posts.
+- "blog/tags/<tag>/index.html": the newest posts with each tag, linking
+  to older ones on "blog/tags/<tag>/page/<n>/index.html".
+- "blog/archive/index.html": every post, under the year it is dated.
+
+Pages are numbered from the oldest posts, page_size posts each, and the
+newest page holds the remaining page_size to 2 * page_size - 1 posts. A
+new post then only changes the newest page, until it is full enough to
+split off another numbered page, rather than shifting every post onto
+the next page.
+
+Listings are written as Markdown and rendered into the template like any
+other page. A listing is only written if its HTML changed, so editing a
+post's body leaves them alone.
+
+Typical usage example:
+
+listings = plan_listings(plan, metadata, "docs")
+written = write_listings(listings, template, base_path)
+"""
+
+from os import makedirs, path
+import re
+from typing import NamedTuple
+
+from build_plan import BuildPlan, page_url
+from compression import Precompressor
+from front_matter import PageMetadata
+from generate_files import render_page
+from metadata_index import MetadataIndex
+from template import Template
+
+SECTION_DIR = "blog"
+# Default number of posts on each page of a section.
+DEFAULT_PAGE_SIZE = 20
+# Runs of characters other than letters and digits, joined by "-" in tag URLs.
+TAG_SEPARATOR_PATTERN = re.compile(r"[^\w]+|_+")
+# Characters of titles and tags that would be read as Markdown or HTML,
+# replaced with character references, as the Markdown has no escapes.
+MARKUP_ESCAPES = str.maketrans({c: f"&#{ord(c)};" for c in "&<>*_`[]"})
+
+
+class ListingPage(NamedTuple):
+    """A generated listing page.
+
+    Attributes:
+        dest: File path of the HTML page.
+        markdown: Markdown the page is rendered from.
+        sources: File paths of the posts it lists, in order.
+        pages: File paths of the other listing pages it links to.
+    """
+
+    dest: str
+    markdown: str
+    sources: tuple[str, ...]
+    pages: tuple[str, ...] = ()
+
+
+def tag_slug(tag: str) -> str:
+    """Returns the URL segment of a tag, e.g. "Middle Earth" is "middle-earth"."""
+    return TAG_SEPARATOR_PATTERN.sub("-", tag.lower()).strip("-") or "-"
+
+
+def escape_markup(text: str) -> str:
+    """Returns text to show as is in Markdown, e.g. "snake&#95;case"."""
+    return text.translate(MARKUP_ESCAPES)
+
+
+def _post_line(metadata: PageMetadata, url: str) -> str:
+    """Returns the list item linking to a post."""
+    title = escape_markup(metadata.title) or url
+    line = f"- [{title}]({url})"
+    if metadata.date != "":
+        line += f" ({metadata.date[:10]})"
+    return line
+
+
+def plan_listings(
+    plan: BuildPlan,
+    metadata: MetadataIndex,
+    dest_dir_path: str,
+    section: str = SECTION_DIR,
+    page_size: int = DEFAULT_PAGE_SIZE,
+) -> list[ListingPage]:
+    """Works out the listing pages of a section from the metadata index.
+
+    Args:
+        plan: BuildPlan of the published pages, see MetadataIndex.publish().
+        metadata: MetadataIndex of the planned pages.
+        dest_dir_path: Directory path the site is generated into.
+        section: Directory of the section, relative to the site root.
+        page_size: Number of posts on each page, except the newest.
+
+    Returns:
+        List of ListingPage(s), empty if the section has no posts.
+    """
+    root = path.join(dest_dir_path, "")
+    section_dir = path.join(dest_dir_path, section)
+    index_dest = path.join(section_dir, "index.html")
+    posts: list[tuple[PageMetadata, str, str]] = []
+    for page in plan.pages:
+        if page.dest.startswith(path.join(section_dir, "")) and page.dest != index_dest:
+            url = page_url(page.dest.removeprefix(root))
+            posts.append((metadata.metadata(page.source), url, page.source))
+    if not posts:
+        return []
+    # Newest first, then by title; undated posts last.
+    posts.sort(key=lambda post: post[0].title)
+    posts.sort(key=lambda post: post[0].date, reverse=True)
+    sources = tuple(source for _, _, source in posts)
+
+    section_title = section.replace("-", " ").capitalize()
+    lines = [_post_line(post_metadata, url) for post_metadata, url, _ in posts]
+    listings: list[ListingPage] = _paginate(
+        lines,
+        sources,
+        section_dir,
+        section_title,
+        index_dest not in plan.outputs(),
+        page_size,
+        root,
+    )
+
+    tags: dict[str, tuple[str, list[str], list[str]]] = {}
+    years: dict[str, list[str]] = {}
+    for post_metadata, url, source in posts:
+        line = _post_line(post_metadata, url)
+        for tag in post_metadata.tags:
+            _, tagged, tagged_sources = tags.setdefault(tag_slug(tag), (tag, [], []))
+            tagged.append(line)
+            tagged_sources.append(source)
+        year = post_metadata.date[:4] if post_metadata.date != "" else "Undated"
+        years.setdefault(year, []).append(line)
+
+    tags_dir = path.join(section_dir, "tags")
+    tag_lines: list[str] = []
+    tag_sources: dict[str, None] = {}
+    for slug, (tag, lines, tagged_sources) in sorted(tags.items()):
+        url = page_url(path.join(tags_dir, slug, "index.html").removeprefix(root))
+        tag_lines.append(f"- [{escape_markup(tag)}]({url}) ({len(lines)})")
+        tag_sources.update(dict.fromkeys(tagged_sources))
+        listings.extend(
+            _paginate(
+                lines,
+                tuple(tagged_sources),
+                path.join(tags_dir, slug),
+                f"Posts tagged {escape_markup(tag)}",
+                True,
+                page_size,
+                root,
+            )
+        )
+    if tag_lines:
+        markdown = "# Tags\n\n" + "\n".join(tag_lines)
+        listings.append(
+            ListingPage(path.join(tags_dir, "index.html"), markdown, tuple(tag_sources))
+        )
+
+    archive = [f"# {section_title} archive"]
+    for year, lines in years.items():
+        archive.append(f"## {year}\n\n" + "\n".join(lines))
+    archive_dest = path.join(section_dir, "archive", "index.html")
+    listings.append(ListingPage(archive_dest, "\n\n".join(archive), sources))
+    return listings
+
+
+def _paginate(
+    lines: list[str],
+    sources: tuple[str, ...],
+    dir_path: str,
+    title: str,
+    generate_index: bool,
+    page_size: int,
+    root: str,
+) -> list[ListingPage]:
+    """Splits a list of posts into pages, numbered from the oldest.
+
+    Args:
+        lines: List item of each post, newest first.
+        sources: Source of each post, in the same order.
+        dir_path: Directory path the pages are generated into, as
+                  "index.html" and "page/<n>/index.html".
+        title: Title of the pages, followed by the page number on all but
+               the newest.
+        generate_index: Whether the newest page is the directory's index,
+                        rather than the last numbered page.
+        page_size: Number of posts on each numbered page.
+        root: Directory path the site is generated into, ending in a "/".
+
+    Returns:
+        List of ListingPage(s), oldest first.
+
+    Raises:
+        ValueError: If page_size is less than 1.
+    """
+    if page_size < 1:
+        raise ValueError(f"Page size must be at least 1: {page_size}")
+    count = max(1, len(lines) // page_size)
+    dests = [
+        path.join(dir_path, "page", str(number), "index.html")
+        for number in range(1, count + 1)
+    ]
+    if generate_index:
+        dests[-1] = path.join(dir_path, "index.html")
+    pages: list[ListingPage] = []
+    for number, dest in enumerate(dests, 1):
+        # Posts are newest first, so the oldest page is at the end.
+        end = len(lines) - (number - 1) * page_size
+        start = end - page_size if number < count else 0
+        heading = title if number == count else f"{title}, page {number}"
+        markdown = f"# {heading}\n\n" + "\n".join(lines[start:end])
+        links: list[str] = []
+        nav: list[str] = []
+        if number < count:
+            links.append(dests[number])
+            nav.append(f"[Newer posts]({page_url(dests[number].removeprefix(root))})")
+        if number > 1:
+            links.append(dests[number - 2])
+            url = page_url(dests[number - 2].removeprefix(root))
+            nav.append(f"[Older posts]({url})")
+        if nav:
+            markdown += "\n\n" + " ".join(nav)
+        pages.append(ListingPage(dest, markdown, sources[start:end], tuple(links)))
+    return pages
+
+
+def write_listings(
+    listings: list[ListingPage],
+    template: Template,
+    base_path: str,
+    precompressor: Precompressor | None = None,
+) -> int:
+    """Renders listing pages into the template, writing those that changed.
+
+    Args:
+        listings: ListingPage(s) from plan_listings().
+        template: Template compiled for this base_path.
+        base_path: Path prefix for root-relative links in the generated HTML.
+        precompressor: Optional Precompressor to write compressed siblings
+                       of each page.
+
+    Returns:
+        Number of listing pages written.
+
+    Raises:
+        IOError: If it fails to write a page.
+    """
+    written: int = 0
+    for listing in listings:
+        html = render_page(listing.markdown, template, base_path)
+        try:
+            with open(listing.dest, "r") as f:
+                unchanged = f.read() == html
+        except FileNotFoundError:
+            unchanged = False
+        if not unchanged:
+            makedirs(path.dirname(listing.dest), exist_ok=True)
+            try:
+                with open(listing.dest, "w") as f:
+                    _ = f.write(html)
+            except IOError:
+                raise IOError(f"Error writing to {listing.dest}")
+            written += 1
+        if precompressor is not None:
+            precompressor.submit(listing.dest)
+    return written
@@ -1,18 +1,442 @@
-from os import getcwd
+from argparse import ArgumentParser
+from os import getcwd, path
 
-from file_manipulation import overwrite_directory_files
-from generate_files import generate_page, generate_pages_recursive
-from markdown_manipulation import extract_markdown_links
+from build_manifest import MANIFEST_PATH, BuildManifest
+from build_plan import plan_build
+from dependency_graph import DEPENDENCY_GRAPH_PATH, DependencyGraph
+from compression import (
+    DEFAULT_FORMATS,
+    DEFAULT_MIN_SIZE,
+    Precompressor,
+    parse_formats,
+)
+from fingerprint import (
+    FINGERPRINT_CACHE_PATH,
+    FingerprintCache,
+    asset_map,
+    fingerprint_directory,
+)
+from fragment_cache import DEFAULT_MAX_ENTRIES, FragmentCache
+from file_manipulation import overwrite_directory_files, sync_directory
+from generate_files import (
+    MAX_IN_FLIGHT,
+    PageGenerationError,
+    generate_page,
+    generate_pages_incremental,
+    generate_pages_parallel,
+    generate_pages_recursive,
+)
+from highlight import HIGHLIGHT_CACHE_PATH, HighlightCache
+from link_checker import BrokenLinksError, LinkIndex
+from listings import DEFAULT_PAGE_SIZE, ListingPage, plan_listings, write_listings
+from metadata_index import METADATA_INDEX_PATH, MetadataError, MetadataIndex
+from profiling import BuildProfiler, timed_stage
+from render_cache import DEFAULT_MAX_SIZE, RenderCache, cache_command
+from search_index import SEARCH_CACHE_DIR, SearchIndex
+from sizes import format_size, parse_size
+from template import AssetMap, Template
 import sys
 
 
+def parse_args(argv: list[str]):
+    parser = ArgumentParser(description="Generate the static site into docs/.")
+    _ = parser.add_argument(
+        "base_path",
+        nargs="?",
+        default="/",
+        help='path prefix for root-relative links (default: "/")',
+    )
+    _ = parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only re-render pages whose inputs changed since the last build",
+    )
+    _ = parser.add_argument(
+        "--explain",
+        action="store_true",
+        help="print why each page was rebuilt (implies --incremental)",
+    )
+    _ = parser.add_argument(
+        "--async-io",
+        nargs="?",
+        type=int,
+        const=MAX_IN_FLIGHT,
+        default=0,
+        metavar="N",
+        help="read sources and write pages in background threads while "
+        f"rendering, with at most N pages in flight (default: {MAX_IN_FLIGHT}); "
+        "only with -j 1",
+    )
+    _ = parser.add_argument(
+        "--sync-static",
+        action="store_true",
+        help="copy only changed static files into docs/ instead of recreating "
+        "it (implied by --incremental)",
+    )
+    _ = parser.add_argument(
+        "--checksum",
+        action="store_true",
+        help="when syncing static files, compare their contents rather than "
+        "size and modification time",
+    )
+    _ = parser.add_argument(
+        "--hardlink-static",
+        action="store_true",
+        help="when syncing static files, hard link them into docs/ instead of "
+        "copying",
+    )
+    _ = parser.add_argument(
+        "--check-links",
+        action="store_true",
+        help="fail the build if a page links to, or embeds, a path that is "
+        "neither a generated page nor a static file",
+    )
+    _ = parser.add_argument(
+        "--search-index",
+        action="store_true",
+        help="write a client-side search index of every page into docs/search/, "
+        "parsing only the pages that changed since the last build",
+    )
+    _ = parser.add_argument(
+        "--drafts",
+        action="store_true",
+        help="also generate pages marked as drafts in their front matter",
+    )
+    _ = parser.add_argument(
+        "--listings",
+        action="store_true",
+        help="generate the blog index, tag and archive pages under docs/blog/ "
+        "from the front matter of its posts",
+    )
+    _ = parser.add_argument(
+        "--page-size",
+        type=int,
+        default=DEFAULT_PAGE_SIZE,
+        metavar="N",
+        help="with --listings, list N posts on each page of the blog, numbered "
+        f"from the oldest (default: {DEFAULT_PAGE_SIZE})",
+    )
+    _ = parser.add_argument(
+        "--minify",
+        action="store_true",
+        help="strip the template's indentation, comments and other whitespace "
+        "that doesn't change the page, when it is compiled",
+    )
+    _ = parser.add_argument(
+        "--fingerprint",
+        action="store_true",
+        help="copy static files under names with their content hash, e.g. "
+        "index.3f9a1c2b.css, and link to them by those names",
+    )
+    _ = parser.add_argument(
+        "--precompress",
+        nargs="?",
+        const=",".join(DEFAULT_FORMATS),
+        default=None,
+        metavar="FORMATS",
+        help="also write .gz and/or .br siblings of every page and static file "
+        f"for the server to send, e.g. gzip,br (default: {','.join(DEFAULT_FORMATS)}"
+        "; br needs the brotli package)",
+    )
+    _ = parser.add_argument(
+        "--precompress-min-size",
+        type=parse_size,
+        default=DEFAULT_MIN_SIZE,
+        metavar="SIZE",
+        help=f"only compress files of at least SIZE (default: {DEFAULT_MIN_SIZE})",
+    )
+    _ = parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of worker processes to render pages with (0: one per CPU)",
+    )
+    _ = parser.add_argument(
+        "--fragment-cache",
+        action="store_true",
+        help="render repeated blocks once and reuse their HTML across pages; "
+        "only when rendering in one process",
+    )
+    _ = parser.add_argument(
+        "--fragment-cache-size",
+        type=int,
+        default=DEFAULT_MAX_ENTRIES,
+        metavar="N",
+        help=f"number of rendered blocks to keep (default: {DEFAULT_MAX_ENTRIES})",
+    )
+    _ = parser.add_argument(
+        "--fragment-cache-file",
+        default=None,
+        metavar="PATH",
+        help="load and save the fragment cache to PATH between builds "
+        "(implies --fragment-cache)",
+    )
+    _ = parser.add_argument(
+        "--highlight-cache-file",
+        nargs="?",
+        const=HIGHLIGHT_CACHE_PATH,
+        default=None,
+        metavar="PATH",
+        help="load and save highlighted code blocks to PATH between builds "
+        f"(default: {HIGHLIGHT_CACHE_PATH}); without it they are only reused "
+        "within a build",
+    )
+    _ = parser.add_argument(
+        "--cache-dir",
+        default=None,
+        metavar="DIR",
+        help="copy pages rendered from the same inputs before out of the render "
+        "cache in DIR, and add the rest to it",
+    )
+    _ = parser.add_argument(
+        "--cache-max-size",
+        type=parse_size,
+        default=DEFAULT_MAX_SIZE,
+        metavar="SIZE",
+        help="evict the least recently used pages from the render cache once "
+        "it grows past SIZE, e.g. 500M (default: 1G)",
+    )
+    _ = parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="build-profile.json",
+        default=None,
+        metavar="REPORT",
+        help="time each build stage per page and write a JSON report "
+        "(default: build-profile.json); pages are rendered serially",
+    )
+    _ = parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=20,
+        metavar="N",
+        help="number of slowest pages to list in the profile report",
+    )
+    _ = parser.add_argument(
+        "--cprofile-dir",
+        default=None,
+        metavar="DIR",
+        help="with --profile, also write a cProfile dump per page to DIR",
+    )
+    args = parser.parse_args(argv)
+    if args.explain:
+        args.incremental = True
+    if args.page_size < 1:
+        parser.error("argument --page-size: must be at least 1")
+    if args.precompress is not None:
+        try:
+            args.precompress = parse_formats(args.precompress)
+        except ValueError as e:
+            parser.error(f"argument --precompress: {e}")
+    return args
+
+
+def build(args) -> None:
+    base_path: str = args.base_path if args.base_path != "" else "/"
+    profiler: BuildProfiler | None = None
+    if args.profile is not None:
+        profiler = BuildProfiler(args.cprofile_dir)
+    cache: FragmentCache | None = None
+    if args.fragment_cache_file is not None:
+        cache = FragmentCache.load(args.fragment_cache_file, args.fragment_cache_size)
+    elif args.fragment_cache:
+        cache = FragmentCache(args.fragment_cache_size)
+    if cache is not None and args.jobs != 1 and profiler is None:
+        print("Fragment cache disabled, it is only shared when rendering with -j 1")
+        cache = None
+    highlight_cache = HighlightCache()
+    if args.highlight_cache_file is not None:
+        highlight_cache = HighlightCache.load(args.highlight_cache_file)
+    render_cache: RenderCache | None = None
+    if args.cache_dir is not None:
+        render_cache = RenderCache(args.cache_dir)
+    precompressor: Precompressor | None = None
+    if args.precompress is not None:
+        precompressor = Precompressor(args.precompress, args.precompress_min_size)
+    manifest: BuildManifest | None = None
+    graph: DependencyGraph | None = None
+    if args.incremental:
+        manifest = BuildManifest.load(MANIFEST_PATH)
+        graph = DependencyGraph.load(DEPENDENCY_GRAPH_PATH)
+    search_index: SearchIndex | None = None
+    if args.search_index:
+        search_index = SearchIndex.load(SEARCH_CACHE_DIR)
+    with timed_stage(profiler, "discover"):
+        plan = plan_build("content", "docs", "template.html")
+        # Only kept between builds when listings or drafts are asked for
+        keep_metadata: bool = args.listings or args.drafts
+        if keep_metadata:
+            metadata = MetadataIndex.load(METADATA_INDEX_PATH)
+        else:
+            metadata = MetadataIndex(METADATA_INDEX_PATH)
+        metadata.update(plan)
+        if keep_metadata:
+            metadata.save()
+        plan = metadata.publish(plan, args.drafts)
+        listings: list[ListingPage] = []
+        if args.listings:
+            listings = plan_listings(plan, metadata, "docs", page_size=args.page_size)
+    print(plan.summary())
+    print(metadata.summary())
+    renames: dict[str, str] | None = None
+    assets: AssetMap | None = None
+    if args.fingerprint:
+        with timed_stage(profiler, "fingerprint"):
+            fingerprints = FingerprintCache.load(FINGERPRINT_CACHE_PATH)
+            renames = fingerprint_directory("static", fingerprints)
+            fingerprints.save()
+            assets = asset_map(renames)
+        print(
+            f"Fingerprinted {len(renames)} static file(s), "
+            f"hashed {fingerprints.hashed}"
+        )
+    with timed_stage(profiler, "static_copy"):
+        if args.incremental or args.sync_static or renames is not None:
+            # Leave pages for the page stage to regenerate or remove
+            pages = plan.outputs()
+            if manifest is not None:
+                pages.update(manifest.outputs())
+            if search_index is not None:
+                pages.update(search_index.outputs("docs"))
+            pages.update(listing.dest for listing in listings)
+            _ = sync_directory(
+                "static",
+                "docs",
+                pages,
+                args.checksum,
+                args.hardlink_static,
+                precompressor=precompressor,
+                rename=renames,
+            )
+        else:
+            overwrite_directory_files("static", "docs", precompressor)
+    with timed_stage(profiler, "pages"):
+        if manifest is not None:
+            generate_pages_incremental(
+                "content",
+                "template.html",
+                "docs",
+                base_path,
+                manifest,
+                args.jobs,
+                profiler,
+                cache,
+                render_cache,
+                args.async_io,
+                plan=plan,
+                precompressor=precompressor,
+                minify=args.minify,
+                assets=assets,
+                graph=graph,
+                highlight_cache=highlight_cache,
+            )
+        elif args.jobs != 1 or profiler is not None or args.async_io:
+            generate_pages_parallel(
+                "content",
+                "template.html",
+                "docs",
+                base_path,
+                args.jobs,
+                profiler,
+                cache,
+                render_cache,
+                args.async_io,
+                plan=plan,
+                precompressor=precompressor,
+                minify=args.minify,
+                assets=assets,
+                highlight_cache=highlight_cache,
+            )
+        else:
+            generate_pages_recursive(
+                "content",
+                "template.html",
+                "docs",
+                base_path,
+                cache=cache,
+                render_cache=render_cache,
+                plan=plan,
+                precompressor=precompressor,
+                minify=args.minify,
+                assets=assets,
+                highlight_cache=highlight_cache,
+            )
+    if listings:
+        with timed_stage(profiler, "listings"):
+            stale: list[ListingPage] = []
+            for listing in listings:
+                inputs = ("template.html", *listing.sources, *listing.pages)
+                if graph is None or graph.invalidate_output(listing.dest, inputs):
+                    stale.append(listing)
+                elif precompressor is not None:
+                    precompressor.submit(listing.dest)
+            template = Template.load("template.html", base_path, args.minify, assets)
+            written = write_listings(stale, template, base_path, precompressor)
+        print(f"Generated {written} of {len(listings)} listing page(s)")
+    if graph is not None:
+        _ = graph.prune(plan.outputs() | {listing.dest for listing in listings})
+        graph.save()
+        if args.explain:
+            for line in graph.explain():
+                print(line)
+    if search_index is not None:
+        with timed_stage(profiler, "search_index"):
+            search_index.index_plan(plan, "docs")
+            search_index.write("docs", base_path, precompressor)
+            search_index.save()
+        print(search_index.summary())
+    if precompressor is not None:
+        with timed_stage(profiler, "precompress"):
+            precompressor.wait()
+        print(precompressor.summary())
+    if args.check_links:
+        with timed_stage(profiler, "check_links"):
+            link_index = LinkIndex(base_path)
+            for listing in listings:
+                link_index.add_target(path.relpath(listing.dest, "docs"))
+            link_index.check_plan(plan, "docs", "static")
+        print(link_index.summary())
+        if link_index.broken:
+            raise BrokenLinksError(link_index.broken)
+    if cache is not None:
+        print(cache.summary())
+        cache.save()
+    if highlight_cache.misses:
+        # Like the fragment cache, only used when rendering with -j 1
+        print(highlight_cache.summary())
+        highlight_cache.save()
+    if render_cache is not None:
+        evicted, _ = render_cache.prune(args.cache_max_size)
+        stats = render_cache.stats()
+        print(
+            f"Render cache {render_cache.cache_dir}: {stats.entries} page(s), "
+            f"{format_size(stats.size)}, evicted {evicted}"
+        )
+    if profiler is not None:
+        profiler.write_report(args.profile, args.profile_top)
+        print(f"Wrote build profile to {args.profile}")
+
+
 def main():
-    base_path = "/"
-    if sys.argv.__len__() > 1:
-        if sys.argv[1] != "":
-            base_path = sys.argv[1]
-    overwrite_directory_files("static", "docs")
-    generate_pages_recursive("content", "template.html", "docs", base_path)
+    if sys.argv[1:2] == ["cache"]:
+        cache_command(sys.argv[2:])
+        return
+    args = parse_args(sys.argv[1:])
+    try:
+        build(args)
+    except (PageGenerationError, MetadataError) as e:
+        for source_path, message in e.failures:
+            print(f"Error: {source_path}: {message}", file=sys.stderr)
+        sys.exit(1)
+    except BrokenLinksError as e:
+        for link in e.links:
+            kind = "image" if link.image else "link"
+            print(
+                f"Error: {link.source_path}:{link.line}: broken {kind} to {link.url}",
+                file=sys.stderr,
+            )
+        sys.exit(1)
 
 
 if __name__ == "__main__":
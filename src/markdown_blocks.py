@@ -1,10 +1,19 @@
+from collections.abc import Callable, Iterable, Iterator
 from enum import Enum
 import re
 
-from htmlnode import HTMLNode, ParentNode
+from fragment_cache import FragmentCache
+from highlight import LEXER_VERSION, HighlightCache, highlight
+from htmlnode import HTMLNode, LeafNode, ParentNode
 from markdown_manipulation import markdown_to_textnodes
+from template import AssetMap
 from textnode import TextNode, TextType, text_node_to_html_node
 
+# Possessive quantifiers, so a failed match never backtracks over long blocks.
+HEADING_PATTERN = re.compile(r"#{1,6}+\s.")
+OLIST_PATTERN = re.compile(r"1\. [^\n]*+(?:\n\d++\. [^\n]*+)*+\n?+")
+OLIST_NUMBER_PATTERN = re.compile(r"(\d+)\. ")
+
 
 class BlockType(Enum):
     """Enum for the type of markdown block."""
@@ -44,12 +53,47 @@ def markdown_to_blocks(markdown: str) -> list[str]:
     return blocks
 
 
+def iter_markdown_blocks(lines: Iterable[str]) -> Iterator[str]:
+    """Yield each block of Markdown from its lines, as they are read.
+
+    Produces the same blocks as markdown_to_blocks(), without needing the
+    whole document in memory: a block ends at an empty line, so only the
+    lines of the current block are held at once.
+
+    Args:
+        lines:
+            Lines of Markdown-formatted text, with or without their trailing
+            newline, e.g. an open file.
+
+    Returns:
+        An iterator of strings, where each string is a 'block' (paragraph)
+        of Markdown-formatted text.
+    """
+    block_lines: list[str] = []
+    for line in lines:
+        line = line.removesuffix("\n")
+        if line == "":
+            block: str = "\n".join(block_lines).strip()
+            block_lines = []
+            if block != "":
+                yield block
+            continue
+        block_lines.append(line)
+    block: str = "\n".join(block_lines).strip()
+    if block != "":
+        yield block
+
+
 def block_to_block_type(markdown: str) -> BlockType:
     """Match the Markdown 'block' (paragraph) to the type of Markdown.
 
     Determines if the incoming Markdown-formatted text is of type:
     Heading, Code, Quote, Unordered-List, Ordered-List, or plain-text.
 
+    The first character of the block picks the only type it could be, which
+    is then validated without backtracking, so long blocks classify in
+    linear time at worst.
+
     Args:
         markdown:
             String representing a 'block' (paragraph) of Markdown-formatted
@@ -60,21 +104,199 @@ def block_to_block_type(markdown: str) -> BlockType:
             BlockType enum indicating the type of Markdown contained in
             the block. Used as part of converting Markdown to HTML.
     """
-    if re.match(r"^#{1,6}\s.+", markdown):  # Heading
-        return BlockType.HEADING
-    if re.match(r"^```[\s\S]*?```$", markdown):  # Code
-        return BlockType.CODE
-    if re.match(r"^>([^\n]*\n>?)*", markdown):  # Blockquote
-        return BlockType.QUOTE
-    if re.match(r"^- (?:[^\n]*(?:\n- [^\n]*)*)", markdown):  # Unordered list
-        return BlockType.ULIST
-    if re.match(r"^1\. .*(?:\n(?:\d+)\. .*)*$", markdown):  # Ordered list
-        return BlockType.OLIST
+    match markdown[:1]:
+        case "#":  # Heading
+            if HEADING_PATTERN.match(markdown):
+                return BlockType.HEADING
+        case "`":  # Code
+            code: str = markdown.removesuffix("\n")
+            if len(code) >= 6 and code.startswith("```") and code.endswith("```"):
+                return BlockType.CODE
+        case ">":  # Blockquote
+            return BlockType.QUOTE
+        case "-":  # Unordered list
+            if markdown.startswith("- "):
+                return BlockType.ULIST
+        case "1":  # Ordered list
+            if OLIST_PATTERN.fullmatch(markdown):
+                return BlockType.OLIST
 
     return BlockType.PARAGRAPH  # Else, paragraph
 
 
-def markdown_to_html_node(markdown: str) -> ParentNode:
+def text_to_children(
+    text: str,
+    base_path: str = "/",
+    parse_inline: Callable[[str], list[TextNode]] = markdown_to_textnodes,
+    assets: AssetMap | None = None,
+) -> list[HTMLNode]:
+    """Parse inline Markdown in text into a list of LeafNode(s).
+
+    Args:
+        text:
+            Markdown-formatted string, with block-level syntax removed.
+        base_path:
+            Path prefix for root-relative link and image URLs.
+        parse_inline:
+            Function converting the text to TextNode(s). Only replaced to
+            instrument inline parsing, e.g. when profiling a build.
+        assets:
+            Optional AssetMap of fingerprinted static file URLs.
+
+    Returns:
+        A list of HTMLNode(s), in the order the text was arranged.
+    """
+    return [
+        text_node_to_html_node(text_node, base_path, assets)
+        for text_node in parse_inline(text)
+    ]
+
+
+def block_to_html_node(
+    block: str,
+    base_path: str = "/",
+    parse_inline: Callable[[str], list[TextNode]] = markdown_to_textnodes,
+    assets: AssetMap | None = None,
+    highlight_cache: HighlightCache | None = None,
+) -> ParentNode:
+    """Convert a single Markdown 'block' (paragraph) to a HTMLNode.
+
+    Args:
+        block:
+            String representing a 'block' of Markdown-formatted text,
+            from markdown_to_blocks() or iter_markdown_blocks().
+        base_path:
+            Path prefix for root-relative link and image URLs.
+        parse_inline:
+            Function converting text to TextNode(s), see text_to_children().
+        assets:
+            Optional AssetMap of fingerprinted static file URLs.
+        highlight_cache:
+            Optional HighlightCache of highlighted code, shared across pages.
+
+    Returns:
+        ParentNode instance for the block's HTML tag (e.g. "p", "h2", "ul"),
+        with child HTMLNode(s) for its content.
+    """
+    block_type: BlockType = block_to_block_type(block)
+    match block_type:
+        case BlockType.PARAGRAPH:
+            sanitised_block: str = block.replace("\n", " ")
+            para_children_nodes: list[HTMLNode] = text_to_children(
+                sanitised_block, base_path, parse_inline, assets
+            )
+            block_node: ParentNode = ParentNode("p", para_children_nodes, None)
+            return block_node
+        case BlockType.HEADING:
+            sanitised_block: str = block.replace("\n", " ")
+            strip_heading: str = sanitised_block.lstrip("# ")
+            para_children_nodes: list[HTMLNode] = text_to_children(
+                strip_heading, base_path, parse_inline, assets
+            )
+            # TODO: calculate heading_num from the first child TextNode, rather than the raw string
+            #       This is to allow for a generic function to be created, and only heading specific
+            #       behaviour to be present in this case.
+            heading_num: int = (sanitised_block.__len__() - strip_heading.__len__()) - 1
+            tag: str = f"h{heading_num}"
+            block_node: ParentNode = ParentNode(tag, para_children_nodes, None)
+            return block_node
+
+        case BlockType.CODE:
+            # Cut first & last line using string index of '\n'
+            text: str = block[block.find("\n") + 1 : block.rfind("\n") + 1]
+            # Language of a fenced block, e.g. ```python, if it is highlighted
+            first_line_end: int = block.find("\n")
+            info: list[str] = (
+                block[3:first_line_end].split() if first_line_end != -1 else []
+            )
+            if info:
+                highlighted: str | None = highlight(text, info[0], highlight_cache)
+                if highlighted is not None:
+                    attrs = {"class": f"language-{info[0].lower()}"}
+                    html_node: HTMLNode = LeafNode("code", highlighted, attrs)
+                    return ParentNode("pre", [html_node], None)
+            text_node: TextNode = TextNode(text, TextType.CODE, None)
+            html_node: HTMLNode = text_node_to_html_node(text_node)
+            block_node: ParentNode = ParentNode("pre", [html_node], None)
+            return block_node
+        case BlockType.QUOTE:
+            sanitised_block: str = block.replace("\n", " ")
+            sanitised_block: str = sanitised_block.replace("> ", "")
+            para_children_nodes: list[HTMLNode] = text_to_children(
+                sanitised_block, base_path, parse_inline, assets
+            )
+            block_node: ParentNode = ParentNode("blockquote", para_children_nodes, None)
+            return block_node
+        case BlockType.ULIST:
+            list_block: str = "".join(f"<li>{line}</li>" for line in block.splitlines())
+            list_block: str = list_block.replace("<li>- ", "<li>")
+            para_children_nodes: list[HTMLNode] = text_to_children(
+                list_block, base_path, parse_inline, assets
+            )
+            block_node: ParentNode = ParentNode("ul", para_children_nodes, None)
+            return block_node
+        case BlockType.OLIST:
+            starting_num: int = find_olist_occurrence(block, 0)
+            lines: list[str] = block.splitlines()
+            list_block: str = "".join(
+                f"<li>{lines[i].lstrip(f'{starting_num + i}. ')}</li>"
+                for i in range(lines.__len__())
+            )
+            para_children_nodes: list[HTMLNode] = text_to_children(
+                list_block, base_path, parse_inline, assets
+            )
+            block_node: ParentNode = ParentNode("ol", para_children_nodes, None)
+            return block_node
+
+
+def cached_block_to_html_node(
+    block: str,
+    base_path: str,
+    cache: FragmentCache,
+    assets: AssetMap | None = None,
+    highlight_cache: HighlightCache | None = None,
+) -> HTMLNode:
+    """Convert a block to a HTMLNode, reusing its HTML if already rendered.
+
+    Args:
+        block:
+            String representing a 'block' of Markdown-formatted text.
+        base_path:
+            Path prefix for root-relative link and image URLs.
+        cache:
+            FragmentCache to look the block's HTML up in, and store it to.
+        assets:
+            Optional AssetMap of fingerprinted static file URLs.
+        highlight_cache:
+            Optional HighlightCache of highlighted code, shared across pages.
+
+    Returns:
+        LeafNode with no tag, whose value is the block's rendered HTML.
+    """
+    # Blocks render differently with each AssetMap, told apart by its digest.
+    scope = f"{base_path}#{assets.digest}" if assets else base_path
+    block_type: BlockType = block_to_block_type(block)
+    # Code blocks are highlighted, so they change with the lexers.
+    if block_type == BlockType.CODE:
+        key = (f"{block_type.value}@{LEXER_VERSION}", scope, block)
+    else:
+        key = (block_type.value, scope, block)
+    html = cache.get(key)
+    if html is None:
+        html = block_to_html_node(
+            block, base_path, assets=assets, highlight_cache=highlight_cache
+        ).to_html()
+        cache.put(key, html)
+    return LeafNode(None, html)
+
+
+def markdown_to_html_node(
+    markdown: str,
+    base_path: str = "/",
+    cache: FragmentCache | None = None,
+    assets: AssetMap | None = None,
+    highlight_cache: HighlightCache | None = None,
+) -> ParentNode:
     """Process Markdown-formatted string to HTMLNode(s) representing Markdown elements.
 
     Generates a ParentNode as a HTML "div" tag wrapper for HTMLNode(s) representing
@@ -83,98 +305,82 @@ def markdown_to_html_node(markdown: str) -> ParentNode:
     Args:
         markdown:
             Markdown-formatted string containing the full text to be converted.
+        base_path:
+            Path prefix for root-relative link and image URLs.
+        cache:
+            Optional FragmentCache of rendered blocks, shared across pages.
+        assets:
+            Optional AssetMap of fingerprinted static file URLs.
+        highlight_cache:
+            Optional HighlightCache of highlighted code, shared across pages.
 
     Returns:
         ParentNode instance as a '<div> tag wrapper, with necessary child HTMLNode(s)
         representing the Markdown elements in the string input.
     """
     blocks: list[str] = markdown_to_blocks(markdown)
-    children_nodes: list[HTMLNode] = []
-    for block in blocks:
-        block_type: BlockType = block_to_block_type(block)
-        match block_type:
-            # Functions:
-            # - Sanitising function: tuple: string to replace, string to replace with
-            # - text_to_children(text, process_inline_markdown = True): get TextNodes, generate children
-            case BlockType.PARAGRAPH:
-                sanitised_block: str = block.replace("\n", " ")
-                para_children_nodes: list[HTMLNode] = []
-                text_nodes: list[TextNode] = markdown_to_textnodes(sanitised_block)
-                for text_node in text_nodes:
-                    para_children_nodes.append(text_node_to_html_node(text_node))
-                block_node: ParentNode = ParentNode("p", para_children_nodes, None)
-                children_nodes.append(block_node)
-            case BlockType.HEADING:
-                sanitised_block: str = block.replace("\n", " ")
-                strip_heading: str = sanitised_block.lstrip("# ")
-                para_children_nodes: list[HTMLNode] = []
-                text_nodes: list[TextNode] = markdown_to_textnodes(strip_heading)
-                # TODO: calculate heading_num from the first child TextNode, rather than the raw string
-                #       This is to allow for a generic function to be created, and only heading specific
-                #       behaviour to be present in this case.
-                heading_num: int = (
-                    sanitised_block.__len__() - strip_heading.__len__()
-                ) - 1
-                tag: str = f"h{heading_num}"
-                for text_node in text_nodes:
-                    para_children_nodes.append(text_node_to_html_node(text_node))
-                block_node: ParentNode = ParentNode(tag, para_children_nodes, None)
-                children_nodes.append(block_node)
-
-            case BlockType.CODE:
-                para_children_nodes: list[HTMLNode] = []
-                # Cut first & last line using string index of '\n'
-                text: str = block[block.find("\n") + 1 : block.rfind("\n") + 1]
-                text_node: TextNode = TextNode(text, TextType.CODE, None)
-                html_node: HTMLNode = text_node_to_html_node(text_node)
-                block_node: ParentNode = ParentNode("pre", [html_node], None)
-                children_nodes.append(block_node)
-            case BlockType.QUOTE:
-                sanitised_block: str = block.replace("\n", " ")
-                sanitised_block: str = sanitised_block.replace("> ", "")
-                para_children_nodes: list[HTMLNode] = []
-                text_nodes: list[TextNode] = markdown_to_textnodes(sanitised_block)
-                for text_node in text_nodes:
-                    para_children_nodes.append(text_node_to_html_node(text_node))
-                block_node: ParentNode = ParentNode(
-                    "blockquote", para_children_nodes, None
-                )
-                children_nodes.append(block_node)
-            case BlockType.ULIST:
-                list_block: str = "".join(
-                    f"<li>{line}</li>" for line in block.splitlines()
-                )
-                list_block: str = list_block.replace("<li>- ", "<li>")
-                para_children_nodes: list[HTMLNode] = []
-                text_nodes: list[TextNode] = markdown_to_textnodes(list_block)
-                for text_node in text_nodes:
-                    para_children_nodes.append(text_node_to_html_node(text_node))
-                block_node: ParentNode = ParentNode("ul", para_children_nodes, None)
-                children_nodes.append(block_node)
-            case BlockType.OLIST:
-                starting_num: int = find_olist_occurrence(block, 0)
-                lines: list[str] = block.splitlines()
-                list_block: str = "".join(
-                    f"<li>{lines[i].lstrip(f'{starting_num + i}. ')}</li>"
-                    for i in range(lines.__len__())
-                )
-                para_children_nodes: list[HTMLNode] = []
-                text_nodes: list[TextNode] = markdown_to_textnodes(list_block)
-                for text_node in text_nodes:
-                    para_children_nodes.append(text_node_to_html_node(text_node))
-                block_node: ParentNode = ParentNode("ol", para_children_nodes, None)
-                children_nodes.append(block_node)
-
+    if cache is None:
+        children_nodes: list[HTMLNode] = [
+            block_to_html_node(
+                block, base_path, assets=assets, highlight_cache=highlight_cache
+            )
+            for block in blocks
+        ]
+    else:
+        children_nodes = [
+            cached_block_to_html_node(block, base_path, cache, assets, highlight_cache)
+            for block in blocks
+        ]
     parent_node: ParentNode = ParentNode(tag="div", children=children_nodes, props=None)
     return parent_node
 
 
+def iter_markdown_html(
+    lines: Iterable[str],
+    base_path: str = "/",
+    cache: FragmentCache | None = None,
+    assets: AssetMap | None = None,
+    highlight_cache: HighlightCache | None = None,
+) -> Iterator[str]:
+    """Stream Markdown lines to HTML, one block at a time.
+
+    Produces the same HTML as markdown_to_html_node(...).to_html(), but each
+    block is converted and yielded before the next one is read, so memory is
+    bounded by the largest block rather than the whole document.
+
+    Args:
+        lines:
+            Lines of Markdown-formatted text, e.g. an open file.
+        base_path:
+            Path prefix for root-relative link and image URLs.
+        cache:
+            Optional FragmentCache of rendered blocks, shared across pages.
+        assets:
+            Optional AssetMap of fingerprinted static file URLs.
+        highlight_cache:
+            Optional HighlightCache of highlighted code, shared across pages.
+
+    Returns:
+        An iterator of HTML string chunks.
+    """
+    yield "<div>"
+    for block in iter_markdown_blocks(lines):
+        if cache is None:
+            yield from block_to_html_node(
+                block, base_path, assets=assets, highlight_cache=highlight_cache
+            ).iter_html()
+        else:
+            yield cached_block_to_html_node(
+                block, base_path, cache, assets, highlight_cache
+            ).to_html()
+    yield "</div>"
+
+
 def find_olist_occurrence(text: str, index: int = 0) -> int:
-    num: int = 0
-    matches: list[str] = re.findall(r"(\d+)\. ", text)
-    if matches[index] is not None:
-        num = int(matches[index])
-    return num
+    for i, match in enumerate(OLIST_NUMBER_PATTERN.finditer(text)):
+        if i == index:
+            return int(match.group(1))
+    raise IndexError("list index out of range")
 
 
 # def str_replace(old_text, new_text, occurrences: int) -> str:
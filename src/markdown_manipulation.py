@@ -1,6 +1,18 @@
+from collections.abc import Iterable
 import re
 from textnode import TextNode, TextType
 
+IMAGE_PATTERN = re.compile(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)")
+LINK_PATTERN = re.compile(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)")
+# Find title (H1). Alt is for titles of one char.
+TITLE_PATTERN = re.compile(r"^# (\S.*\S|\S)\s*$", re.MULTILINE)
+DELIMITER_PATTERN = re.compile(r"\*\*|_|`")
+# A "!" directly before a link always makes it an image, which is tried first,
+# so unlike extract_markdown_links() no lookbehind is needed for links.
+IMAGE_OR_LINK_PATTERN = re.compile(r"(!?)\[([^\[\]]*)\]\(([^\(\)]*)\)")
+# Enum member lookups are slow enough to show up in the per-match loop.
+_TEXT, _IMAGE, _LINK = TextType.TEXT, TextType.IMAGE, TextType.LINK
+
 
 def split_nodes_delimiter(
     old_nodes: list[TextNode], delimiter: str, text_type: TextType
@@ -145,8 +157,7 @@ def extract_markdown_images(markdown: str) -> list[tuple[str, str]]:
         A list of tuples(s) containing the alt_text and URL to any links in
         markdown format in the given string input.
     """
-    pattern = r"!\[([^\[\]]*)\]\(([^\(\)]*)\)"
-    matches = re.findall(pattern, markdown)
+    matches = IMAGE_PATTERN.findall(markdown)
     return matches
 
 
@@ -168,8 +179,7 @@ def extract_markdown_links(markdown: str) -> list[tuple[str, str]]:
         A list of tuples(s) containing the alt_text and URL to any images in
         markdown format in the given string input.
     """
-    pattern: str = r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)"
-    matches = re.findall(pattern, markdown)
+    matches = LINK_PATTERN.findall(markdown)
     return matches
 
 
@@ -190,22 +200,51 @@ def extract_markdown_title(markdown: str) -> str:
         ValueError: Expects to find one, and only one, title.
     """
 
-    # Find title (H1). Alt is for titles of one char.
-    pattern: str = r"^# (\S.*\S|\S)\s*$"
-    matches = re.search(pattern, markdown, re.MULTILINE)
+    matches = TITLE_PATTERN.search(markdown)
     if matches is None:
         raise ValueError("No title found in the markdown provided.")
     return matches.group(1)
 
 
+def extract_markdown_title_from_lines(lines: Iterable[str]) -> str:
+    """Finds the Markdown title (H1) in the lines, reading no further than it.
+
+    Line-by-line equivalent of extract_markdown_title(), for documents too
+    large to read into a single string.
+
+    Args:
+        lines:
+            Lines of Markdown-formatted text, e.g. an open file.
+
+    Returns:
+        Title text, stripped of the preceeding '# ' and any
+        preceeding or trailing whitespace.
+
+    Raises:
+        ValueError: Expects to find one, and only one, title.
+    """
+    for line in lines:
+        if not line.startswith("# "):
+            continue
+        matches = TITLE_PATTERN.match(line)
+        if matches is not None:
+            return matches.group(1)
+    raise ValueError("No title found in the markdown provided.")
+
+
 def markdown_to_textnodes(markdown: str) -> list[TextNode]:
     """Converts (Markdown) string into list of TextNode(s) of correct TextType.
 
-    Runs the string through the following functions to process it:
+    Walks the string once, left to right, producing the same TextNode(s) as
+    running it through the following functions in order:
     - split_nodes_delimiter: bold, italic, code
     - split_nodes_image: image
     - split_nodes_link: link
 
+    Delimiters keep the same precedence as that pipeline: "**" always splits,
+    "_" splits outside of bold text, and "`" splits outside of bold and italic
+    text. Images and links are only found in the remaining plain text.
+
     The purpose of this function is to convert blocks of Markdown into TextNode(s)
     and then from there into HTMLNode(s).
 
@@ -218,13 +257,73 @@ def markdown_to_textnodes(markdown: str) -> list[TextNode]:
     Returns:
         A list of TextNode(s) of correct TextType, in sequential order to how
         the text was arranged in the string input.
+
+    Raises:
+        ValueError: A bold, italic, or code section is not closed.
     """
 
-    nodes = [TextNode(markdown, TextType.TEXT, None)]
-    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
-    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
-    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
-    nodes = split_nodes_image(nodes)
-    nodes = split_nodes_link(nodes)
+    nodes: list[TextNode] = []
+    bold: bool = False
+    italic: bool = False
+    code: bool = False
+    start: int = 0
+    for match in DELIMITER_PATTERN.finditer(markdown):
+        delimiter: str = match.group()
+        pos: int = match.start()
+        if delimiter == "**":
+            if bold:
+                if pos > start:
+                    nodes.append(TextNode(markdown[start:pos], TextType.BOLD))
+            else:
+                if italic or code:
+                    raise ValueError("invalid markdown, formatted section not closed")
+                _append_text_nodes(nodes, markdown, start, pos)
+            bold = not bold
+            start = pos + 2
+        elif bold:
+            continue  # Italic and code delimiters are literal in bold text
+        elif delimiter == "_":
+            if italic:
+                if pos > start:
+                    nodes.append(TextNode(markdown[start:pos], TextType.ITALIC))
+            else:
+                if code:
+                    raise ValueError("invalid markdown, formatted section not closed")
+                _append_text_nodes(nodes, markdown, start, pos)
+            italic = not italic
+            start = pos + 1
+        elif not italic:  # Code delimiter, literal in italic text
+            if code:
+                if pos > start:
+                    nodes.append(TextNode(markdown[start:pos], TextType.CODE))
+            else:
+                _append_text_nodes(nodes, markdown, start, pos)
+            code = not code
+            start = pos + 1
+    if bold or italic or code:
+        raise ValueError("invalid markdown, formatted section not closed")
+    _append_text_nodes(nodes, markdown, start, len(markdown))
 
     return nodes
+
+
+def _append_text_nodes(
+    nodes: list[TextNode], markdown: str, start: int, end: int
+) -> None:
+    """Appends markdown[start:end] to nodes, split into text, images, and links.
+
+    Matches are searched for in place between start and end, so the text is
+    never re-split or copied more than once.
+    """
+    if start >= end:
+        return
+    append = nodes.append
+    for match in IMAGE_OR_LINK_PATTERN.finditer(markdown, start, end):
+        match_start, match_end = match.span()
+        if match_start > start:
+            append(TextNode(markdown[start:match_start], _TEXT))
+        bang, text, url = match.groups()
+        append(TextNode(text, _IMAGE if bang else _LINK, url))
+        start = match_end
+    if start < end:
+        append(TextNode(markdown[start:end], _TEXT))
@@ -0,0 +1,228 @@
+"""Module for indexing the metadata of every page as it is discovered.
+
+MetadataIndex holds the PageMetadata of each planned page: its title and
+the date, tags, draft and slug from its front matter. Each page is read
+only as far as its front matter and title, and the index is saved to
+.metadata-index.json with the size and modification time of each source,
+so pages that didn't change aren't read again. Listing pages are then
+generated from the index alone, see listings.py.
+
+Typical usage example:
+
+metadata = MetadataIndex.load(".metadata-index.json")
+metadata.update(plan)
+metadata.save()
+plan = metadata.publish(plan)
+"""
+
+import json
+from os import makedirs, path, replace
+
+from build_plan import BuildPlan, PlannedPage
+from front_matter import PageMetadata, read_page_metadata
+
+METADATA_INDEX_PATH = ".metadata-index.json"
+METADATA_INDEX_VERSION = 1
+
+
+class MetadataError(ValueError):
+    """Raised when the metadata of one or more pages is malformed.
+
+    Attributes:
+        failures: List of (source path, error message) tuples, in the order
+                  the pages were planned.
+    """
+
+    def __init__(self, failures: list[tuple[str, str]]) -> None:
+        self.failures: list[tuple[str, str]] = failures
+        source_path, message = failures[0]
+        summary = f"{source_path}: {message}"
+        if len(failures) > 1:
+            summary += f" (and {len(failures) - 1} more)"
+        super().__init__(summary)
+
+
+class MetadataIndex:
+    """In-memory and on-disk index of the metadata of every page.
+
+    Attributes:
+        index_path: File path the index is loaded from and saved to.
+        entries: Dictionary keyed by source path, of the size and
+                 modification time of the source when it was read, and its
+                 PageMetadata.
+        read: Number of pages read, because they weren't indexed or had
+              changed, since the index was loaded.
+        drafts: Number of draft pages left out by the last publish().
+    """
+
+    def __init__(
+        self,
+        index_path: str,
+        entries: dict[str, tuple[int, int, PageMetadata]] | None = None,
+    ) -> None:
+        self.index_path: str = index_path
+        self.entries: dict[str, tuple[int, int, PageMetadata]] = (
+            entries if entries else {}
+        )
+        self.read: int = 0
+        self.drafts: int = 0
+        self._changed: bool = False
+
+    @classmethod
+    def load(cls, index_path: str = METADATA_INDEX_PATH) -> "MetadataIndex":
+        """Loads the index from disk.
+
+        A missing, unreadable, or outdated file results in an empty index,
+        which makes every page be read again.
+        """
+        try:
+            with open(index_path, "r") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return cls(index_path)
+        if not isinstance(data, dict) or data.get("version") != METADATA_INDEX_VERSION:
+            return cls(index_path)
+        entries: dict[str, tuple[int, int, PageMetadata]] = {}
+        try:
+            for source_path, fields in data.get("pages", {}).items():
+                size, mtime_ns, title, date, tags, draft, slug = fields
+                metadata = PageMetadata(title, date, tuple(tags), draft, slug)
+                entries[source_path] = (size, mtime_ns, metadata)
+        except (TypeError, ValueError):
+            return cls(index_path)
+        return cls(index_path, entries)
+
+    def update(self, plan: BuildPlan) -> None:
+        """Indexes every planned page, dropping pages that no longer exist.
+
+        Raises:
+            MetadataError: If any page's front matter is malformed; lists
+                every failing source path in plan order.
+        """
+        failures: list[tuple[str, str]] = []
+        for page in plan.pages:
+            try:
+                _ = self.index(page)
+            except MetadataError as e:
+                failures.extend(e.failures)
+        planned = {page.source for page in plan.pages}
+        for source_path in list(self.entries):
+            if source_path not in planned:
+                del self.entries[source_path]
+                self._changed = True
+        if failures:
+            raise MetadataError(failures)
+
+    def index(self, page: PlannedPage) -> PageMetadata:
+        """Indexes a page, unless it is indexed and didn't change since.
+
+        Raises:
+            FileNotFoundError: If the source file doesn't exist.
+            MetadataError: If the page's front matter is malformed.
+        """
+        entry = self.entries.get(page.source)
+        if entry is not None and entry[:2] == (page.size, page.mtime_ns):
+            return entry[2]
+        try:
+            metadata = read_page_metadata(page.source)
+        except ValueError as e:
+            message = str(e).removeprefix(f"{page.source}: ")
+            raise MetadataError([(page.source, message)])
+        self.entries[page.source] = (page.size, page.mtime_ns, metadata)
+        self.read += 1
+        self._changed = True
+        return metadata
+
+    def metadata(self, source_path: str) -> PageMetadata:
+        """Returns the PageMetadata of an indexed page."""
+        return self.entries[source_path][2]
+
+    def publish(self, plan: BuildPlan, drafts: bool = False) -> BuildPlan:
+        """Applies the indexed metadata to a plan.
+
+        Draft pages are left out, unless drafts is set. A page with a slug
+        is generated under it instead of its own name: the slug replaces
+        the directory of an "index.md", or the name of any other file.
+
+        Args:
+            plan: BuildPlan of the indexed pages.
+            drafts: Whether to keep draft pages.
+
+        Returns:
+            BuildPlan of the pages to publish.
+
+        Raises:
+            MetadataError: If the site's own index page has a slug, or two
+                pages would be generated to the same path.
+        """
+        dest_dirs: list[str] = list(plan.dest_dirs)
+        known_dirs: set[str] = set(dest_dirs)
+        pages = []
+        dests: set[str] = set()
+        self.drafts = 0
+        for page in plan.pages:
+            metadata = self.metadata(page.source)
+            if metadata.draft and not drafts:
+                self.drafts += 1
+                continue
+            if metadata.slug != "":
+                dest_dir, name = path.split(page.dest)
+                if name != "index.html":
+                    dest = path.join(dest_dir, metadata.slug + ".html")
+                elif dest_dir != plan.dest_dirs[0]:
+                    dest_dir = path.join(path.dirname(dest_dir), metadata.slug)
+                    dest = path.join(dest_dir, name)
+                else:
+                    raise MetadataError(
+                        [(page.source, "the site's index can't have a slug")]
+                    )
+                if dest_dir not in known_dirs:
+                    dest_dirs.append(dest_dir)
+                    known_dirs.add(dest_dir)
+                page = page._replace(dest=dest)
+            if page.dest in dests:
+                raise MetadataError(
+                    [(page.source, f"another page is generated to {page.dest}")]
+                )
+            dests.add(page.dest)
+            pages.append(page)
+        return BuildPlan(tuple(pages), tuple(dest_dirs))
+
+    def save(self) -> None:
+        """Writes the index to disk, through a temporary file, if it changed.
+
+        Raises:
+            IOError: If it fails to write the index.
+        """
+        if not self._changed and path.exists(self.index_path):
+            return
+        index_dir = path.dirname(self.index_path)
+        if index_dir != "":
+            makedirs(index_dir, exist_ok=True)
+        tmp_path = f"{self.index_path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(
+                    {
+                        "version": METADATA_INDEX_VERSION,
+                        "pages": {
+                            source_path: [size, mtime_ns, *metadata]
+                            for source_path, (size, mtime_ns, metadata) in sorted(
+                                self.entries.items()
+                            )
+                        },
+                    },
+                    f,
+                    separators=(",", ":"),
+                )
+            replace(tmp_path, self.index_path)
+        except IOError:
+            raise IOError(f"Error writing to {self.index_path}")
+        self._changed = False
+
+    def summary(self) -> str:
+        """Returns a line of index statistics for the build output."""
+        return (
+            f"Indexed metadata of {len(self.entries)} page(s), read {self.read}, "
+            f"left out {self.drafts} draft(s)"
+        )
@@ -0,0 +1,200 @@
+"""Module for timing each stage of a build, per page.
+
+A profiled page is generated by generate_page() itself, caches included,
+which records the time spent in each stage:
+
+- cache: looking the page up in the render cache, copying it out of it,
+  or storing it in it
+- read: reading the Markdown source and its front matter
+- render: building the HTMLNode tree, using the fragment cache
+- write: filling the template, serializing the tree and writing the page,
+  which for a streamed page includes reading and rendering it
+
+For a breakdown by function, such as of inline parsing, pass a
+cprofile_dir to get a cProfile dump of every page.
+
+Build-wide stages, such as copying the static files, are timed with
+BuildProfiler.stage(). The report is written as JSON.
+
+Typical usage example:
+
+profiler = BuildProfiler()
+with profiler.stage("static_copy"):
+    copy_files("static", "docs")
+generate = partial(generate_page, source_path, template_path, dest_path, base_path)
+profiler.profile_page(source_path, dest_path, generate)
+profiler.write_report("build-profile.json")
+"""
+
+from collections.abc import Callable, Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+import cProfile
+import json
+from os import makedirs, path
+from time import perf_counter
+
+PAGE_STAGES = ("cache", "read", "render", "write")
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Returns the nearest-rank percentile of values, or 0.0 if empty."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, round(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class PageProfile:
+    """Seconds spent in each stage of generating a single page.
+
+    Attributes:
+        source_path: File path of the Markdown source.
+        dest_path: File path of the generated HTML file.
+        stages: Dictionary of stage name to seconds spent in it.
+    """
+
+    def __init__(self, source_path: str, dest_path: str) -> None:
+        self.source_path: str = source_path
+        self.dest_path: str = dest_path
+        self.stages: dict[str, float] = {stage: 0.0 for stage in PAGE_STAGES}
+        self._lap_start: float = perf_counter()
+
+    @property
+    def total(self) -> float:
+        """Total seconds spent generating the page."""
+        return sum(self.stages.values())
+
+    def lap(self, stage: str) -> None:
+        """Adds the time since the last lap, or since the page was profiled
+        from, to stage."""
+        now = perf_counter()
+        self.stages[stage] += now - self._lap_start
+        self._lap_start = now
+
+    def to_dict(self) -> dict[str, object]:
+        return {
+            "source": self.source_path,
+            "dest": self.dest_path,
+            "total": self.total,
+            "stages": self.stages,
+        }
+
+
+class BuildProfiler:
+    """Collects per-page and build-wide stage timings for a build.
+
+    Attributes:
+        pages: List of PageProfile, one per generated page.
+        build_stages: Dictionary of build-wide stage name to seconds.
+        cprofile_dir: Optional directory to write a cProfile dump per page to.
+    """
+
+    def __init__(self, cprofile_dir: str | None = None) -> None:
+        self.pages: list[PageProfile] = []
+        self.build_stages: dict[str, float] = {}
+        self.cprofile_dir: str | None = cprofile_dir
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Times the enclosed block as a build-wide stage."""
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = perf_counter() - start
+            self.build_stages[name] = self.build_stages.get(name, 0.0) + elapsed
+
+    def profile_page(
+        self,
+        from_path: str,
+        dest_path: str,
+        generate: Callable[..., None],
+    ) -> PageProfile:
+        """Generates a page, timing each stage.
+
+        Args:
+            from_path: File path to get the Markdown-formatted text from.
+            dest_path: File path to write the HTML file to.
+            generate: Function generating the page, e.g. a partial of
+                      generate_page(), called with the PageProfile to record
+                      its stages in as its profile keyword argument.
+
+        Returns:
+            PageProfile of the page, also appended to self.pages.
+
+        Raises:
+            Whatever generate raises.
+        """
+        page = PageProfile(from_path, dest_path)
+        profile: cProfile.Profile | None = None
+        if self.cprofile_dir is not None:
+            profile = cProfile.Profile()
+            profile.enable()
+        try:
+            generate(profile=page)
+        finally:
+            if profile is not None:
+                profile.disable()
+                self._dump_cprofile(profile, dest_path)
+        self.pages.append(page)
+        return page
+
+    def _dump_cprofile(self, profile: cProfile.Profile, dest_path: str) -> None:
+        assert self.cprofile_dir is not None
+        makedirs(self.cprofile_dir, exist_ok=True)
+        name = path.normpath(dest_path).replace(path.sep, "__")
+        profile.dump_stats(path.join(self.cprofile_dir, f"{name}.prof"))
+
+    def report(self, top: int = 20) -> dict[str, object]:
+        """Summarises the timings.
+
+        Args:
+            top: Number of slowest pages to list.
+
+        Returns:
+            Dictionary with stage totals, per-page percentiles for the total
+            and each stage, and the slowest pages.
+        """
+        stage_totals = {
+            stage: sum(p.stages[stage] for p in self.pages) for stage in PAGE_STAGES
+        }
+        percentiles: dict[str, dict[str, float]] = {}
+        for stage in ("total",) + PAGE_STAGES:
+            values = [
+                p.total if stage == "total" else p.stages[stage] for p in self.pages
+            ]
+            percentiles[stage] = {
+                f"p{pct}": percentile(values, pct) for pct in PERCENTILES
+            }
+            percentiles[stage]["max"] = max(values, default=0.0)
+        slowest = sorted(self.pages, key=lambda p: p.total, reverse=True)[:top]
+        return {
+            "pages": len(self.pages),
+            "build_stages": self.build_stages,
+            "page_stage_totals": stage_totals,
+            "page_percentiles": percentiles,
+            "slowest_pages": [p.to_dict() for p in slowest],
+        }
+
+    def write_report(self, report_path: str, top: int = 20) -> None:
+        """Writes report() to report_path as JSON.
+
+        Raises:
+            IOError: If it fails to write the report.
+        """
+        try:
+            with open(report_path, "w") as f:
+                json.dump(self.report(top), f, indent=2)
+        except IOError:
+            raise IOError(f"Error writing to {report_path}")
+
+
+def timed_stage(
+    profiler: BuildProfiler | None, name: str
+) -> AbstractContextManager[None]:
+    """Returns profiler.stage(name), or a no-op context if not profiling."""
+    if profiler is None:
+        return nullcontext()
+    return profiler.stage(name)
@@ -0,0 +1,226 @@
+"""Module for caching rendered pages on disk, shared between builds.
+
+The cache is content-addressed: each page is stored under the hash of its
+Markdown source, the compiled template, the base_path its links are
+rewritten with, the map of fingerprinted static files, and the version of
+the generator's own rendering code. A build from a clean
+checkout, such as in CI, can then copy every unchanged page out of the
+cache instead of parsing it.
+
+Each hit refreshes the entry's modification time, so prune() evicts the
+least recently used pages once the cache grows past its size limit.
+
+Typical usage example:
+
+cache = RenderCache(".render-cache")
+key = cache.key(source_path, template, base_path)
+if not cache.fetch(key, dest_path):
+    ...  # render the page to dest_path
+    cache.store(key, dest_path)
+cache.prune(1024**3)
+"""
+
+from argparse import ArgumentParser
+from datetime import datetime
+from functools import cache
+from hashlib import sha256
+from os import getpid, makedirs, path, remove, replace, stat_result, utime
+import sys
+
+from build_manifest import hash_file
+from file_manipulation import copy_file_fast, remove_empty_dirs, scan_tree
+from sizes import format_size, parse_size
+from template import Template
+
+RENDER_CACHE_DIR = ".render-cache"
+DEFAULT_MAX_SIZE = 1024**3
+
+# Modules whose code decides the HTML of a page
+RENDERING_MODULES = (
+    "front_matter",
+    "generate_files",
+    "highlight",
+    "htmlnode",
+    "markdown_blocks",
+    "markdown_manipulation",
+    "template",
+    "textnode",
+)
+
+
+@cache
+def generator_version() -> str:
+    """Returns a hash of the source of the rendering modules.
+
+    Any change to how pages are rendered changes the version, so pages
+    cached by an older generator are never reused.
+    """
+    digest = sha256()
+    for module in RENDERING_MODULES:
+        module_path = path.join(path.dirname(__file__), f"{module}.py")
+        digest.update(hash_file(module_path).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class RenderCacheStats:
+    """Summary of the entries in a render cache.
+
+    Attributes:
+        entries: Number of cached pages.
+        size: Total size of the cached pages, in bytes.
+        oldest: Last access time of the least recently used page, or None.
+        newest: Last access time of the most recently used page, or None.
+    """
+
+    def __init__(self, files: dict[str, stat_result]) -> None:
+        self.entries: int = len(files)
+        self.size: int = sum(st.st_size for st in files.values())
+        times = [st.st_mtime for st in files.values()]
+        self.oldest: float | None = min(times, default=None)
+        self.newest: float | None = max(times, default=None)
+
+
+class RenderCache:
+    """Directory of rendered pages, keyed by the hash of their inputs.
+
+    Attributes:
+        cache_dir: Directory path holding the cached pages.
+    """
+
+    def __init__(self, cache_dir: str = RENDER_CACHE_DIR) -> None:
+        self.cache_dir: str = cache_dir
+
+    def key(self, source_path: str, template: Template, base_path: str) -> str:
+        """Returns the cache key of a page.
+
+        The template's digest only changes with the base_path if the template
+        itself has root-relative links, so the base_path is part of the key.
+
+        Args:
+            source_path: File path of the Markdown source.
+            template: Template compiled for the build's base_path.
+            base_path: Path prefix for root-relative links in the page.
+
+        Raises:
+            FileNotFoundError: If the source file doesn't exist.
+        """
+        digest = sha256()
+        for part in (
+            generator_version(),
+            template.digest,
+            base_path,
+            template.assets.digest,
+            hash_file(source_path),
+        ):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def entry_path(self, key: str) -> str:
+        """Returns the file path a page with the given key is cached at."""
+        return path.join(self.cache_dir, key[:2], f"{key[2:]}.html")
+
+    def fetch(self, key: str, dest_path: str) -> bool:
+        """Copies the cached page for key to dest_path, if there is one.
+
+        Returns:
+            True if the page was cached and copied, False otherwise.
+        """
+        entry_path = self.entry_path(key)
+        try:
+            utime(entry_path)
+            makedirs(path.dirname(dest_path), exist_ok=True)
+            copy_file_fast(entry_path, dest_path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def store(self, key: str, page_path: str) -> None:
+        """Caches the rendered page at page_path under key.
+
+        The page is copied to a temporary file and renamed into place, so
+        concurrent builds never read a partial entry.
+        """
+        entry_path = self.entry_path(key)
+        makedirs(path.dirname(entry_path), exist_ok=True)
+        tmp_path = f"{entry_path}.{getpid()}.tmp"
+        try:
+            copy_file_fast(page_path, tmp_path)
+            replace(tmp_path, entry_path)
+        except OSError:
+            if path.exists(tmp_path):
+                remove(tmp_path)
+            raise
+
+    def entries(self) -> dict[str, stat_result]:
+        """Returns the stat of every cached page, keyed by file path."""
+        if not path.isdir(self.cache_dir):
+            return {}
+        files, _ = scan_tree(self.cache_dir)
+        return {path.join(self.cache_dir, name): st for name, st in files.items()}
+
+    def stats(self) -> RenderCacheStats:
+        """Returns a summary of the cached pages."""
+        return RenderCacheStats(self.entries())
+
+    def prune(self, max_size: int) -> tuple[int, int]:
+        """Evicts the least recently used pages until the cache fits max_size.
+
+        Args:
+            max_size: Size in bytes the cache should fit in.
+
+        Returns:
+            Tuple of the number of pages evicted and the bytes freed.
+        """
+        entries = self.entries()
+        size: int = sum(st.st_size for st in entries.values())
+        evicted: int = 0
+        freed: int = 0
+        for entry_path, st in sorted(entries.items(), key=lambda e: e[1].st_mtime_ns):
+            if size <= max_size:
+                break
+            try:
+                remove(entry_path)
+            except FileNotFoundError:
+                pass  # Evicted by a concurrent build
+            remove_empty_dirs(path.dirname(entry_path), self.cache_dir)
+            size -= st.st_size
+            freed += st.st_size
+            evicted += 1
+        return evicted, freed
+
+
+def cache_command(argv: list[str]) -> None:
+    """Runs the "cache stats" and "cache prune" subcommands."""
+    parser = ArgumentParser(
+        prog="main.py cache", description="Inspect or prune the render cache."
+    )
+    _ = parser.add_argument("command", choices=("stats", "prune"))
+    _ = parser.add_argument(
+        "--cache-dir",
+        default=RENDER_CACHE_DIR,
+        metavar="DIR",
+        help=f"render cache directory (default: {RENDER_CACHE_DIR})",
+    )
+    _ = parser.add_argument(
+        "--max-size",
+        type=parse_size,
+        default=DEFAULT_MAX_SIZE,
+        metavar="SIZE",
+        help="with prune, size to shrink the cache to, e.g. 500M (default: 1G)",
+    )
+    args = parser.parse_args(argv)
+    render_cache = RenderCache(args.cache_dir)
+    if args.command == "prune":
+        evicted, freed = render_cache.prune(args.max_size)
+        print(f"Evicted {evicted} page(s), freeing {format_size(freed)}")
+    stats = render_cache.stats()
+    print(f"Render cache {args.cache_dir}: {stats.entries} page(s)")
+    print(f"Size: {format_size(stats.size)}")
+    if stats.oldest is not None and stats.newest is not None:
+        print(f"Least recently used: {datetime.fromtimestamp(stats.oldest)}")
+        print(f"Most recently used: {datetime.fromtimestamp(stats.newest)}")
+
+
+if __name__ == "__main__":
+    cache_command(sys.argv[1:])
@@ -0,0 +1,440 @@
+"""Module for building the client-side search index of a site.
+
+Each page's Markdown is split into blocks and parsed into the same
+TextNode(s) it is rendered from, whose text is split into lowercase terms.
+The index never reads the generated HTML back. The terms of each page
+are inverted into postings: for every term, the ids of the pages it
+appears on and the word positions it appears at.
+
+The index is written as JSON shards under "search/" in the site, so a
+browser only fetches the shards of the terms it looks up:
+
+    search/pages.json     {"version": 1, "prefix_length": 2,
+                           "pages": [[url, title], ...], "shards": [...]}
+    search/terms/ti.json  {"title": [[page id, position, delta, ...], ...]}
+
+A term's shard is named after its first prefix_length characters, or
+"u" and the hex code point of its first character if that isn't ASCII.
+Positions are delta-encoded to keep the shards small.
+
+The index is updated incrementally. Pages keep their ids across builds,
+and a copy of every shard is kept in the ".search-cache" directory, with
+the size and modification time each page's source was indexed at. Only
+the pages whose source changed are parsed again, and only the shards
+holding their terms are read and rewritten, keeping the postings of every
+other page. Shards missing from the site are copied from the cache.
+
+Typical usage example:
+
+index = SearchIndex.load(".search-cache")
+index.index_plan(plan, "docs")
+index.write("docs", base_path)
+index.save()
+print(index.summary())
+"""
+
+from collections import defaultdict
+from heapq import heappop, heappush
+import json
+from os import makedirs, path, remove, replace
+import re
+from typing import NamedTuple
+
+from build_plan import BuildPlan, PlannedPage, page_url
+from compression import Precompressor, remove_variants
+from file_manipulation import copy_file_fast
+from front_matter import read_front_matter
+from markdown_blocks import BlockType, block_to_block_type, iter_markdown_blocks
+from markdown_manipulation import extract_markdown_title, markdown_to_textnodes
+from template import rewrite_url
+
+SEARCH_CACHE_DIR = ".search-cache"
+SEARCH_CACHE_VERSION = 1
+SEARCH_INDEX_VERSION = 1
+# Directory of the index, relative to the site root.
+SEARCH_DIR = "search"
+# Number of leading characters of a term that pick its shard.
+SHARD_PREFIX_LENGTH = 2
+# Letters and digits; punctuation and Markdown syntax separate terms.
+TERM_PATTERN = re.compile(r"[^\W_]+")
+# Heading, quote and list markers at the start of each line of a block.
+LINE_MARKER_PATTERN = re.compile(r"^(?:#{1,6} |> ?|- |\d+\. )", re.MULTILINE)
+
+
+def tokenize(text: str) -> list[str]:
+    """Splits text into lowercase terms, e.g. "Tom's hat" into tom, s, hat."""
+    return TERM_PATTERN.findall(text.lower())
+
+
+def shard_name(term: str) -> str:
+    """Returns the name of the shard a term's postings are written to."""
+    prefix = term[:SHARD_PREFIX_LENGTH]
+    if prefix.isascii():
+        return prefix
+    return f"u{ord(term[0]):x}"
+
+
+def page_terms(source_path: str) -> tuple[str, dict[str, list[int]]]:
+    """Parses a page's Markdown into its title and the positions of its terms.
+
+    Blocks are read one at a time, and inline Markdown is parsed with
+    markdown_to_textnodes(), so link URLs and formatting don't become
+    terms. Front matter isn't indexed, but its title is used. Code blocks
+    are indexed as they are written. Malformed blocks are skipped, as they
+    are reported when the page is generated.
+
+    Args:
+        source_path: File path of the Markdown source.
+
+    Returns:
+        Tuple of the page's title, or "" if it has none, and a dictionary of
+        each term to the word positions it appears at, in order.
+
+    Raises:
+        FileNotFoundError: If the source file doesn't exist.
+    """
+    title: str = ""
+    texts: list[str] = []
+    try:
+        with open(source_path, "r") as f:
+            try:
+                front_matter, _ = read_front_matter(f)
+            except ValueError:
+                front_matter = {}
+                _ = f.seek(0)
+            if isinstance(front_matter.get("title"), str):
+                title = str(front_matter["title"]).strip()
+            for block in iter_markdown_blocks(f):
+                block_type: BlockType = block_to_block_type(block)
+                if block_type is BlockType.CODE:
+                    texts.append(block[block.find("\n") + 1 : block.rfind("\n") + 1])
+                else:
+                    if title == "" and block_type is BlockType.HEADING:
+                        try:
+                            title = extract_markdown_title(block)
+                        except ValueError:
+                            pass  # Not a "# " heading
+                    text = LINE_MARKER_PATTERN.sub("", block).replace("\n", " ")
+                    try:
+                        nodes = markdown_to_textnodes(text)
+                    except ValueError:
+                        continue
+                    texts.extend(node.text for node in nodes)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Cannot find file: {source_path}")
+    # Tokenised in one pass; the separator keeps words of nodes apart.
+    terms: defaultdict[str, list[int]] = defaultdict(list)
+    for position, term in enumerate(tokenize("\n".join(texts))):
+        terms[term].append(position)
+    return title, dict(terms)
+
+
+class IndexedPage(NamedTuple):
+    """A page in the search index.
+
+    Attributes:
+        size: Size of the source when it was indexed, in bytes.
+        mtime_ns: Modification time of the source when it was indexed.
+        id: Id of the page in the index's postings.
+        url: Root-relative URL of the page, before base_path rewriting.
+        title: Title of the page, or "" if it has none.
+        shards: Names of the shards holding the page's terms.
+    """
+
+    size: int
+    mtime_ns: int
+    id: int
+    url: str
+    title: str
+    shards: tuple[str, ...]
+
+
+class SearchIndex:
+    """Inverted index of every page's terms, built incrementally.
+
+    Every page keeps the id it was first indexed with for as long as it
+    exists, and ids of removed pages are reused by new ones.
+
+    Attributes:
+        cache_dir: Directory path the index is cached in between builds.
+        pages: Dictionary of each page's source path to its IndexedPage.
+        shards: Set of the names of the shards the index has.
+        indexed: Number of pages parsed, because they weren't cached or had
+                 changed, since the cache was loaded.
+        reused: Number of pages whose cached postings were reused.
+        removed: Number of pages dropped, as their sources no longer exist.
+        written: Number of shards written by the last write().
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        pages: dict[str, IndexedPage] | None = None,
+        shards: set[str] | None = None,
+    ) -> None:
+        self.cache_dir: str = cache_dir
+        self.pages: dict[str, IndexedPage] = pages if pages else {}
+        self.shards: set[str] = shards if shards else set()
+        self.indexed: int = 0
+        self.reused: int = 0
+        self.removed: int = 0
+        self.written: int = 0
+        # Postings of the pages parsed since the last write(), by shard name
+        # then page id, and the ids whose cached postings they replace.
+        self._postings: dict[str, dict[int, dict[str, list[int]]]] = {}
+        self._stale_ids: set[int] = set()
+        self._dirty: set[str] = set()
+        ids = {page.id for page in self.pages.values()}
+        self._end_id: int = max(ids, default=-1) + 1
+        self._free_ids: list[int] = [i for i in range(self._end_id) if i not in ids]
+
+    @classmethod
+    def load(cls, cache_dir: str = SEARCH_CACHE_DIR) -> "SearchIndex":
+        """Loads the list of indexed pages from the cache.
+
+        Shards are only read when they need updating. A missing, unreadable,
+        outdated or incomplete cache results in an empty index, which makes
+        every page be parsed again.
+        """
+        try:
+            with open(path.join(cache_dir, "pages.json"), "r") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return cls(cache_dir)
+        if not isinstance(data, dict) or data.get("version") != SEARCH_CACHE_VERSION:
+            return cls(cache_dir)
+        pages = {
+            source_path: IndexedPage(*fields[:5], tuple(fields[5]))
+            for source_path, fields in data.get("pages", {}).items()
+        }
+        shards = set(data.get("shards", ()))
+        if not all(path.exists(cls._shard_path(cache_dir, name)) for name in shards):
+            return cls(cache_dir)
+        return cls(cache_dir, pages, shards)
+
+    def index_page(self, page: PlannedPage, relative_path: str) -> None:
+        """Indexes a page, unless its source is unchanged since it last was.
+
+        Args:
+            page: PlannedPage of the page.
+            relative_path: Path of the generated page relative to the site root.
+
+        Raises:
+            FileNotFoundError: If the source file doesn't exist.
+        """
+        indexed = self.pages.get(page.source)
+        if (
+            indexed is not None
+            and indexed.size == page.size
+            and indexed.mtime_ns == page.mtime_ns
+        ):
+            self.reused += 1
+            return
+        title, terms = page_terms(page.source)
+        self.indexed += 1
+        if indexed is not None:
+            page_id = indexed.id
+            self._dirty.update(indexed.shards)
+        elif self._free_ids:
+            page_id = heappop(self._free_ids)
+        else:
+            page_id = self._end_id
+            self._end_id += 1
+        # Also new ids, in case postings of a build that failed use them.
+        self._stale_ids.add(page_id)
+        shards: dict[str, dict[str, list[int]]] = {}
+        for term, positions in terms.items():
+            encoded = [positions[0]]
+            encoded.extend(b - a for a, b in zip(positions, positions[1:]))
+            shards.setdefault(shard_name(term), {})[term] = encoded
+        for name, shard in shards.items():
+            self._postings.setdefault(name, {})[page_id] = shard
+        self._dirty.update(shards)
+        self.pages[page.source] = IndexedPage(
+            page.size,
+            page.mtime_ns,
+            page_id,
+            page_url(relative_path),
+            title,
+            tuple(sorted(shards)),
+        )
+
+    def remove_page(self, source_path: str) -> None:
+        """Drops a page from the index, freeing its id for the next new page."""
+        indexed = self.pages.pop(source_path)
+        heappush(self._free_ids, indexed.id)
+        self._stale_ids.add(indexed.id)
+        self._dirty.update(indexed.shards)
+        self.removed += 1
+
+    def index_plan(self, plan: BuildPlan, dest_dir_path: str) -> None:
+        """Indexes every planned page, dropping pages that no longer exist.
+
+        Args:
+            plan: BuildPlan of the pages generated into dest_dir_path.
+            dest_dir_path: Directory path the site is generated into.
+        """
+        planned = {page.source for page in plan.pages}
+        for source_path in list(self.pages):
+            if source_path not in planned:
+                self.remove_page(source_path)
+        prefix = path.join(dest_dir_path, "")
+        for page in plan.pages:
+            self.index_page(page, page.dest.removeprefix(prefix))
+
+    def update_shard(self, name: str) -> dict[str, list[list[int]]]:
+        """Reads a cached shard and replaces the postings of changed pages.
+
+        Returns:
+            Dictionary of each term in the shard, in sorted order, to a list
+            holding, for every page the term appears on in id order, the
+            page id followed by its delta-encoded positions.
+        """
+        shard: dict[str, list[list[int]]] = {}
+        if name in self.shards:
+            with open(self._shard_path(self.cache_dir, name), "r") as f:
+                shard = json.load(f)
+        if self._stale_ids:
+            for term, postings in list(shard.items()):
+                kept = [p for p in postings if p[0] not in self._stale_ids]
+                if len(kept) != len(postings):
+                    shard[term] = kept
+        changed: set[str] = set()
+        for page_id, terms in self._postings.get(name, {}).items():
+            for term, encoded in terms.items():
+                shard.setdefault(term, []).append([page_id, *encoded])
+                changed.add(term)
+        for term in changed:
+            shard[term].sort(key=lambda posting: posting[0])
+        return {term: postings for term, postings in sorted(shard.items()) if postings}
+
+    def outputs(self, dest_dir_path: str) -> set[str]:
+        """Returns the paths of the index files the last write() produced."""
+        search_dir = path.join(dest_dir_path, SEARCH_DIR)
+        outputs = {path.join(search_dir, "pages.json")}
+        outputs.update(
+            path.join(search_dir, "terms", f"{name}.json") for name in self.shards
+        )
+        return outputs
+
+    def write(
+        self,
+        dest_dir_path: str,
+        base_path: str = "/",
+        precompressor: Precompressor | None = None,
+    ) -> None:
+        """Writes the changed index shards, and the list of pages and shards.
+
+        Only the shards holding terms of pages indexed or removed since the
+        last write() are updated, in the cache and the site, each through a
+        temporary file. Shards no page has terms in any more are removed.
+        Other shards missing from the site are copied from the cache.
+
+        Args:
+            dest_dir_path: Directory path the site is generated into.
+            base_path: Path prefix of the site, applied to the page URLs.
+            precompressor: Optional Precompressor to write compressed
+                           siblings of each index file.
+
+        Raises:
+            IOError: If it fails to write a file.
+        """
+        search_dir = path.join(dest_dir_path, SEARCH_DIR)
+        terms_dir = path.join(search_dir, "terms")
+        makedirs(terms_dir, exist_ok=True)
+        makedirs(path.join(self.cache_dir, "terms"), exist_ok=True)
+        self.written = 0
+        for name in sorted(self._dirty):
+            shard = self.update_shard(name)
+            cache_path = self._shard_path(self.cache_dir, name)
+            shard_path = path.join(terms_dir, f"{name}.json")
+            if shard:
+                data = _dump(shard)
+                _write(cache_path, data)
+                _write(shard_path, data)
+                self.shards.add(name)
+                self.written += 1
+                continue
+            for file_path in (cache_path, shard_path):
+                if path.exists(file_path):
+                    remove(file_path)
+            remove_variants(shard_path)
+            self.shards.discard(name)
+        for name in sorted(self.shards - self._dirty):
+            shard_path = path.join(terms_dir, f"{name}.json")
+            if not path.exists(shard_path):
+                copy_file_fast(self._shard_path(self.cache_dir, name), shard_path)
+                self.written += 1
+        self._postings, self._stale_ids, self._dirty = {}, set(), set()
+        if precompressor is not None:
+            for name in sorted(self.shards):
+                precompressor.submit(path.join(terms_dir, f"{name}.json"))
+        pages: list[list[str] | None] = [None] * self._end_id
+        for indexed in self.pages.values():
+            pages[indexed.id] = [rewrite_url(indexed.url, base_path), indexed.title]
+        pages_path = path.join(search_dir, "pages.json")
+        _write(
+            pages_path,
+            _dump(
+                {
+                    "version": SEARCH_INDEX_VERSION,
+                    "prefix_length": SHARD_PREFIX_LENGTH,
+                    "pages": pages,
+                    "shards": sorted(self.shards),
+                }
+            ),
+        )
+        if precompressor is not None:
+            precompressor.submit(pages_path)
+
+    def save(self) -> None:
+        """Writes the list of indexed pages to the cache.
+
+        Nothing is written if no page was indexed or removed since the
+        cache was loaded.
+
+        Raises:
+            IOError: If it fails to write the cache.
+        """
+        pages_path = path.join(self.cache_dir, "pages.json")
+        if self.indexed == 0 and self.removed == 0 and path.exists(pages_path):
+            return
+        makedirs(self.cache_dir, exist_ok=True)
+        _write(
+            pages_path,
+            _dump(
+                {
+                    "version": SEARCH_CACHE_VERSION,
+                    "pages": self.pages,
+                    "shards": sorted(self.shards),
+                }
+            ),
+        )
+
+    def summary(self) -> str:
+        """Returns a line of index statistics for the build output."""
+        return (
+            f"Indexed {len(self.pages)} page(s) for search: parsed "
+            f"{self.indexed}, reused {self.reused}, removed {self.removed}; "
+            f"wrote {self.written} of {len(self.shards)} shard(s)"
+        )
+
+    @staticmethod
+    def _shard_path(cache_dir: str, name: str) -> str:
+        return path.join(cache_dir, "terms", f"{name}.json")
+
+
+def _dump(data: object) -> str:
+    """Serialises data as JSON without any optional whitespace."""
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def _write(file_path: str, data: str) -> None:
+    """Writes a file through a temporary file, so readers never see part of it."""
+    tmp_path = f"{file_path}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            _ = f.write(data)
+        replace(tmp_path, file_path)
+    except IOError:
+        raise IOError(f"Error writing to {file_path}")
@@ -0,0 +1,37 @@
+"""Module for reading and writing sizes in bytes, e.g. "1.5G" and "3.0 MiB".
+
+Sizes are parsed from command line arguments such as --cache-max-size, and
+formatted for the build output. Units are powers of 1024 either way, so
+parse_size() reads what format_size() writes.
+
+Typical usage example:
+
+max_size = parse_size("512M")
+print(f"Size: {format_size(max_size)}")
+"""
+
+SIZE_UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3}
+
+
+def parse_size(size: str) -> int:
+    """Parses a size in bytes, optionally suffixed with K, M or G.
+
+    The unit may be followed by "B" or "iB", e.g. "1.5GB" or "3.0 MiB".
+
+    Raises:
+        ValueError: If size isn't a number with an optional unit.
+    """
+    size = size.strip().upper().removesuffix("B")
+    if size[-2:] in ("KI", "MI", "GI"):
+        size = size[:-1]
+    unit = size[-1:] if size[-1:] in SIZE_UNITS else ""
+    return int(float(size.removesuffix(unit)) * SIZE_UNITS[unit])
+
+
+def format_size(size: float) -> str:
+    """Formats a size in bytes with the largest unit that keeps it over 1."""
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
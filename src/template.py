@@ -0,0 +1,266 @@
+"""Module for compiling the HTML page template once per build.
+
+A Template splits the template text into static segments and named slots
+(e.g. "{{ Title }}"), so rendering a page is a single join rather than a
+str.replace() pass per placeholder over the whole page.
+
+The base_path rewrite of root-relative href="/ and src="/ attributes is
+applied to the template's own segments when it is compiled. Links in the
+page content are rewritten as they are emitted, see rewrite_url().
+
+The segments can also be minified when the template is compiled, see
+minify_html(). The page content needs no minifying, as HTMLNode(s) already
+render without whitespace between tags, so minified pages cost nothing
+extra to render.
+
+Typical usage example:
+
+template = Template.load("template.html", "/static-site-generator/", minify=True)
+html = template.render({"Title": title, "Content": content_html})
+"""
+
+from collections.abc import Iterable
+from functools import cached_property
+from hashlib import sha256
+import json
+import re
+from typing import TextIO
+
+from htmlnode import HTMLNode
+
+SLOT_PATTERN = re.compile(r"\{\{ (\w+) \}\}")
+# Elements whose content is whitespace-sensitive, or not HTML at all.
+PRESERVE_PATTERN = re.compile(
+    r"(<(pre|textarea|script|style)\b.*?</\2\s*>)", re.DOTALL | re.IGNORECASE
+)
+# Comments, except Internet Explorer conditional comments.
+COMMENT_PATTERN = re.compile(r"<!--(?!\[if).*?-->", re.DOTALL)
+# Whitespace around tags that don't render inline, where it never shows.
+BLOCK_TAG_PATTERN = re.compile(
+    r"\s*(</?(?:!doctype|address|article|aside|base|blockquote|body|dd|div|dl|dt"
+    r"|fieldset|figcaption|figure|footer|form|h[1-6]|head|header|hr|html|li|link"
+    r"|main|meta|nav|noscript|ol|p|pre|script|section|style|table|tbody|td|tfoot"
+    r"|th|thead|title|tr|ul)\b[^>]*>)\s*",
+    re.IGNORECASE,
+)
+WHITESPACE_PATTERN = re.compile(r"\s+")
+# Root-relative href and src attributes of the template.
+ATTRIBUTE_URL_PATTERN = re.compile(r'\b(href|src)="(/[^"]*)"')
+
+
+class AssetMap(dict[str, str]):
+    """Dictionary of root-relative static file URL to its fingerprinted URL.
+
+    e.g. {"/index.css": "/index.3f9a1c2b.css"}. It shouldn't be changed once
+    pages are rendered with it, as its digest is only computed once.
+    """
+
+    @cached_property
+    def digest(self) -> str:
+        """Hex SHA-256 digest of the map, to tell maps apart in cache keys."""
+        return sha256(json.dumps(sorted(self.items())).encode("utf-8")).hexdigest()
+
+
+def rewrite_url(url: str, base_path: str, assets: AssetMap | None = None) -> str:
+    """Prefixes a root-relative URL with the base_path.
+
+    Args:
+        url: URL of a link or image, e.g. "/images/tom.png".
+        base_path: Path prefix of the site, e.g. "/static-site-generator/".
+        assets: Optional AssetMap, replacing the URL of a static file with
+                its fingerprinted URL first.
+
+    Returns:
+        The URL with its leading "/" replaced by the base_path, or the URL
+        unchanged if it isn't root-relative.
+    """
+    if assets:
+        url = assets.get(url, url)
+    if base_path == "/" or not url.startswith("/"):
+        return url
+    return base_path + url[1:]
+
+
+def minify_html(html: str) -> str:
+    """Removes the whitespace and comments of html that don't change the page.
+
+    Whitespace next to block-level tags, such as the indentation between
+    <head> and <meta>, is removed, and any other run of whitespace is
+    collapsed to a single space. The content of <pre>, <textarea>, <script>
+    and <style> elements is left exactly as it is.
+
+    Args:
+        html: HTML text, which may be split at any point outside of a
+              preserved element, e.g. into the segments of a template.
+
+    Returns:
+        The minified HTML.
+    """
+    parts: list[str] = PRESERVE_PATTERN.split(html)
+    minified: list[str] = []
+    # split() yields text, then each preserved element and its tag name.
+    for i in range(0, len(parts), 3):
+        text = COMMENT_PATTERN.sub("", parts[i])
+        text = BLOCK_TAG_PATTERN.sub(r"\1", text)
+        if i > 0 and parts[i - 1].lower() != "textarea":
+            text = text.lstrip()
+        if i + 2 < len(parts) and parts[i + 2].lower() != "textarea":
+            text = text.rstrip()
+        minified.append(WHITESPACE_PATTERN.sub(" ", text))
+        if i + 1 < len(parts):
+            minified.append(parts[i + 1])
+    return "".join(minified)
+
+
+def rewrite_attributes(
+    html: str, base_path: str, assets: AssetMap | None = None
+) -> str:
+    """Prefixes root-relative href and src attributes in html with base_path.
+
+    With assets, attributes pointing to a static file are replaced with its
+    fingerprinted URL first.
+    """
+    if assets:
+        html = ATTRIBUTE_URL_PATTERN.sub(
+            lambda m: f'{m[1]}="{assets.get(m[2], m[2])}"', html
+        )
+    if base_path == "/":
+        return html
+    html = html.replace('href="/', f'href="{base_path}')
+    return html.replace('src="/', f'src="{base_path}')
+
+
+class Template:
+    """A compiled HTML template made of static segments and named slots.
+
+    Attributes:
+        segments: List of static strings surrounding the slots. Always one
+                  longer than slots, so segments[i] precedes slots[i].
+        slots: List of slot names, in the order they appear in the template.
+        assets: AssetMap of fingerprinted static files, also applied to the
+                links and images of the content rendered into the template.
+        layout_digest: Hex SHA-256 digest of the compiled segments and
+                       slots alone, which only changes with what the
+                       template itself renders.
+        digest: Hex SHA-256 digest of the layout and assets, which also
+                changes whenever any fingerprinted file does.
+    """
+
+    def __init__(
+        self, segments: list[str], slots: list[str], assets: AssetMap | None = None
+    ) -> None:
+        """Initialises Template instance from pre-split segments and slots.
+
+        Raises:
+            ValueError: If there isn't exactly one more segment than slots.
+        """
+        if len(segments) != len(slots) + 1:
+            raise ValueError("Template must have one more segment than slots.")
+        self.segments: list[str] = segments
+        self.slots: list[str] = slots
+        self.assets: AssetMap = assets if assets is not None else AssetMap()
+        compiled: list[object] = [segments, slots]
+        self.layout_digest: str = sha256(
+            json.dumps(compiled).encode("utf-8")
+        ).hexdigest()
+        if self.assets:
+            compiled.append(self.assets.digest)
+        self.digest: str = sha256(json.dumps(compiled).encode("utf-8")).hexdigest()
+
+    @classmethod
+    def compile(
+        cls,
+        template_html: str,
+        base_path: str = "/",
+        minify: bool = False,
+        assets: AssetMap | None = None,
+    ) -> "Template":
+        """Splits the template text into static segments and named slots.
+
+        Args:
+            template_html: Template text with "{{ Name }}" placeholders.
+            base_path: Path prefix applied to the template's own root-relative
+                       href and src attributes.
+            minify: Whether to minify the segments, see minify_html().
+            assets: Optional AssetMap of fingerprinted static files, applied
+                    to the template's own attributes and, when rendering,
+                    to the content.
+
+        Returns:
+            Template instance.
+        """
+        parts: list[str] = SLOT_PATTERN.split(template_html)
+        segments: list[str] = [
+            rewrite_attributes(p, base_path, assets) for p in parts[::2]
+        ]
+        if minify:
+            # Minified as a whole, so an element may span a slot; NUL never
+            # occurs in HTML and isn't whitespace.
+            segments = minify_html("\0".join(segments)).split("\0")
+        return cls(segments, parts[1::2], assets)
+
+    @classmethod
+    def load(
+        cls,
+        template_path: str,
+        base_path: str = "/",
+        minify: bool = False,
+        assets: AssetMap | None = None,
+    ) -> "Template":
+        """Reads and compiles the template file, see compile().
+
+        Raises:
+            FileNotFoundError: If the template file doesn't exist.
+        """
+        try:
+            with open(template_path, "r") as f:
+                template_html: str = f.read()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Cannot find file: {template_path}")
+        return cls.compile(template_html, base_path, minify, assets)
+
+    def render(self, values: dict[str, str]) -> str:
+        """Fills every slot with its value.
+
+        Args:
+            values: Dictionary of slot name to the text inserted in its place.
+
+        Returns:
+            The rendered HTML as a string.
+
+        Raises:
+            KeyError: If a slot in the template has no value.
+        """
+        parts: list[str] = [self.segments[0]]
+        for slot, segment in zip(self.slots, self.segments[1:]):
+            parts.append(values[slot])
+            parts.append(segment)
+        return "".join(parts)
+
+    def write(
+        self, fp: TextIO, values: dict[str, str | HTMLNode | Iterable[str]]
+    ) -> None:
+        """Writes the template to a file object, filling every slot.
+
+        HTMLNode values are streamed with write_html(), and iterables of
+        string chunks are written as they are produced, so the page is never
+        held in memory as a single string.
+
+        Args:
+            fp: Text file object to write the HTML to.
+            values: Dictionary of slot name to the text, HTMLNode, or iterable
+                    of HTML chunks inserted in its place.
+
+        Raises:
+            KeyError: If a slot in the template has no value.
+        """
+        _ = fp.write(self.segments[0])
+        for slot, segment in zip(self.slots, self.segments[1:]):
+            value = values[slot]
+            if isinstance(value, str):
+                _ = fp.write(value)
+            elif isinstance(value, HTMLNode):
+                value.write_html(fp)
+            else:
+                fp.writelines(value)
+            _ = fp.write(segment)
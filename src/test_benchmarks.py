@@ -0,0 +1,26 @@
+import unittest
+
+from benchmarks import _DictLeafNode, compare_results, node_memory, sample_document
+
+
+class TestBenchmarks(unittest.TestCase):
+    def test_compare_results(self):
+        baseline = {"a.seconds": 1.0, "b.seconds": 2.0, "gone.seconds": 1.0}
+        results = {"a.seconds": 1.05, "b.seconds": 2.5, "new.seconds": 9.0}
+        regressions = compare_results(results, baseline, 0.1)
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith("b.seconds: 2 -> 2.5"))
+        self.assertEqual(compare_results(results, baseline, 0.3), [])
+
+    def test_compare_results_faster_is_not_a_regression(self):
+        self.assertEqual(compare_results({"a": 0.5}, {"a": 1.0}, 0.0), [])
+
+    def test_node_memory(self):
+        self.assertTrue(hasattr(_DictLeafNode("b", "x"), "__dict__"))
+        results = node_memory(sample_document(50_000))
+        self.assertLess(results["html_slots"], results["html_dict"])
+        self.assertLess(results["text_slots"], results["text_dict"])
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
@@ -0,0 +1,80 @@
+import os
+import tempfile
+import unittest
+
+from build_plan import page_url, plan_build
+
+
+def write(file_path: str, text: str) -> None:
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, "w") as f:
+        _ = f.write(text)
+
+
+class TestBuildPlan(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.docs = os.path.join(self.tmp.name, "docs")
+        write(os.path.join(self.content, "index.md"), "# Home")
+        write(os.path.join(self.content, "blog", "post.md"), "# Post\n\nText")
+        os.makedirs(os.path.join(self.content, "empty"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_plans_every_page(self):
+        plan = plan_build(self.content, self.docs, "template.html")
+        post = os.path.join(self.content, "blog", "post.md")
+        self.assertEqual(
+            sorted(plan.page_paths()),
+            [
+                (post, os.path.join(self.docs, "blog", "post.html")),
+                (
+                    os.path.join(self.content, "index.md"),
+                    os.path.join(self.docs, "index.html"),
+                ),
+            ],
+        )
+        page = next(p for p in plan.pages if p.source == post)
+        self.assertEqual(page.size, len("# Post\n\nText"))
+        self.assertEqual(page.mtime_ns, os.stat(post).st_mtime_ns)
+        self.assertEqual(page.dependencies, ("template.html",))
+        self.assertEqual(plan.total_size, len("# Home") + len("# Post\n\nText"))
+
+    def test_plan_is_immutable(self):
+        plan = plan_build(self.content, self.docs)
+        self.assertIsInstance(plan.pages, tuple)
+        with self.assertRaises(AttributeError):
+            plan.pages[0].dest = "elsewhere.html"  # type: ignore[misc]
+        self.assertEqual(plan.pages[0].dependencies, ())
+
+    def test_make_dirs_creates_every_output_directory(self):
+        plan = plan_build(self.content, self.docs)
+        self.assertEqual(plan.dest_dirs[0], self.docs)
+        plan.make_dirs()
+        for name in ("blog", "empty"):
+            self.assertTrue(os.path.isdir(os.path.join(self.docs, name)))
+        plan.make_dirs()  # Already existing directories are fine
+
+    def test_summary(self):
+        plan = plan_build(self.content, self.docs)
+        self.assertEqual(
+            plan.summary(),
+            "Planned 2 page(s) from 18.0 B of Markdown in 3 director(ies)",
+        )
+
+    def test_missing_content_dir(self):
+        with self.assertRaises(FileNotFoundError):
+            _ = plan_build(os.path.join(self.tmp.name, "missing"), self.docs)
+
+    def test_page_url(self):
+        self.assertEqual(
+            page_url(os.path.join("blog", "tom", "index.html")), "/blog/tom/"
+        )
+        self.assertEqual(page_url("index.html"), "/")
+        self.assertEqual(page_url("about.html"), "/about.html")
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
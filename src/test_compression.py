@@ -0,0 +1,104 @@
+import gzip
+import os
+import pickle
+import tempfile
+from types import SimpleNamespace
+import unittest
+
+import compression
+from compression import Precompressor, is_variant, parse_formats
+
+
+def write(file_path: str, text: str) -> None:
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, "w") as f:
+        _ = f.write(text)
+
+
+class TestPrecompressor(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.page = os.path.join(self.tmp.name, "index.html")
+        write(self.page, "<p>Hello</p>" * 200)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_writes_gzip_sibling_with_same_mtime(self):
+        precompressor = Precompressor(("gzip",), min_size=100)
+        self.assertTrue(precompressor.compress_file(self.page))
+        with gzip.open(self.page + ".gz", "rt") as f:
+            self.assertEqual(f.read(), "<p>Hello</p>" * 200)
+        self.assertEqual(
+            os.stat(self.page + ".gz").st_mtime_ns, os.stat(self.page).st_mtime_ns
+        )
+
+    def test_skips_unchanged_files(self):
+        precompressor = Precompressor(("gzip",), min_size=100, threads=2)
+        precompressor.submit(self.page)
+        precompressor.submit(self.page)
+        precompressor.wait()
+        self.assertEqual((precompressor.compressed, precompressor.skipped), (1, 1))
+        os.utime(self.page, ns=(0, 10**9))
+        self.assertTrue(precompressor.compress_file(self.page))
+
+    def test_missing_sibling_of_format_that_did_not_help_is_current(self):
+        brotli = compression.brotli
+        # A "brotli" that never makes the file smaller
+        compression.brotli = SimpleNamespace(compress=lambda data, quality: data)
+        self.addCleanup(setattr, compression, "brotli", brotli)
+        precompressor = Precompressor(("gzip", "br"), min_size=100)
+        self.assertTrue(precompressor.compress_file(self.page))
+        self.assertFalse(os.path.exists(self.page + ".br"))
+        self.assertFalse(precompressor.compress_file(self.page))
+        os.remove(self.page + ".gz")
+        self.assertTrue(precompressor.compress_file(self.page))
+
+    def test_small_and_incompressible_files_have_no_siblings(self):
+        precompressor = Precompressor(("gzip",), min_size=100)
+        self.assertTrue(precompressor.compress_file(self.page))
+        write(self.page, "<p>Hi</p>")
+        self.assertFalse(precompressor.compress_file(self.page))
+        self.assertFalse(os.path.exists(self.page + ".gz"))
+        image = os.path.join(self.tmp.name, "image.png")
+        write(image, "x" * 1000)
+        self.assertFalse(precompressor.compress_file(image))
+        self.assertFalse(os.path.exists(image + ".gz"))
+
+    def test_pickled_copy_compresses_without_threads(self):
+        precompressor = Precompressor(("gzip",), min_size=100)
+        precompressor.submit(self.page)
+        copy = pickle.loads(pickle.dumps(precompressor))
+        precompressor.wait()
+        self.assertEqual(
+            (copy.formats, copy.min_size, copy.threads), (("gzip",), 100, 0)
+        )
+        copy.submit(self.page)
+        self.assertEqual(copy.skipped, 1)
+
+    def test_parse_formats(self):
+        self.assertEqual(parse_formats("gzip"), ("gzip",))
+        with self.assertRaises(ValueError):
+            _ = parse_formats("zstd")
+        with self.assertRaises(ValueError):
+            _ = parse_formats("")
+        self.assertTrue(is_variant("docs/index.html.gz"))
+        self.assertFalse(is_variant("docs/index.html"))
+
+    @unittest.skipIf(compression.brotli is None, "brotli is not installed")
+    def test_writes_brotli_sibling(self):
+        precompressor = Precompressor(("gzip", "br"), min_size=100)
+        self.assertTrue(precompressor.compress_file(self.page))
+        with open(self.page + ".br", "rb") as f:
+            self.assertEqual(
+                compression.brotli.decompress(f.read()).decode(), "<p>Hello</p>" * 200
+            )
+
+    @unittest.skipIf(compression.brotli is not None, "brotli is installed")
+    def test_brotli_needs_brotli_package(self):
+        with self.assertRaises(ValueError):
+            _ = Precompressor(("br",))
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
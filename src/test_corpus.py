@@ -0,0 +1,63 @@
+import os
+import tempfile
+import unittest
+
+from corpus import SHAPES, generate_corpus
+from generate_files import find_content_files, generate_pages_recursive
+
+
+def read_tree(root):
+    files = {}
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            file_path = os.path.join(dirpath, filename)
+            with open(file_path) as f:
+                files[os.path.relpath(file_path, root)] = f.read()
+    return files
+
+
+class TestCorpus(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_generate_is_reproducible(self):
+        a, b = os.path.join(self.root, "a"), os.path.join(self.root, "b")
+        self.assertEqual(
+            generate_corpus(a, "small_posts", 5, seed=1),
+            generate_corpus(b, "small_posts", 5, seed=1),
+        )
+        self.assertEqual(read_tree(a), read_tree(b))
+        c = os.path.join(self.root, "c")
+        _ = generate_corpus(c, "small_posts", 5, seed=2)
+        self.assertNotEqual(read_tree(a), read_tree(c))
+
+    def test_every_shape_builds(self):
+        template_path = os.path.join(self.root, "template.html")
+        with open(template_path, "w") as f:
+            _ = f.write("{{ Title }}{{ Content }}")
+        for shape in SHAPES:
+            content = os.path.join(self.root, shape)
+            docs = os.path.join(self.root, "docs", shape)
+            pages = 1 if shape == "huge_pages" else 3
+            self.assertGreater(generate_corpus(content, shape, pages), 0)
+            self.assertEqual(len(find_content_files(content, docs)), pages)
+            os.makedirs(docs)
+            generate_pages_recursive(content, template_path, docs, "/")
+            self.assertEqual(len(read_tree(docs)), pages)
+
+    def test_deep_dirs_are_nested(self):
+        content = os.path.join(self.root, "content")
+        _ = generate_corpus(content, "deep_dirs", 1)
+        (relative_path,) = read_tree(content)
+        self.assertGreater(relative_path.count(os.sep), 10)
+
+    def test_unknown_shape(self):
+        self.assertRaises(ValueError, generate_corpus, self.root, "nope", 1)
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
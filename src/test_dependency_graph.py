@@ -0,0 +1,117 @@
+import os
+import tempfile
+import unittest
+
+from build_plan import plan_build
+from dependency_graph import DependencyGraph
+from template import AssetMap, Template
+
+
+def write(file_path: str, text: str) -> None:
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, "w") as f:
+        _ = f.write(text)
+
+
+class TestDependencyGraph(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.docs = os.path.join(root, "docs")
+        self.template_path = os.path.join(root, "template.html")
+        self.graph_path = os.path.join(root, "graph.json")
+        self.home = os.path.join(self.docs, "index.html")
+        self.tom = os.path.join(self.docs, "tom.html")
+        write(self.template_path, '<link href="/index.css">{{ Content }}')
+        write(os.path.join(self.content, "index.md"), "# Home")
+        write(os.path.join(self.content, "tom.md"), "# Tom\n\n![Tom](/tom.png)")
+        self.assets = AssetMap({"/index.css": "/index.1.css", "/tom.png": "/tom.1.png"})
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self, base_path: str = "/", assets: AssetMap | None = None):
+        """Invalidates and "generates" the stale pages, returning the graph."""
+        graph = DependencyGraph.load(self.graph_path)
+        template = Template.load(self.template_path, base_path, assets=assets)
+        plan = plan_build(self.content, self.docs)
+        for dest in graph.invalidate(plan, self.template_path, template, base_path):
+            write(dest, "")
+        _ = graph.prune(plan.outputs())
+        graph.save()
+        return graph
+
+    def edit(self, file_path: str, text: str) -> None:
+        write(file_path, text)
+        stat = os.stat(file_path)
+        os.utime(file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    def test_only_changed_sources_are_rebuilt(self):
+        self.assertEqual(
+            self.build().reasons,
+            {self.home: "it wasn't built before", self.tom: "it wasn't built before"},
+        )
+        self.assertEqual(self.build().reasons, {})
+        source = os.path.join(self.content, "tom.md")
+        self.edit(source, "# Tom\n\nBombadil")
+        self.assertEqual(self.build().reasons, {self.tom: f"{source} changed"})
+        self.edit(source, "# Tom\n\nBombadil")  # Touched, not changed
+        self.assertEqual(self.build().reasons, {})
+
+    def test_template_and_options(self):
+        _ = self.build()
+        self.edit(self.template_path, "{{ Content }}")
+        self.assertEqual(
+            set(self.build().reasons.values()), {f"{self.template_path} changed"}
+        )
+        self.assertEqual(
+            set(self.build("/site/").reasons.values()),
+            {"the base_path option changed"},
+        )
+
+    def test_static_files_invalidate_the_pages_linking_to_them(self):
+        _ = self.build(assets=self.assets)
+        graph = self.build(assets=self.assets)
+        self.assertEqual(graph.dependents("/tom.png"), {self.tom})
+        self.assertEqual(graph.reasons, {})
+        assets = AssetMap(self.assets, **{"/tom.png": "/tom.2.png"})
+        self.assertEqual(
+            self.build(assets=assets).reasons, {self.tom: "/tom.png changed"}
+        )
+
+    def test_missing_output_and_removed_source(self):
+        _ = self.build()
+        os.remove(self.home)
+        self.assertEqual(self.build().reasons, {self.home: "its output is missing"})
+        os.remove(os.path.join(self.content, "tom.md"))
+        graph = self.build()
+        self.assertEqual(set(graph.outputs), {self.home})
+        self.assertEqual(DependencyGraph.load(self.graph_path).outputs, graph.outputs)
+
+    def test_invalidate_output(self):
+        graph = self.build()
+        listing = os.path.join(self.docs, "blog", "index.html")
+        tom = os.path.join(self.content, "tom.md")
+        home = os.path.join(self.content, "index.md")
+        self.assertEqual(
+            graph.invalidate_output(listing, (tom,)), "it wasn't built before"
+        )
+        write(listing, "")
+        self.assertIsNone(graph.invalidate_output(listing, (tom,)))
+        self.assertEqual(
+            graph.invalidate_output(listing, (tom, home)), f"{home} was added"
+        )
+        graph.save()
+        self.edit(tom, "# Tom\n\nBombadil")
+        graph = DependencyGraph.load(self.graph_path)
+        template = Template.load(self.template_path)
+        plan = plan_build(self.content, self.docs)
+        _ = graph.invalidate(plan, self.template_path, template, "/")
+        self.assertEqual(
+            graph.invalidate_output(listing, (tom, home)), f"{tom} changed"
+        )
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
@@ -0,0 +1,124 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from compression import Precompressor
+from file_manipulation import copy_file_fast, sync_directory
+
+
+def write(file_path, text):
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, "w") as f:
+        _ = f.write(text)
+
+
+def read(file_path):
+    with open(file_path) as f:
+        return f.read()
+
+
+class TestSyncDirectory(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.static = os.path.join(self.tmp.name, "static")
+        self.docs = os.path.join(self.tmp.name, "docs")
+        write(os.path.join(self.static, "index.css"), "body {}")
+        write(os.path.join(self.static, "images", "logo.png"), "png")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_copies_then_skips_unchanged(self):
+        stats = sync_directory(self.static, self.docs)
+        self.assertEqual((stats.copied, stats.skipped, stats.removed), (2, 0, 0))
+        self.assertEqual(read(os.path.join(self.docs, "images", "logo.png")), "png")
+        stats = sync_directory(self.static, self.docs)
+        self.assertEqual((stats.copied, stats.skipped, stats.removed), (0, 2, 0))
+
+    def test_copies_changed_files(self):
+        _ = sync_directory(self.static, self.docs)
+        write(os.path.join(self.static, "index.css"), "body { margin: 0 }")
+        stats = sync_directory(self.static, self.docs)
+        self.assertEqual((stats.copied, stats.skipped), (1, 1))
+        self.assertEqual(
+            read(os.path.join(self.docs, "index.css")), "body { margin: 0 }"
+        )
+
+    def test_removes_stale_files_but_keeps_pages(self):
+        page = os.path.join(self.docs, "blog", "index.html")
+        write(page, "<p>page</p>")
+        _ = sync_directory(self.static, self.docs, {page})
+        shutil.rmtree(os.path.join(self.static, "images"))
+        stats = sync_directory(self.static, self.docs, {page})
+        self.assertEqual(stats.removed, 1)
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "images")))
+        self.assertTrue(os.path.exists(page))
+
+    def test_precompress_keeps_siblings_of_current_files(self):
+        write(os.path.join(self.static, "app.js"), "let x = 1;\n" * 200)
+        precompressor = Precompressor(("gzip",), min_size=100)
+        _ = sync_directory(self.static, self.docs, precompressor=precompressor)
+        precompressor.wait()
+        sibling = os.path.join(self.docs, "app.js.gz")
+        self.assertTrue(os.path.exists(sibling))
+        stats = sync_directory(self.static, self.docs, precompressor=precompressor)
+        precompressor.wait()
+        self.assertEqual(stats.removed, 0)
+        self.assertEqual(precompressor.compressed, 1)
+        os.remove(os.path.join(self.static, "app.js"))
+        stats = sync_directory(self.static, self.docs, precompressor=precompressor)
+        self.assertEqual(stats.removed, 2)
+        self.assertFalse(os.path.exists(sibling))
+
+    def test_rename_copies_under_new_names(self):
+        rename = {"index.css": "index.1234abcd.css"}
+        _ = sync_directory(self.static, self.docs, rename=rename)
+        self.assertEqual(read(os.path.join(self.docs, "index.1234abcd.css")), "body {}")
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "index.css")))
+        rename = {"index.css": "index.5678ef90.css"}
+        stats = sync_directory(self.static, self.docs, rename=rename)
+        self.assertEqual((stats.copied, stats.skipped, stats.removed), (1, 1, 1))
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "index.1234abcd.css")))
+
+    def test_checksum_detects_same_size_and_mtime(self):
+        _ = sync_directory(self.static, self.docs)
+        source = os.path.join(self.static, "index.css")
+        st = os.stat(source)
+        write(source, "body {!")
+        os.utime(source, ns=(st.st_atime_ns, st.st_mtime_ns))
+        self.assertEqual(sync_directory(self.static, self.docs).copied, 0)
+        self.assertEqual(
+            sync_directory(self.static, self.docs, checksum=True).copied, 1
+        )
+        self.assertEqual(read(os.path.join(self.docs, "index.css")), "body {!")
+
+    def test_hardlink(self):
+        _ = sync_directory(self.static, self.docs, hardlink=True)
+        self.assertTrue(
+            os.path.samefile(
+                os.path.join(self.static, "index.css"),
+                os.path.join(self.docs, "index.css"),
+            )
+        )
+        self.assertEqual(sync_directory(self.static, self.docs).skipped, 2)
+
+    def test_replaces_directory_with_file(self):
+        write(os.path.join(self.docs, "index.css", "old"), "x")
+        _ = sync_directory(self.static, self.docs)
+        self.assertEqual(read(os.path.join(self.docs, "index.css")), "body {}")
+
+    def test_copy_file_fast(self):
+        source = os.path.join(self.tmp.name, "big.bin")
+        dest = os.path.join(self.tmp.name, "copy.bin")
+        data = os.urandom(3 * 1024 * 1024 + 7)
+        with open(source, "wb") as f:
+            _ = f.write(data)
+        write(dest, "stale contents that are longer than nothing")
+        copy_file_fast(source, dest)
+        with open(dest, "rb") as f:
+            self.assertEqual(f.read(), data)
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
@@ -0,0 +1,73 @@
+import os
+import tempfile
+import unittest
+
+from fingerprint import (
+    FingerprintCache,
+    asset_map,
+    fingerprint_directory,
+    fingerprinted_name,
+)
+
+
+def write(file_path: str, text: str) -> None:
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, "w") as f:
+        _ = f.write(text)
+
+
+class TestFingerprint(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.static = os.path.join(self.tmp.name, "static")
+        self.cache_path = os.path.join(self.tmp.name, "fingerprints.json")
+        write(os.path.join(self.static, "index.css"), "body {}")
+        write(os.path.join(self.static, "images", "tom.png"), "png")
+        write(os.path.join(self.static, "404.html"), "<p>Not found</p>")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_fingerprinted_name(self):
+        self.assertEqual(
+            fingerprinted_name(os.path.join("images", "tom.png"), "3f9a1c2b" * 8),
+            os.path.join("images", "tom.3f9a1c2b.png"),
+        )
+
+    def test_renames_every_file_but_html(self):
+        renames = fingerprint_directory(self.static, FingerprintCache(self.cache_path))
+        self.assertEqual(sorted(renames), ["images" + os.sep + "tom.png", "index.css"])
+        self.assertRegex(renames["index.css"], r"^index\.[0-9a-f]{8}\.css$")
+        assets = asset_map(renames)
+        self.assertEqual(assets["/index.css"], "/" + renames["index.css"])
+        self.assertIn("/images/tom.png", assets)
+
+    def test_cache_hashes_changed_files_only(self):
+        cache = FingerprintCache(self.cache_path)
+        before = fingerprint_directory(self.static, cache)
+        cache.save()
+        self.assertEqual(cache.hashed, 2)
+        cache = FingerprintCache.load(self.cache_path)
+        self.assertEqual(fingerprint_directory(self.static, cache), before)
+        self.assertEqual(cache.hashed, 0)
+        write(os.path.join(self.static, "index.css"), "body { margin: 0 }")
+        after = fingerprint_directory(self.static, cache)
+        self.assertEqual(cache.hashed, 1)
+        self.assertNotEqual(after["index.css"], before["index.css"])
+
+    def test_removed_files_are_dropped_from_cache(self):
+        cache = FingerprintCache(self.cache_path)
+        _ = fingerprint_directory(self.static, cache)
+        os.remove(os.path.join(self.static, "index.css"))
+        _ = fingerprint_directory(self.static, cache)
+        self.assertEqual(
+            list(cache.entries), [os.path.join(self.static, "images", "tom.png")]
+        )
+
+    def test_outdated_cache_is_ignored(self):
+        write(self.cache_path, '{"version": 0, "files": {"x": {}}}')
+        self.assertEqual(FingerprintCache.load(self.cache_path).entries, {})
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
@@ -0,0 +1,83 @@
+import json
+import os
+import tempfile
+import unittest
+
+from fragment_cache import FragmentCache
+from highlight import LEXER_VERSION
+from markdown_blocks import iter_markdown_html, markdown_to_html_node
+
+
+class TestFragmentCache(unittest.TestCase):
+    def test_get_and_put(self):
+        cache = FragmentCache(2)
+        self.assertIsNone(cache.get(("paragraph", "/", "a")))
+        cache.put(("paragraph", "/", "a"), "<p>a</p>")
+        self.assertEqual(cache.get(("paragraph", "/", "a")), "<p>a</p>")
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_evicts_least_recently_used(self):
+        cache = FragmentCache(2)
+        cache.put(("paragraph", "/", "a"), "<p>a</p>")
+        cache.put(("paragraph", "/", "b"), "<p>b</p>")
+        _ = cache.get(("paragraph", "/", "a"))
+        cache.put(("paragraph", "/", "c"), "<p>c</p>")
+        self.assertIsNone(cache.get(("paragraph", "/", "b")))
+        self.assertIsNotNone(cache.get(("paragraph", "/", "a")))
+        self.assertEqual(len(cache.entries), 2)
+
+    def test_rejects_empty_cache(self):
+        self.assertRaises(ValueError, FragmentCache, 0)
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as root:
+            cache_path = os.path.join(root, "cache", "fragments.json")
+            cache = FragmentCache(10, cache_path)
+            cache.put(("paragraph", "/", "a"), "<p>a</p>")
+            cache.put(("heading", "/", "# b"), "<h1>b</h1>")
+            cache.save()
+            loaded = FragmentCache.load(cache_path, 10)
+            self.assertEqual(loaded.entries, cache.entries)
+            self.assertEqual(len(FragmentCache.load(cache_path, 1).entries), 1)
+            with open(cache_path, "w") as f:
+                json.dump({"version": -1, "entries": []}, f)
+            self.assertEqual(len(FragmentCache.load(cache_path).entries), 0)
+            missing = os.path.join(root, "missing.json")
+            self.assertEqual(len(FragmentCache.load(missing).entries), 0)
+
+    def test_markdown_to_html_node_with_cache(self):
+        footer = "Licensed under [MIT](/license), **see** the _notice_."
+        pages = [f"# Page {i}\n\nBody {i}\n\n{footer}\n\n- a\n- b" for i in range(3)]
+        cache = FragmentCache()
+        for md in pages:
+            self.assertEqual(
+                markdown_to_html_node(md, "/site/", cache).to_html(),
+                markdown_to_html_node(md, "/site/").to_html(),
+            )
+        self.assertEqual(cache.hits, 4)
+        self.assertEqual(cache.misses, 8)
+        self.assertEqual(
+            markdown_to_html_node(footer, "/", cache).to_html(),
+            markdown_to_html_node(footer, "/").to_html(),
+        )
+        self.assertEqual(cache.misses, 9)
+
+    def test_iter_markdown_html_with_cache(self):
+        md = "# Title\n\nrepeated\n\nrepeated\n\n```\ncode\n```"
+        cache = FragmentCache()
+        self.assertEqual(
+            "".join(iter_markdown_html(md.split("\n"), "/", cache)),
+            markdown_to_html_node(md).to_html(),
+        )
+        self.assertEqual(cache.hits, 1)
+
+    def test_code_blocks_are_keyed_by_lexer_version(self):
+        block = "```python\nprint(1)\n```"
+        cache = FragmentCache()
+        cache.put(("code", "/", block), "<pre><code>stale</code></pre>")
+        self.assertNotIn("stale", markdown_to_html_node(block, "/", cache).to_html())
+        self.assertIn((f"code@{LEXER_VERSION}", "/", block), cache.entries)
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
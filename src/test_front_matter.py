@@ -0,0 +1,94 @@
+import io
+import os
+import tempfile
+import unittest
+
+from front_matter import (
+    PageMetadata,
+    page_metadata,
+    parse_front_matter,
+    read_front_matter,
+    read_page_metadata,
+    split_front_matter,
+)
+
+
+class TestFrontMatter(unittest.TestCase):
+    def test_yaml_subset(self):
+        text = (
+            "title: 'Tom: a mistake'\n"
+            "date: 2024-03-01\n"
+            "tags: [tolkien, opinion]\n"
+            "draft: yes\n"
+            "order: -2\n"
+            "# comment\n"
+            "authors:\n"
+            "  - Tom\n"
+            '  - "Goldberry"\n'
+        )
+        self.assertEqual(
+            parse_front_matter(text, "yaml"),
+            {
+                "title": "Tom: a mistake",
+                "date": "2024-03-01",
+                "tags": ["tolkien", "opinion"],
+                "draft": True,
+                "order": -2,
+                "authors": ["Tom", "Goldberry"],
+            },
+        )
+
+    def test_invalid_yaml(self):
+        for text in ("just text", "- item", "  nested: value", "title: a\n- item"):
+            with self.assertRaises(ValueError):
+                _ = parse_front_matter(text, "yaml")
+
+    def test_split_toml(self):
+        front_matter, markdown = split_front_matter(
+            '+++\ntitle = "Tom"\ntags = ["a"]\n+++\n# Tom\n'
+        )
+        self.assertEqual(front_matter, {"title": "Tom", "tags": ["a"]})
+        self.assertEqual(markdown, "# Tom\n")
+        with self.assertRaises(ValueError):
+            _ = split_front_matter("+++\ntitle = \n+++\n# Tom\n")
+
+    def test_split_without_front_matter(self):
+        for md in ("# Tom\n\n---\n", "---"):
+            self.assertEqual(split_front_matter(md), ({}, md))
+        with self.assertRaises(ValueError):
+            _ = split_front_matter("---\ntitle: Tom\n# Tom\n")
+
+    def test_read_leaves_file_at_body(self):
+        f = io.StringIO("---\ndate: 2024-03-01\n---\n# Tom\n")
+        self.assertEqual(read_front_matter(f), ({"date": "2024-03-01"}, 3))
+        self.assertEqual(f.read(), "# Tom\n")
+        f = io.StringIO("# Tom\n")
+        self.assertEqual(read_front_matter(f), ({}, 0))
+        self.assertEqual(f.read(), "# Tom\n")
+
+    def test_page_metadata(self):
+        self.assertEqual(
+            page_metadata({"tags": "a, b", "slug": "tom", "draft": "no"}, "Tom"),
+            PageMetadata("Tom", "", ("a", "b"), False, "tom"),
+        )
+        for front_matter in ({"date": "March"}, {"slug": "a/b"}, {"slug": ".."}):
+            with self.assertRaises(ValueError):
+                _ = page_metadata(front_matter, "Tom")
+
+    def test_read_page_metadata(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, "tom.md")
+            with open(source, "w") as f:
+                _ = f.write("+++\ndate = 2024-03-01\n+++\n# Tom\n\nBody\n")
+            self.assertEqual(
+                read_page_metadata(source),
+                PageMetadata("Tom", "2024-03-01", (), False, ""),
+            )
+            with open(source, "w") as f:
+                _ = f.write("---\ndate: soon\n---\n")
+            with self.assertRaisesRegex(ValueError, "tom.md: Invalid date"):
+                _ = read_page_metadata(source)
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
@@ -0,0 +1,280 @@
+import os
+import tempfile
+import unittest
+
+from build_manifest import BuildManifest
+from compression import Precompressor
+from dependency_graph import DependencyGraph
+import generate_files
+from generate_files import (
+    PageGenerationError,
+    find_content_files,
+    generate_page,
+    generate_pages,
+    generate_pages_async,
+    generate_pages_incremental,
+    generate_pages_parallel,
+    generate_pages_recursive,
+)
+from render_cache import RenderCache
+from template import Template
+
+TEMPLATE = "<title>{{ Title }}</title><main>{{ Content }}</main>"
+
+
+def write(file_path: str, text: str) -> None:
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, "w") as f:
+        _ = f.write(text)
+
+
+def read(file_path: str) -> str:
+    with open(file_path, "r") as f:
+        return f.read()
+
+
+class TestIncrementalBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.docs = os.path.join(root, "docs")
+        self.template = os.path.join(root, "template.html")
+        self.manifest_path = os.path.join(root, "manifest.json")
+        write(self.template, TEMPLATE)
+        write(os.path.join(self.content, "index.md"), "# Home\n\nWelcome")
+        write(os.path.join(self.content, "blog", "post", "index.md"), "# Post\n\nText")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self, base_path: str = "/") -> BuildManifest:
+        manifest = BuildManifest.load(self.manifest_path)
+        generate_pages_incremental(
+            self.content, self.template, self.docs, base_path, manifest
+        )
+        return manifest
+
+    def test_find_content_files(self):
+        files = sorted(find_content_files(self.content, self.docs))
+        self.assertEqual(
+            files,
+            sorted(
+                [
+                    (
+                        os.path.join(self.content, "blog", "post", "index.md"),
+                        os.path.join(self.docs, "blog", "post", "index.html"),
+                    ),
+                    (
+                        os.path.join(self.content, "index.md"),
+                        os.path.join(self.docs, "index.html"),
+                    ),
+                ]
+            ),
+        )
+
+    def test_first_build_renders_everything(self):
+        manifest = self.build()
+        self.assertEqual(len(manifest.outputs()), 2)
+        self.assertEqual(
+            read(os.path.join(self.docs, "index.html")),
+            "<title>Home</title><main><div><h1>Home</h1><p>Welcome</p></div></main>",
+        )
+
+    def test_unchanged_pages_are_skipped(self):
+        _ = self.build()
+        index_html = os.path.join(self.docs, "index.html")
+        write(index_html, "untouched")
+        _ = self.build()
+        self.assertEqual(read(index_html), "untouched")
+
+    def test_changed_source_is_rerendered(self):
+        _ = self.build()
+        write(os.path.join(self.content, "index.md"), "# Home\n\nChanged")
+        _ = self.build()
+        self.assertIn("Changed", read(os.path.join(self.docs, "index.html")))
+
+    def test_changed_base_path_rerenders(self):
+        _ = self.build()
+        manifest = BuildManifest.load(self.manifest_path)
+        dest = os.path.join(self.docs, "index.html")
+        self.assertEqual(manifest.entries[dest]["base_path"], "/")
+        manifest = self.build("/site/")
+        self.assertEqual(manifest.entries[dest]["base_path"], "/site/")
+
+    def test_removed_source_deletes_output(self):
+        _ = self.build()
+        os.remove(os.path.join(self.content, "blog", "post", "index.md"))
+        manifest = self.build()
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "blog")))
+        self.assertEqual(manifest.outputs(), [os.path.join(self.docs, "index.html")])
+
+    def test_dependency_graph_decides_what_is_stale(self):
+        graph_path = os.path.join(self.tmp.name, "graph.json")
+        for _ in range(2):
+            graph = DependencyGraph.load(graph_path)
+            manifest = BuildManifest.load(self.manifest_path)
+            generate_pages_incremental(
+                self.content, self.template, self.docs, "/", manifest, graph=graph
+            )
+            graph.save()
+        self.assertEqual(graph.reasons, {})
+        self.assertEqual(len(manifest.outputs()), 2)
+        index_md = os.path.join(self.content, "index.md")
+        write(index_md, "# Home\n\nChanged, and of another size")
+        graph = DependencyGraph.load(graph_path)
+        generate_pages_incremental(
+            self.content, self.template, self.docs, "/", manifest, graph=graph
+        )
+        index_html = os.path.join(self.docs, "index.html")
+        self.assertEqual(graph.reasons, {index_html: f"{index_md} changed"})
+        self.assertIn("Changed", read(index_html))
+
+
+class TestParallelBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.template = os.path.join(root, "template.html")
+        write(self.template, '<link href="/index.css">{{ Title }}{{ Content }}')
+        for i in range(6):
+            write(
+                os.path.join(self.content, f"post{i}", "index.md"),
+                f"# Post {i}\n\nSee [home](/) and **bold** text",
+            )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_parallel_output_matches_serial(self):
+        serial = os.path.join(self.tmp.name, "serial")
+        parallel = os.path.join(self.tmp.name, "parallel")
+        os.makedirs(serial)
+        generate_pages_recursive(self.content, self.template, serial, "/base/")
+        generate_pages_parallel(self.content, self.template, parallel, "/base/", 2)
+        for i in range(6):
+            page = os.path.join(f"post{i}", "index.html")
+            self.assertEqual(
+                read(os.path.join(parallel, page)), read(os.path.join(serial, page))
+            )
+
+    def test_parallel_workers_count_precompressed_pages(self):
+        dest = os.path.join(self.tmp.name, "docs")
+        precompressor = Precompressor(("gzip",), min_size=1)
+        generate_pages_parallel(
+            self.content, self.template, dest, "/", 2, precompressor=precompressor
+        )
+        precompressor.wait()
+        self.assertEqual(precompressor.compressed + precompressor.skipped, 6)
+
+    def test_parallel_errors_report_source_paths_in_order(self):
+        bad_a = os.path.join(self.content, "post1", "index.md")
+        bad_b = os.path.join(self.content, "post4", "index.md")
+        write(bad_a, "no title here")
+        write(bad_b, "no title here either")
+        dest = os.path.join(self.tmp.name, "docs")
+        with self.assertRaises(PageGenerationError) as cm:
+            generate_pages_parallel(self.content, self.template, dest, "/", 2)
+        expected_order = [
+            source
+            for source, _ in find_content_files(self.content, dest)
+            if source in (bad_a, bad_b)
+        ]
+        self.assertEqual([f[0] for f in cm.exception.failures], expected_order)
+        self.assertIn("No title found", cm.exception.failures[0][1])
+        self.assertIn(expected_order[0], str(cm.exception))
+
+    def test_async_output_matches_serial(self):
+        serial = os.path.join(self.tmp.name, "serial")
+        pipelined = os.path.join(self.tmp.name, "async")
+        os.makedirs(serial)
+        generate_pages_recursive(self.content, self.template, serial, "/base/")
+        pages = find_content_files(self.content, pipelined)
+        generate_pages(pages, self.template, "/base/", max_in_flight=2)
+        for i in range(6):
+            page = os.path.join(f"post{i}", "index.html")
+            self.assertEqual(
+                read(os.path.join(pipelined, page)), read(os.path.join(serial, page))
+            )
+
+    def test_async_errors_in_order(self):
+        dest = os.path.join(self.tmp.name, "docs")
+        pages = find_content_files(self.content, dest)
+        write(pages[4][0], "no title here")
+        os.remove(pages[1][0])
+        template = Template.load(self.template)
+        failures = generate_pages_async(pages, self.template, template, "/", 1)
+        self.assertEqual([f[0] for f in failures], [pages[1][0], pages[4][0]])
+        self.assertIn("Cannot find file", failures[0][1])
+        self.assertTrue(os.path.exists(pages[5][1]))
+
+    def test_async_streams_large_pages_and_uses_render_cache(self):
+        template = Template.load(self.template)
+        render_cache = RenderCache(os.path.join(self.tmp.name, "cache"))
+        dest = os.path.join(self.tmp.name, "docs")
+        pages = find_content_files(self.content, dest)
+        threshold = generate_files.STREAM_THRESHOLD
+        generate_files.STREAM_THRESHOLD = 0
+        try:
+            failures = generate_pages_async(
+                pages[:3], self.template, template, "/", 2, render_cache=render_cache
+            )
+        finally:
+            generate_files.STREAM_THRESHOLD = threshold
+        self.assertEqual(failures, [])
+        failures = generate_pages_async(
+            pages, self.template, template, "/", 2, render_cache=render_cache
+        )
+        self.assertEqual(failures, [])
+        self.assertEqual(render_cache.stats().entries, 6)
+        expected = os.path.join(self.tmp.name, "expected.html")
+        generate_page(pages[0][0], self.template, expected, "/")
+        self.assertEqual(read(pages[0][1]), read(expected))
+
+
+class TestGeneratePage(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.source = os.path.join(root, "page.md")
+        self.template = os.path.join(root, "template.html")
+        write(self.template, '<link href="/index.css">{{ Title }}{{ Content }}')
+        write(
+            self.source,
+            "Intro\n\n# Big page\n\n"
+            + "\n\n".join(f"Para {i} with [link](/p/{i})" for i in range(200))
+            + "\n\n- a\n- b\n\n```\ncode\n```\n",
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_streamed_page_matches_buffered(self):
+        buffered = os.path.join(self.tmp.name, "buffered.html")
+        streamed = os.path.join(self.tmp.name, "streamed.html")
+        generate_page(self.source, self.template, buffered, "/b/", stream=False)
+        generate_page(self.source, self.template, streamed, "/b/", stream=True)
+        self.assertEqual(read(streamed), read(buffered))
+        self.assertTrue(read(streamed).startswith('<link href="/b/index.css">Big page'))
+
+    def test_front_matter_is_stripped(self):
+        write(self.source, "---\ntitle: Front\ntags: [a]\n---\n# Title\n\nBody\n")
+        for stream in (False, True):
+            dest = os.path.join(self.tmp.name, f"{stream}.html")
+            generate_page(self.source, self.template, dest, "/", stream=stream)
+            self.assertEqual(
+                read(dest),
+                '<link href="/index.css">Front<div><h1>Title</h1><p>Body</p></div>',
+            )
+
+    def test_streamed_page_error_removes_output(self):
+        write(self.source, "# Title\n\nfine\n\nnot **closed\n")
+        dest = os.path.join(self.tmp.name, "out.html")
+        with self.assertRaises(ValueError):
+            generate_page(self.source, self.template, dest, "/", stream=True)
+        self.assertFalse(os.path.exists(dest))
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
@@ -0,0 +1,78 @@
+import json
+import os
+import tempfile
+import unittest
+
+import highlight
+from highlight import HighlightCache, regex_lexer, register_lexer
+from highlight import highlight as highlight_code
+
+
+class TestHighlight(unittest.TestCase):
+    def tearDown(self):
+        _ = highlight.LEXERS.pop("tolkien", None)
+
+    def test_python(self):
+        self.assertEqual(
+            highlight_code('def tom(x):\n    return "<hat>" # 1\n', "Python"),
+            '<span class="k">def</span> <span class="nf">tom</span>(x):\n'
+            '    <span class="k">return</span> <span class="s">"&lt;hat&gt;"</span> '
+            '<span class="c"># 1</span>\n',
+        )
+
+    def test_rules_in_order(self):
+        self.assertEqual(
+            highlight_code('{"if": true, "n": -1.5e3}', "json"),
+            '{<span class="nt">"if"</span>: <span class="k">true</span>, '
+            '<span class="nt">"n"</span>: <span class="m">-1.5e3</span>}',
+        )
+        self.assertEqual(
+            highlight_code('echo "$HOME" # x#y', "sh"),
+            'echo <span class="s">"$HOME"</span> <span class="c"># x#y</span>',
+        )
+
+    def test_unknown_language(self):
+        self.assertIsNone(highlight_code("tom", "tolkien"))
+
+    def test_register_lexer(self):
+        register_lexer(regex_lexer([("nb", r"Tom"), ("k", r"&")]), "Tolkien")
+        self.assertEqual(
+            highlight_code("Tom & Jerry", "tolkien"),
+            '<span class="nb">Tom</span> <span class="k">&amp;</span> Jerry',
+        )
+
+
+class TestHighlightCache(unittest.TestCase):
+    def test_cache(self):
+        cache = HighlightCache()
+        code = "const tom = `bombadil`;\n"
+        html = highlight_code(code, "js", cache)
+        self.assertEqual(highlight_code(code, "JS", cache), html)
+        self.assertEqual((cache.hits, cache.misses, len(cache.entries)), (1, 1, 1))
+
+    def test_evicts_least_recently_used(self):
+        cache = HighlightCache(1)
+        _ = highlight_code("a", "py", cache)
+        _ = highlight_code("b", "py", cache)
+        self.assertEqual(len(cache.entries), 1)
+        self.assertRaises(ValueError, HighlightCache, 0)
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as root:
+            cache_path = os.path.join(root, "cache", "highlight.json")
+            cache = HighlightCache.load(cache_path)
+            html = highlight_code("print(1)", "python", cache)
+            cache.save()
+            loaded = HighlightCache.load(cache_path)
+            self.assertEqual(highlight_code("print(1)", "python", loaded), html)
+            self.assertEqual((loaded.hits, loaded.misses), (1, 0))
+            with open(cache_path) as f:
+                data = json.load(f)
+            data["lexers"] = "0"
+            with open(cache_path, "w") as f:
+                json.dump(data, f)
+            self.assertEqual(len(HighlightCache.load(cache_path).entries), 0)
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
@@ -1,3 +1,4 @@
+import io
 import unittest
 
 from htmlnode import HTMLNode, LeafNode, ParentNode
@@ -139,6 +140,41 @@ class TestHTMLNode(unittest.TestCase):
             "<div><span><b>grandchild</b></span></div>",
         )
 
+    def test_iter_html_chunks(self):
+        grandchildnode: LeafNode = LeafNode("b", "grandchild")
+        childnode: ParentNode = ParentNode("span", [grandchildnode])
+        parentnode: ParentNode = ParentNode("div", [childnode], {"class": "x"})
+        self.assertEqual(
+            list(parentnode.iter_html()),
+            ['<div class="x">', "<span>", "<b>grandchild</b>", "</span>", "</div>"],
+        )
+
+    def test_write_html(self):
+        parentnode: ParentNode = ParentNode(
+            "div", [LeafNode("span", "child"), LeafNode(None, "text")]
+        )
+        fp = io.StringIO()
+        parentnode.write_html(fp)
+        self.assertEqual(fp.getvalue(), parentnode.to_html())
+        self.assertEqual(fp.getvalue(), "<div><span>child</span>text</div>")
+
+    def test_to_html_deep_tree(self):
+        node: ParentNode = ParentNode("b", [LeafNode(None, "deep")])
+        for _ in range(5000):
+            node = ParentNode("i", [node])
+        html = node.to_html()
+        self.assertTrue(html.startswith("<i><i>"))
+        self.assertEqual(len(html), 5000 * len("<i></i>") + len("<b>deep</b>"))
+
+    def test_to_html_nested_missing_children(self):
+        parentnode: ParentNode = ParentNode("div", [ParentNode("p", None)])
+        self.assertRaises(ValueError, parentnode.to_html)
+
+    def test_nodes_have_no_dict(self):
+        self.assertEqual(HTMLNode.__slots__, ("tag", "value", "children", "props"))
+        for node in (HTMLNode(), LeafNode("b", "x"), ParentNode("p", [])):
+            self.assertFalse(hasattr(node, "__dict__"))
+
 
 if __name__ == "__main__":
     _ = unittest.main()
@@ -0,0 +1,95 @@
+import os
+import tempfile
+import unittest
+
+from build_plan import plan_build
+from link_checker import BrokenLinksError, Link, LinkIndex, iter_markdown_links
+
+
+def write(file_path: str, text: str) -> None:
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, "w") as f:
+        _ = f.write(text)
+
+
+class TestIterMarkdownLinks(unittest.TestCase):
+    def test_line_numbers(self):
+        md = "# Title\n\n[a](/a) text\nmore ![b](/b.png)\n\n\n- [c](c)\n"
+        self.assertEqual(
+            list(iter_markdown_links(md.splitlines(keepends=True))),
+            [(3, "/a", False), (4, "/b.png", True), (7, "c", False)],
+        )
+
+    def test_ignores_code(self):
+        md = "```\n[a](/a)\n```\n\n`[b](/b)` and **[c](/c)**\n\n[d](/d)"
+        self.assertEqual(list(iter_markdown_links(md.splitlines())), [(7, "/d", False)])
+
+
+class TestLinkIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.static = os.path.join(root, "static")
+        self.docs = os.path.join(root, "docs")
+        write(os.path.join(self.static, "images", "a.png"), "")
+        write(
+            os.path.join(self.content, "index.md"),
+            "# Home\n\n[Blog](/blog) [Post](/blog/post.html#top) [Web](https://x.y)\n\n"
+            "![A](/images/a.png) [Up](#top)",
+        )
+        write(
+            os.path.join(self.content, "blog", "index.md"),
+            "# Blog\n\n[Post](post.html) [Home](../)\n\n[Gone](/blog/gone)\n\n"
+            "![Missing](/images/b.png)\n\n`[Code](/nowhere)`",
+        )
+        write(
+            os.path.join(self.content, "blog", "post.md"),
+            "---\ndate: 2024-03-01\n---\n# Post\n\n[Gone](gone)",
+        )
+        self.plan = plan_build(self.content, self.docs)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def check(self, base_path: str) -> LinkIndex:
+        index = LinkIndex(base_path)
+        index.check_plan(self.plan, self.docs, self.static)
+        return index
+
+    def test_reports_broken_links_with_lines(self):
+        index = self.check("/")
+        blog = os.path.join(self.content, "blog", "index.md")
+        post = os.path.join(self.content, "blog", "post.md")
+        self.assertEqual(
+            sorted(index.broken),
+            sorted(
+                [
+                    Link(blog, 5, "/blog/gone", False),
+                    Link(blog, 7, "/images/b.png", True),
+                    Link(post, 6, "gone", False),
+                ]
+            ),
+        )
+        self.assertEqual(index.summary(), "Checked 11 URL(s) on 3 page(s), 3 broken")
+
+    def test_urls_are_checked_after_base_path_rewriting(self):
+        index = self.check("/site/")
+        self.assertEqual(
+            sorted(link.url for link in index.broken),
+            ["/site/blog/gone", "/site/images/b.png", "gone"],
+        )
+
+    def test_site_path(self):
+        index = LinkIndex("/site/")
+        self.assertEqual(index.site_path("/site/a/../b/?q=1", "/x.html"), "/b/")
+        self.assertEqual(index.site_path("c.html#d", "/a/b.html"), "/a/c.html")
+        self.assertIsNone(index.site_path("/elsewhere", "/index.html"))
+
+    def test_error_summary(self):
+        error = BrokenLinksError([Link("a.md", 2, "/b", False)] * 2)
+        self.assertEqual(str(error), "Broken link in a.md:2 to /b (and 1 more)")
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
@@ -0,0 +1,180 @@
+import os
+import tempfile
+import unittest
+
+from build_plan import BuildPlan, PlannedPage, plan_build
+from front_matter import PageMetadata
+from listings import ListingPage, plan_listings, tag_slug, write_listings
+from metadata_index import MetadataIndex
+from template import Template
+
+
+def write(file_path: str, text: str) -> None:
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, "w") as f:
+        _ = f.write(text)
+
+
+class TestListings(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.docs = os.path.join(self.tmp.name, "docs")
+        write(os.path.join(self.content, "index.md"), "# Home")
+        write(
+            os.path.join(self.content, "blog", "tom", "index.md"),
+            "---\ndate: 2024-03-01\ntags: [Tolkien, Middle Earth]\nslug: bombadil\n"
+            "---\n# Tom [Bombadil]\n",
+        )
+        write(
+            os.path.join(self.content, "blog", "ents.md"),
+            '+++\ndate = 2023-05-02\ntags = ["tolkien"]\n+++\n# Ents\n',
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def index(self) -> MetadataIndex:
+        metadata = MetadataIndex(os.path.join(self.tmp.name, "metadata.json"))
+        metadata.update(plan_build(self.content, self.docs))
+        return metadata
+
+    def test_listings(self):
+        metadata = self.index()
+        plan = metadata.publish(plan_build(self.content, self.docs))
+        listings = {
+            os.path.relpath(listing.dest, self.docs): listing.markdown
+            for listing in plan_listings(plan, metadata, self.docs)
+        }
+        tom = "- [Tom &#91;Bombadil&#93;](/blog/bombadil/) (2024-03-01)"
+        ents = "- [Ents](/blog/ents.html) (2023-05-02)"
+        self.assertEqual(
+            listings,
+            {
+                os.path.join("blog", "index.html"): f"# Blog\n\n{tom}\n{ents}",
+                os.path.join("blog", "tags", "middle-earth", "index.html"): (
+                    f"# Posts tagged Middle Earth\n\n{tom}"
+                ),
+                os.path.join("blog", "tags", "tolkien", "index.html"): (
+                    f"# Posts tagged Tolkien\n\n{tom}\n{ents}"
+                ),
+                os.path.join("blog", "tags", "index.html"): (
+                    "# Tags\n\n- [Middle Earth](/blog/tags/middle-earth/) (1)\n"
+                    "- [Tolkien](/blog/tags/tolkien/) (2)"
+                ),
+                os.path.join("blog", "archive", "index.html"): (
+                    f"# Blog archive\n\n## 2024\n\n{tom}\n\n## 2023\n\n{ents}"
+                ),
+            },
+        )
+
+    def test_listing_sources(self):
+        metadata = self.index()
+        plan = metadata.publish(plan_build(self.content, self.docs))
+        tom = os.path.join(self.content, "blog", "tom", "index.md")
+        ents = os.path.join(self.content, "blog", "ents.md")
+        sources = {
+            os.path.relpath(listing.dest, self.docs): listing.sources
+            for listing in plan_listings(plan, metadata, self.docs)
+        }
+        self.assertEqual(sources[os.path.join("blog", "index.html")], (tom, ents))
+        self.assertEqual(
+            sources[os.path.join("blog", "tags", "middle-earth", "index.html")], (tom,)
+        )
+
+    def test_pagination(self):
+        metadata = self.index()
+        plan = metadata.publish(plan_build(self.content, self.docs))
+        listings = {
+            os.path.relpath(listing.dest, self.docs): listing
+            for listing in plan_listings(plan, metadata, self.docs, page_size=1)
+        }
+        index = os.path.join("blog", "index.html")
+        page = os.path.join("blog", "page", "1", "index.html")
+        self.assertEqual(
+            listings[page].markdown,
+            "# Blog, page 1\n\n- [Ents](/blog/ents.html) (2023-05-02)\n\n"
+            "[Newer posts](/blog/)",
+        )
+        self.assertEqual(listings[page].pages, (os.path.join(self.docs, index),))
+        self.assertEqual(
+            listings[index].markdown,
+            "# Blog\n\n- [Tom &#91;Bombadil&#93;](/blog/bombadil/) (2024-03-01)\n\n"
+            "[Older posts](/blog/page/1/)",
+        )
+        tolkien = os.path.join("blog", "tags", "tolkien")
+        self.assertIn(os.path.join(tolkien, "page", "1", "index.html"), listings)
+
+    def test_new_posts_only_change_the_newest_page(self):
+        def listings(posts: int) -> dict[str, ListingPage]:
+            metadata = MetadataIndex("unused.json")
+            pages = []
+            for i in range(posts):
+                source = os.path.join("content", "blog", f"{i}.md")
+                date = f"2024-01-{i + 1:02}"
+                metadata.entries[source] = (
+                    0,
+                    0,
+                    PageMetadata(f"Post {i}", date, (), False, ""),
+                )
+                dest = os.path.join("docs", "blog", f"{i}.html")
+                pages.append(PlannedPage(source, dest, 0, 0, ()))
+            plan = BuildPlan(tuple(pages), ("docs",))
+            return {
+                os.path.relpath(listing.dest, "docs"): listing
+                for listing in plan_listings(plan, metadata, "docs", page_size=3)
+                if listing.dest.startswith(os.path.join("docs", "blog", "page"))
+                or listing.dest == os.path.join("docs", "blog", "index.html")
+            }
+
+        before = listings(10)
+        self.assertEqual(len(before), 3)  # 2 numbered pages, 4 posts on the index
+        after = listings(11)
+        changed = [dest for dest in after if before.get(dest) != after[dest]]
+        self.assertEqual(changed, [os.path.join("blog", "index.html")])
+        after = listings(12)  # Splits off a page, which its neighbour links to
+        changed = [dest for dest in after if before.get(dest) != after[dest]]
+        self.assertEqual(
+            changed,
+            [
+                os.path.join("blog", "page", str(number), "index.html")
+                for number in (2, 3)
+            ]
+            + [os.path.join("blog", "index.html")],
+        )
+
+    def test_write_listings_only_when_changed(self):
+        metadata = self.index()
+        plan = metadata.publish(plan_build(self.content, self.docs))
+        listings = plan_listings(plan, metadata, self.docs)
+        template = Template.compile("{{ Title }}{{ Content }}", "/site/")
+        self.assertEqual(write_listings(listings, template, "/site/"), 5)
+        self.assertEqual(write_listings(listings, template, "/site/"), 0)
+        with open(os.path.join(self.docs, "blog", "archive", "index.html")) as f:
+            self.assertIn('href="/site/blog/ents.html"', f.read())
+
+    def test_titles_and_tags_are_escaped(self):
+        write(
+            os.path.join(self.content, "blog", "snake.md"),
+            "---\ntitle: Using snake_case `names` <b>\ntags: [snake_case]\n---\n# x\n",
+        )
+        metadata = self.index()
+        plan = metadata.publish(plan_build(self.content, self.docs))
+        listings = plan_listings(plan, metadata, self.docs)
+        template = Template.compile("{{ Title }}{{ Content }}")
+        self.assertEqual(write_listings(listings, template, "/"), 6)
+        with open(os.path.join(self.docs, "blog", "index.html")) as f:
+            self.assertIn(
+                ">Using snake&#95;case &#96;names&#96; &#60;b&#62;</a>", f.read()
+            )
+        with open(os.path.join(self.docs, "blog", "tags", "index.html")) as f:
+            self.assertIn(">snake&#95;case</a>", f.read())
+
+    def test_tag_slug(self):
+        self.assertEqual(tag_slug("Middle Earth!"), "middle-earth")
+        self.assertEqual(tag_slug("C++"), "c")
+        self.assertEqual(tag_slug("??"), "-")
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
@@ -1,5 +1,9 @@
 import unittest
+import io
+
 from markdown_blocks import (
+    iter_markdown_blocks,
+    iter_markdown_html,
     markdown_to_html_node,
     markdown_to_blocks,
     block_to_block_type,
@@ -51,6 +55,43 @@ This is the same paragraph on a new line
             ],
         )
 
+    def test_iter_markdown_blocks(self):
+        md = """
+This is **bolded** paragraph
+
+
+
+This is another paragraph with _italic_ text and `code` here
+This is the same paragraph on a new line
+   
+ 
+- This is a list
+- with items
+"""
+        self.assertEqual(
+            list(iter_markdown_blocks(io.StringIO(md))), markdown_to_blocks(md)
+        )
+        self.assertEqual(
+            list(iter_markdown_blocks(md.split("\n"))), markdown_to_blocks(md)
+        )
+
+    def test_iter_markdown_html(self):
+        md = """# Title
+
+Paragraph with [a link](/blog) and ![img](/img.png)
+
+- one
+- two
+
+```
+code
+```
+"""
+        self.assertEqual(
+            "".join(iter_markdown_html(io.StringIO(md), "/site/")),
+            markdown_to_html_node(md, "/site/").to_html(),
+        )
+
     def test_block_to_block_types(self):
         block = "# heading"
         self.assertEqual(block_to_block_type(block), BlockType.HEADING)
@@ -65,6 +106,24 @@ This is the same paragraph on a new line
         block = "paragraph"
         self.assertEqual(block_to_block_type(block), BlockType.PARAGRAPH)
 
+    def test_block_to_block_types_edge_cases(self):
+        self.assertEqual(block_to_block_type("####### seven"), BlockType.PARAGRAPH)
+        self.assertEqual(block_to_block_type("#no space"), BlockType.PARAGRAPH)
+        self.assertEqual(block_to_block_type("####"), BlockType.PARAGRAPH)
+        self.assertEqual(block_to_block_type("```"), BlockType.PARAGRAPH)
+        self.assertEqual(block_to_block_type("```\ncode"), BlockType.PARAGRAPH)
+        self.assertEqual(block_to_block_type("``````"), BlockType.CODE)
+        self.assertEqual(block_to_block_type(">quote\nnot"), BlockType.QUOTE)
+        self.assertEqual(block_to_block_type("-not a list"), BlockType.PARAGRAPH)
+        self.assertEqual(block_to_block_type("1. a\n2. b\n"), BlockType.OLIST)
+        self.assertEqual(block_to_block_type("1. a\n2. b\nc"), BlockType.PARAGRAPH)
+        self.assertEqual(block_to_block_type("2. a\n3. b"), BlockType.PARAGRAPH)
+
+    def test_block_to_block_type_long_ordered_list(self):
+        block = "\n".join(f"{i + 1}. item" for i in range(100_000))
+        self.assertEqual(block_to_block_type(block), BlockType.OLIST)
+        self.assertEqual(block_to_block_type(block + "\nx"), BlockType.PARAGRAPH)
+
     def test_paragraph(self):
         md = """
 This is **bolded** paragraph
@@ -165,6 +224,18 @@ the **same** even with inline stuff
             "<div><pre><code>This is text that _should_ remain\nthe **same** even with inline stuff\n</code></pre></div>",
         )
 
+    def test_code_with_language(self):
+        md = "```python title\nprint(1)\n```\n\n```tolkien\nTom\n```"
+        self.assertEqual(
+            markdown_to_html_node(md).to_html(),
+            '<div><pre><code class="language-python"><span class="nb">print</span>'
+            '(<span class="m">1</span>)\n</code></pre><pre><code>Tom\n</code></pre></div>',
+        )
+        self.assertEqual(
+            markdown_to_html_node("```python x```").to_html(),
+            "<div><pre><code></code></pre></div>",
+        )
+
     def test_markdown_to_html(self):
         md = """
 This is **bolded** paragraph
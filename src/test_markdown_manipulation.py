@@ -1,5 +1,10 @@
 from unittest import TestCase
-from markdown_manipulation import extract_markdown_title
+import io
+
+from markdown_manipulation import (
+    extract_markdown_title,
+    extract_markdown_title_from_lines,
+)
 
 
 class TestMarkdownManipulation(TestCase):
@@ -30,3 +35,19 @@ This is more text
 This is even more text
 """
         self.assertRaises(ValueError, extract_markdown_title, md)
+
+    def test_extract_title_from_lines(self):
+        md = """
+this is text
+#not a title
+# This is a markdown title  
+
+# This is another title
+"""
+        title: str = extract_markdown_title_from_lines(io.StringIO(md))
+        self.assertEqual(title, extract_markdown_title(md))
+        self.assertEqual(title, "This is a markdown title")
+
+    def test_extract_title_from_lines_no_title(self):
+        lines = io.StringIO("this is text\n\n## Not a title\n")
+        self.assertRaises(ValueError, extract_markdown_title_from_lines, lines)
@@ -0,0 +1,92 @@
+import os
+import tempfile
+import unittest
+
+from build_plan import plan_build
+from metadata_index import MetadataError, MetadataIndex
+
+
+def write(file_path: str, text: str) -> None:
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, "w") as f:
+        _ = f.write(text)
+
+
+class TestMetadataIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.docs = os.path.join(self.tmp.name, "docs")
+        self.index_path = os.path.join(self.tmp.name, "metadata.json")
+        write(os.path.join(self.content, "index.md"), "# Home")
+        write(
+            os.path.join(self.content, "blog", "tom", "index.md"),
+            "---\ndate: 2024-03-01\ntags: [Tolkien, Middle Earth]\nslug: bombadil\n"
+            "---\n# Tom [Bombadil]\n",
+        )
+        write(
+            os.path.join(self.content, "blog", "ents.md"),
+            '+++\ndate = 2023-05-02\ntags = ["tolkien"]\n+++\n# Ents\n',
+        )
+        write(
+            os.path.join(self.content, "blog", "draft.md"),
+            "---\ndraft: true\n---\n# Draft\n",
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def index(self) -> MetadataIndex:
+        metadata = MetadataIndex.load(self.index_path)
+        metadata.update(plan_build(self.content, self.docs))
+        metadata.save()
+        return metadata
+
+    def test_reads_only_changed_pages(self):
+        self.assertEqual(self.index().read, 4)
+        self.assertEqual(self.index().read, 0)
+        write(os.path.join(self.content, "blog", "ents.md"), "# Ents\n\nMore")
+        metadata = self.index()
+        self.assertEqual(metadata.read, 1)
+        source = os.path.join(self.content, "blog", "ents.md")
+        self.assertEqual(metadata.metadata(source).title, "Ents")
+        os.remove(source)
+        self.assertNotIn(source, self.index().entries)
+
+    def test_publish_drops_drafts_and_applies_slugs(self):
+        metadata = self.index()
+        plan = plan_build(self.content, self.docs)
+        published = metadata.publish(plan)
+        blog = os.path.join(self.docs, "blog")
+        self.assertEqual(
+            published.outputs(),
+            {
+                os.path.join(self.docs, "index.html"),
+                os.path.join(blog, "bombadil", "index.html"),
+                os.path.join(blog, "ents.html"),
+            },
+        )
+        self.assertIn(os.path.join(blog, "bombadil"), published.dest_dirs)
+        self.assertEqual(metadata.drafts, 1)
+        self.assertEqual(len(metadata.publish(plan, drafts=True).pages), 4)
+
+    def test_malformed_front_matter_lists_every_page(self):
+        bad = [os.path.join(self.content, "blog", name) for name in ("a.md", "b.md")]
+        for source in bad:
+            write(source, "---\ndate: not-a-date\n---\n# Bad\n")
+        with self.assertRaises(MetadataError) as cm:
+            _ = self.index()
+        self.assertCountEqual([f[0] for f in cm.exception.failures], bad)
+        self.assertTrue(cm.exception.failures[0][1].startswith("Invalid date"))
+
+    def test_duplicate_destination(self):
+        write(
+            os.path.join(self.content, "blog", "tom.md"),
+            "---\nslug: ents\n---\n# Tom",
+        )
+        with self.assertRaisesRegex(ValueError, "tom.md: another page"):
+            _ = self.index().publish(plan_build(self.content, self.docs))
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
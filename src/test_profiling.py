@@ -0,0 +1,102 @@
+import json
+import os
+import tempfile
+import unittest
+
+from functools import partial
+
+from fragment_cache import FragmentCache
+from generate_files import generate_page, generate_pages
+from profiling import PAGE_STAGES, BuildProfiler, percentile
+from render_cache import RenderCache
+
+
+class TestProfiling(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.template_path = os.path.join(root, "template.html")
+        with open(self.template_path, "w") as f:
+            _ = f.write('<link href="/index.css">{{ Title }}{{ Content }}')
+        self.sources = []
+        for i in range(3):
+            source = os.path.join(root, f"page{i}.md")
+            with open(source, "w") as f:
+                _ = f.write(f"# Page {i}\n\n" + "Text [link](/x) **b**\n\n" * i)
+            self.sources.append(source)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_percentile(self):
+        values = [float(v) for v in range(1, 101)]
+        self.assertEqual(percentile(values, 50), 50.0)
+        self.assertEqual(percentile(values, 99), 99.0)
+        self.assertEqual(percentile([3.0], 90), 3.0)
+        self.assertEqual(percentile([], 50), 0.0)
+
+    def test_profiled_page_matches_generated_page(self):
+        profiled = os.path.join(self.tmp.name, "out", "profiled.html")
+        generated = os.path.join(self.tmp.name, "out", "generated.html")
+        profiler = BuildProfiler()
+        generate = partial(
+            generate_page, self.sources[2], self.template_path, profiled, "/b/"
+        )
+        page = profiler.profile_page(self.sources[2], profiled, generate)
+        generate_page(self.sources[2], self.template_path, generated, "/b/")
+        with open(profiled) as a, open(generated) as b:
+            self.assertEqual(a.read(), b.read())
+        self.assertEqual(set(page.stages), set(PAGE_STAGES))
+        self.assertGreater(page.stages["render"], 0.0)
+
+    def test_profiled_pages_use_caches(self):
+        pages = [
+            (source, os.path.join(self.tmp.name, "out", f"page{i}.html"))
+            for i, source in enumerate(self.sources)
+        ]
+        render_cache = RenderCache(os.path.join(self.tmp.name, "cache"))
+        cache = FragmentCache()
+        generate_pages(
+            pages,
+            self.template_path,
+            "/",
+            profiler=BuildProfiler(),
+            cache=cache,
+            render_cache=render_cache,
+        )
+        self.assertGreater(cache.hits, 0)
+        self.assertEqual(len(render_cache.entries()), 3)
+        profiler = BuildProfiler()
+        generate_pages(
+            pages, self.template_path, "/", profiler=profiler, render_cache=render_cache
+        )
+        for page in profiler.pages:
+            self.assertGreater(page.stages["cache"], 0.0)
+            self.assertEqual(page.stages["render"], 0.0)
+
+    def test_report(self):
+        cprofile_dir = os.path.join(self.tmp.name, "prof")
+        profiler = BuildProfiler(cprofile_dir)
+        with profiler.stage("static_copy"):
+            pass
+        for i, source in enumerate(self.sources):
+            dest = os.path.join(self.tmp.name, "out", f"page{i}.html")
+            generate = partial(generate_page, source, self.template_path, dest, "/")
+            _ = profiler.profile_page(source, dest, generate)
+        report_path = os.path.join(self.tmp.name, "report.json")
+        profiler.write_report(report_path, top=2)
+        with open(report_path) as f:
+            report = json.load(f)
+        self.assertEqual(report["pages"], 3)
+        self.assertIn("static_copy", report["build_stages"])
+        self.assertEqual(set(report["page_stage_totals"]), set(PAGE_STAGES))
+        self.assertIn("p90", report["page_percentiles"]["total"])
+        self.assertEqual(len(report["slowest_pages"]), 2)
+        self.assertGreaterEqual(
+            report["slowest_pages"][0]["total"], report["slowest_pages"][1]["total"]
+        )
+        self.assertEqual(len(os.listdir(cprofile_dir)), 3)
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
@@ -0,0 +1,115 @@
+import os
+import tempfile
+import unittest
+
+from generate_files import generate_page
+from render_cache import RenderCache, generator_version
+from template import Template
+
+
+def write(file_path, text):
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, "w") as f:
+        _ = f.write(text)
+
+
+def read(file_path):
+    with open(file_path) as f:
+        return f.read()
+
+
+class TestRenderCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.cache = RenderCache(os.path.join(root, "cache"))
+        self.template_path = os.path.join(root, "template.html")
+        write(self.template_path, '<link href="/i.css">{{ Title }}{{ Content }}')
+        self.source = os.path.join(root, "content", "index.md")
+        write(self.source, "# Home\n\n[link](/blog)")
+        self.dest = os.path.join(root, "docs", "index.html")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_key(self):
+        template = Template.load(self.template_path, "/")
+        key = self.cache.key(self.source, template, "/")
+        self.assertEqual(key, self.cache.key(self.source, template, "/"))
+        other_base = Template.load(self.template_path, "/site/")
+        self.assertNotEqual(key, self.cache.key(self.source, other_base, "/site/"))
+        write(self.source, "# Home\n\nedited")
+        self.assertNotEqual(key, self.cache.key(self.source, template, "/"))
+        self.assertEqual(len(generator_version()), 64)
+
+    def test_generate_page_uses_cache(self):
+        generate_page(
+            self.source,
+            self.template_path,
+            self.dest,
+            "/site/",
+            render_cache=self.cache,
+        )
+        expected = read(self.dest)
+        self.assertEqual(self.cache.stats().entries, 1)
+        os.remove(self.dest)
+        template = Template.load(self.template_path, "/site/")
+        key = self.cache.key(self.source, template, "/site/")
+        write(self.cache.entry_path(key), "cached")
+        generate_page(
+            self.source,
+            self.template_path,
+            self.dest,
+            "/site/",
+            render_cache=self.cache,
+        )
+        self.assertEqual(read(self.dest), "cached")
+        write(self.cache.entry_path(key), expected)
+        generate_page(
+            self.source, self.template_path, self.dest, "/", render_cache=self.cache
+        )
+        self.assertEqual(self.cache.stats().entries, 2)
+        self.assertNotEqual(read(self.dest), expected)
+
+    def test_base_path_is_part_of_key(self):
+        # No root-relative links in the template, so its digest is the same
+        write(self.template_path, "<title>{{ Title }}</title>{{ Content }}")
+        for base_path in ("/a/", "/b/"):
+            generate_page(
+                self.source,
+                self.template_path,
+                self.dest,
+                base_path,
+                render_cache=self.cache,
+            )
+            self.assertIn(f'href="{base_path}blog"', read(self.dest))
+        self.assertEqual(self.cache.stats().entries, 2)
+
+    def test_prune_evicts_least_recently_used(self):
+        template = Template.compile("{{ Title }}{{ Content }}")
+        keys = []
+        for i in range(3):
+            source = os.path.join(self.tmp.name, f"page{i}.md")
+            write(source, f"# Page {i}")
+            page = os.path.join(self.tmp.name, f"page{i}.html")
+            write(page, "x" * 100)
+            key = self.cache.key(source, template, "/")
+            self.cache.store(key, page)
+            os.utime(self.cache.entry_path(key), (i, i))
+            keys.append(key)
+        self.assertTrue(self.cache.fetch(keys[0], self.dest))
+        self.assertEqual(self.cache.prune(200), (1, 100))
+        self.assertFalse(os.path.exists(self.cache.entry_path(keys[1])))
+        self.assertTrue(os.path.exists(self.cache.entry_path(keys[0])))
+        self.assertEqual(self.cache.stats().size, 200)
+        self.assertEqual(self.cache.prune(0), (2, 200))
+        self.assertEqual(os.listdir(self.cache.cache_dir), [])
+
+    def test_fetch_missing(self):
+        self.assertFalse(self.cache.fetch("ab" * 32, self.dest))
+        self.assertFalse(os.path.exists(self.dest))
+        self.assertEqual(self.cache.stats().entries, 0)
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
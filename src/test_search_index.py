@@ -0,0 +1,133 @@
+import json
+import os
+import tempfile
+import unittest
+
+from build_plan import plan_build
+from search_index import SearchIndex, page_terms, shard_name, tokenize
+
+
+def write(file_path: str, text: str) -> None:
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, "w") as f:
+        _ = f.write(text)
+
+
+def read_json(file_path: str):
+    with open(file_path) as f:
+        return json.load(f)
+
+
+class TestPageTerms(unittest.TestCase):
+    def test_tokenize(self):
+        self.assertEqual(tokenize("Tom's *hat*, 2_b"), ["tom", "s", "hat", "2", "b"])
+
+    def test_shard_name(self):
+        self.assertEqual(shard_name("tolkien"), "to")
+        self.assertEqual(shard_name("a"), "a")
+        self.assertEqual(shard_name("élan"), "ue9")
+
+    def test_terms_from_textnodes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, "index.md")
+            write(
+                source,
+                "# Tom **Bombadil**\n\n- a [link](/skip/url)\n\n```\nprint(tom)\n```",
+            )
+            title, terms = page_terms(source)
+        self.assertEqual(title, "Tom **Bombadil**")  # As in the page's <title>
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, "index.md")
+            write(source, "---\ntitle: Front\ntags: [skip]\n---\n# Tom\n")
+            self.assertEqual(page_terms(source), ("Front", {"tom": [0]}))
+        self.assertEqual(
+            terms,
+            {"tom": [0, 5], "bombadil": [1], "a": [2], "link": [3], "print": [4]},
+        )
+
+
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.docs = os.path.join(self.tmp.name, "docs")
+        self.cache_dir = os.path.join(self.tmp.name, "cache")
+        write(os.path.join(self.content, "index.md"), "# Home\n\nTolkien fans")
+        write(os.path.join(self.content, "tom.md"), "# Tom\n\nTolkien wrote Tom")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self) -> SearchIndex:
+        index = SearchIndex.load(self.cache_dir)
+        index.index_plan(plan_build(self.content, self.docs), self.docs)
+        index.write(self.docs, "/site/")
+        index.save()
+        return index
+
+    def shard(self, name: str):
+        return read_json(os.path.join(self.docs, "search", "terms", f"{name}.json"))
+
+    def page_ids(self) -> dict[str, int]:
+        pages = read_json(os.path.join(self.docs, "search", "pages.json"))["pages"]
+        return {page[1]: i for i, page in enumerate(pages) if page is not None}
+
+    def test_writes_sharded_postings(self):
+        index = self.build()
+        ids = self.page_ids()
+        pages = read_json(os.path.join(self.docs, "search", "pages.json"))
+        self.assertIn(["/site/tom.html", "Tom"], pages["pages"])
+        self.assertIn("to", pages["shards"])
+        self.assertEqual(
+            self.shard("to"),
+            {
+                "tolkien": sorted([[ids["Home"], 1], [ids["Tom"], 1]]),
+                "tom": [[ids["Tom"], 0, 3]],
+            },
+        )
+        self.assertEqual((index.indexed, index.written), (2, len(index.shards)))
+
+    def test_reuses_unchanged_pages(self):
+        _ = self.build()
+        ids = self.page_ids()
+        index = self.build()
+        self.assertEqual((index.indexed, index.reused, index.written), (0, 2, 0))
+        write(os.path.join(self.content, "tom.md"), "# Tom\n\nBombadil")
+        index = self.build()
+        self.assertEqual((index.indexed, index.reused), (1, 1))
+        self.assertEqual(self.page_ids(), ids)
+        self.assertEqual(
+            self.shard("to"), {"tolkien": [[ids["Home"], 1]], "tom": [[ids["Tom"], 0]]}
+        )
+        self.assertEqual(self.shard("bo"), {"bombadil": [[ids["Tom"], 1]]})
+        self.assertFalse(
+            os.path.exists(os.path.join(self.docs, "search", "terms", "wr.json"))
+        )
+
+    def test_removed_pages_free_their_ids(self):
+        _ = self.build()
+        ids = self.page_ids()
+        os.remove(os.path.join(self.content, "tom.md"))
+        index = self.build()
+        self.assertEqual(index.removed, 1)
+        self.assertEqual(self.shard("to"), {"tolkien": [[ids["Home"], 1]]})
+        write(os.path.join(self.content, "new.md"), "# New\n\nTolkien")
+        _ = self.build()
+        self.assertEqual(self.page_ids()["New"], ids["Tom"])
+
+    def test_copies_missing_shards_from_cache(self):
+        _ = self.build()
+        expected = self.shard("to")
+        os.remove(os.path.join(self.docs, "search", "terms", "to.json"))
+        index = self.build()
+        self.assertEqual((index.indexed, index.written), (0, 1))
+        self.assertEqual(self.shard("to"), expected)
+
+    def test_incomplete_cache_is_ignored(self):
+        _ = self.build()
+        os.remove(os.path.join(self.cache_dir, "terms", "to.json"))
+        self.assertEqual(SearchIndex.load(self.cache_dir).pages, {})
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
@@ -0,0 +1,24 @@
+import unittest
+
+from sizes import format_size, parse_size
+
+
+class TestSizes(unittest.TestCase):
+    def test_parse_size(self):
+        self.assertEqual(parse_size("512"), 512)
+        self.assertEqual(parse_size("2K"), 2048)
+        self.assertEqual(parse_size("1.5gb"), 3 * 1024**3 // 2)
+        self.assertRaises(ValueError, parse_size, "lots")
+
+    def test_format_size(self):
+        self.assertEqual(format_size(512), "512.0 B")
+        self.assertEqual(format_size(3 * 1024**2), "3.0 MiB")
+
+    def test_round_trip(self):
+        for size in (512, 2048, 3 * 1024**2, 5 * 1024**3):
+            self.assertEqual(parse_size(format_size(size)), size)
+        self.assertRaises(ValueError, parse_size, "2i")
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
@@ -0,0 +1,143 @@
+import io
+import unittest
+
+from htmlnode import LeafNode, ParentNode
+from markdown_blocks import markdown_to_html_node
+from template import AssetMap, Template, minify_html, rewrite_url
+
+
+class TestTemplate(unittest.TestCase):
+    def test_compile_segments_and_slots(self):
+        template = Template.compile("<h1>{{ Title }}</h1><main>{{ Content }}</main>")
+        self.assertEqual(template.segments, ["<h1>", "</h1><main>", "</main>"])
+        self.assertEqual(template.slots, ["Title", "Content"])
+
+    def test_render(self):
+        template = Template.compile("<title>{{ Title }}</title>{{ Content }}")
+        self.assertEqual(
+            template.render({"Title": "Home", "Content": "<p>hi</p>"}),
+            "<title>Home</title><p>hi</p>",
+        )
+
+    def test_render_missing_slot(self):
+        template = Template.compile("{{ Title }}")
+        self.assertRaises(KeyError, template.render, {})
+
+    def test_write_streams_html_nodes(self):
+        template = Template.compile("<title>{{ Title }}</title>{{ Content }}!")
+        fp = io.StringIO()
+        template.write(
+            fp, {"Title": "Home", "Content": ParentNode("p", [LeafNode("b", "hi")])}
+        )
+        self.assertEqual(fp.getvalue(), "<title>Home</title><p><b>hi</b></p>!")
+
+    def test_base_path_rewrites_template_attributes(self):
+        template = Template.compile(
+            '<link href="/index.css" /><img src="/logo.png" />{{ Content }}',
+            "/site/",
+        )
+        self.assertEqual(
+            template.render({"Content": ""}),
+            '<link href="/site/index.css" /><img src="/site/logo.png" />',
+        )
+
+    def test_base_path_not_applied_to_inserted_content(self):
+        template = Template.compile("{{ Content }}", "/site/")
+        content = '<pre><code>a href="/x"</code></pre>'
+        self.assertEqual(template.render({"Content": content}), content)
+
+    def test_rewrite_url(self):
+        self.assertEqual(rewrite_url("/blog/tom", "/site/"), "/site/blog/tom")
+        self.assertEqual(rewrite_url("/blog/tom", "/"), "/blog/tom")
+        self.assertEqual(
+            rewrite_url("https://www.boot.dev", "/site/"), "https://www.boot.dev"
+        )
+
+    def test_content_links_use_base_path(self):
+        md = "[home](/) and ![tom](/images/tom.png)"
+        html = markdown_to_html_node(md, "/site/").to_html()
+        self.assertEqual(
+            html,
+            '<div><p><a href="/site/">home</a> and '
+            '<img src="/site/images/tom.png" alt="tom"></img></p></div>',
+        )
+
+
+class TestAssetMap(unittest.TestCase):
+    assets = AssetMap({"/index.css": "/index.1234abcd.css"})
+
+    def test_rewrite_url(self):
+        self.assertEqual(
+            rewrite_url("/index.css", "/site/", self.assets),
+            "/site/index.1234abcd.css",
+        )
+        self.assertEqual(rewrite_url("/blog", "/site/", self.assets), "/site/blog")
+
+    def test_compile_rewrites_template_attributes(self):
+        template = Template.compile(
+            '<link href="/index.css" /><a href="/blog">{{ Content }}</a>',
+            "/site/",
+            assets=self.assets,
+        )
+        self.assertEqual(
+            template.segments[0],
+            '<link href="/site/index.1234abcd.css" /><a href="/site/blog">',
+        )
+        self.assertIs(template.assets, self.assets)
+
+    def test_digest_changes_with_assets(self):
+        html = '<link href="/index.css" />{{ Content }}'
+        self.assertEqual(
+            Template.compile(html).digest,
+            Template.compile(html, assets=AssetMap()).digest,
+        )
+        self.assertNotEqual(
+            Template.compile(html).digest,
+            Template.compile(html, assets=self.assets).digest,
+        )
+
+    def test_content_links_use_assets(self):
+        md = "[style](/index.css) and ![css](/index.css)"
+        html = markdown_to_html_node(md, "/", assets=self.assets).to_html()
+        self.assertEqual(
+            html,
+            '<div><p><a href="/index.1234abcd.css">style</a> and '
+            '<img src="/index.1234abcd.css" alt="css"></img></p></div>',
+        )
+
+
+class TestMinify(unittest.TestCase):
+    def test_removes_whitespace_between_block_tags(self):
+        html = "<!doctype html>\n<html>\n  <head>\n    <title>T</title>\n  </head>\n</html>\n"
+        self.assertEqual(
+            minify_html(html),
+            "<!doctype html><html><head><title>T</title></head></html>",
+        )
+
+    def test_collapses_inline_whitespace_and_removes_comments(self):
+        self.assertEqual(
+            minify_html("<p>a  <b>b</b>\n  <i>c</i> <!-- note --></p>"),
+            "<p>a <b>b</b> <i>c</i></p>",
+        )
+
+    def test_preserves_pre_and_scripts(self):
+        html = "<div>\n<pre>  a\n    b</pre>\n<script>\nlet  x;\n</script>\n</div>"
+        self.assertEqual(
+            minify_html(html),
+            "<div><pre>  a\n    b</pre><script>\nlet  x;\n</script></div>",
+        )
+
+    def test_compile_minified(self):
+        template = Template.compile(
+            "<html>\n  <pre>\n{{ Content }}  </pre>\n  <title> {{ Title }} </title>\n</html>",
+            minify=True,
+        )
+        self.assertEqual(
+            template.segments, ["<html><pre>\n", "  </pre><title>", "</title></html>"]
+        )
+        self.assertEqual(template.slots, ["Content", "Title"])
+        self.assertNotEqual(template.digest, Template.compile("<html>\n</html>").digest)
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
@@ -1,3 +1,4 @@
+import random
 import unittest
 
 from markdown_manipulation import (
@@ -59,6 +60,10 @@ class TestTextNode(unittest.TestCase):
         node = TextNode("This is a text node", TextType.LINK, "https://boot.dev")
         self.assertIsInstance(node, TextNode)
 
+    def test_no_dict(self):
+        node = TextNode("This is a text node")
+        self.assertFalse(hasattr(node, "__dict__"))
+
     def test_eq(self):
         node = TextNode("This is a text node", TextType.TEXT)
         node2 = TextNode("This is a text node", TextType.TEXT)
@@ -287,6 +292,48 @@ class TestTextNode(unittest.TestCase):
             ],
         )
 
+    def test_text_to_text_nodes_unclosed(self):
+        self.assertRaises(ValueError, markdown_to_textnodes, "**bold")
+        self.assertRaises(ValueError, markdown_to_textnodes, "_a **b** c_")
+        self.assertRaises(ValueError, markdown_to_textnodes, "`a_b_c`")
+
+    def test_text_to_text_nodes_delimiter_precedence(self):
+        self.assertListEqual(
+            markdown_to_textnodes("**a_b`c** _d`e_ `f`"),
+            [
+                TextNode("a_b`c", TextType.BOLD),
+                TextNode(" ", TextType.TEXT),
+                TextNode("d`e", TextType.ITALIC),
+                TextNode(" ", TextType.TEXT),
+                TextNode("f", TextType.CODE),
+            ],
+        )
+
+    def test_text_to_text_nodes_matches_split_pipeline(self):
+        def split_pipeline(text: str) -> list[TextNode] | str:
+            try:
+                nodes = [TextNode(text, TextType.TEXT, None)]
+                nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+                nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+                nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+                nodes = split_nodes_image(nodes)
+                return split_nodes_link(nodes)
+            except ValueError as e:
+                return str(e)
+
+        def single_pass(text: str) -> list[TextNode] | str:
+            try:
+                return markdown_to_textnodes(text)
+            except ValueError as e:
+                return str(e)
+
+        tokens = ["a", " ", "**", "*", "_", "`", "!", "[", "]", "(", ")"]
+        tokens += ["[x](u)", "![i](v)", "[y](w_z)"]
+        rng = random.Random(0)
+        for _ in range(5000):
+            text = "".join(rng.choice(tokens) for _ in range(rng.randint(0, 12)))
+            self.assertEqual(single_pass(text), split_pipeline(text), text)
+
     def test_markdown_to_blocks(self):
         md = """
 This is **bolded** paragraph
@@ -0,0 +1,163 @@
+import os
+import tempfile
+import unittest
+import urllib.request
+
+from watch import Inotify, SiteWatcher, diff_snapshots, rescan_path, serve
+
+
+def write(file_path, text):
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, "w") as f:
+        _ = f.write(text)
+
+
+def read(file_path):
+    with open(file_path) as f:
+        return f.read()
+
+
+class TestWatch(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.static = os.path.join(root, "static")
+        self.docs = os.path.join(root, "docs")
+        self.template_path = os.path.join(root, "template.html")
+        write(self.template_path, "<title>{{ Title }}</title>{{ Content }}")
+        write(os.path.join(self.content, "index.md"), "# Home\n\nhello")
+        write(os.path.join(self.content, "blog", "post.md"), "# Post\n\nbody")
+        write(os.path.join(self.static, "index.css"), "body {}")
+        self.watcher = SiteWatcher(
+            self.content, self.static, self.template_path, self.docs
+        )
+        self.assertEqual(self.watcher.build(), 0)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def touch(self, file_path, text):
+        """Writes file_path with a modification time distinct from before."""
+        write(file_path, text)
+        st = os.stat(file_path)
+        os.utime(file_path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+    def test_build(self):
+        self.assertEqual(
+            read(os.path.join(self.docs, "index.html")),
+            "<title>Home</title><div><h1>Home</h1><p>hello</p></div>",
+        )
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "index.css")))
+
+    def test_poll_without_changes(self):
+        self.assertFalse(self.watcher.poll())
+
+    def test_poll_renders_only_changed_pages(self):
+        post = os.path.join(self.docs, "blog", "post.html")
+        os.remove(post)
+        self.touch(os.path.join(self.content, "index.md"), "# Home\n\nedited")
+        self.assertTrue(self.watcher.poll())
+        self.assertIn("edited", read(os.path.join(self.docs, "index.html")))
+        self.assertFalse(os.path.exists(post))
+
+    def test_poll_dirty_paths(self):
+        source = os.path.join(self.content, "blog", "post.md")
+        self.touch(source, "# Post\n\nedited")
+        self.assertFalse(self.watcher.poll([os.path.join(self.static, "x")]))
+        self.assertTrue(self.watcher.poll([source]))
+        self.assertIn("edited", read(os.path.join(self.docs, "blog", "post.html")))
+
+    def test_poll_removed_page(self):
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        self.assertTrue(self.watcher.poll())
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "blog")))
+
+    def test_poll_template_renders_every_page(self):
+        self.touch(self.template_path, "<h1>{{ Title }}</h1>{{ Content }}")
+        self.assertTrue(self.watcher.poll())
+        self.assertTrue(
+            read(os.path.join(self.docs, "blog", "post.html")).startswith("<h1>Post")
+        )
+
+    def test_poll_static(self):
+        self.touch(os.path.join(self.static, "index.css"), "body { margin: 0 }")
+        write(os.path.join(self.static, "images", "logo.png"), "png")
+        self.assertTrue(self.watcher.poll())
+        self.assertEqual(
+            read(os.path.join(self.docs, "index.css")), "body { margin: 0 }"
+        )
+        os.remove(os.path.join(self.static, "images", "logo.png"))
+        self.assertTrue(self.watcher.poll())
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "images")))
+
+    def test_drafts_and_slugs(self):
+        draft = os.path.join(self.content, "draft.md")
+        tom = os.path.join(self.content, "blog", "tom.md")
+        write(draft, "---\ndraft: true\n---\n# Draft")
+        write(tom, "---\nslug: bombadil\n---\n# Tom")
+        self.assertTrue(self.watcher.poll())
+        bombadil = os.path.join(self.docs, "blog", "bombadil.html")
+        self.assertTrue(os.path.exists(bombadil))
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "blog", "tom.html")))
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "draft.html")))
+        self.assertEqual(self.watcher.build(), 0)
+        self.assertTrue(os.path.exists(bombadil))
+        self.touch(draft, "# Draft")
+        self.touch(tom, "---\ndraft: true\nslug: bombadil\n---\n# Tom")
+        self.assertTrue(self.watcher.poll())
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "draft.html")))
+        self.assertFalse(os.path.exists(bombadil))
+        watcher = SiteWatcher(
+            self.content, self.static, self.template_path, self.docs, drafts=True
+        )
+        self.assertEqual(watcher.build(), 0)
+        self.assertTrue(os.path.exists(bombadil))
+
+    def test_poll_keeps_watching_after_errors(self):
+        self.touch(os.path.join(self.content, "index.md"), "no title")
+        self.assertTrue(self.watcher.poll())
+        self.touch(os.path.join(self.content, "index.md"), "# Fixed\n\nok")
+        self.assertTrue(self.watcher.poll())
+        self.assertIn("Fixed", read(os.path.join(self.docs, "index.html")))
+
+    def test_rescan_and_diff_snapshots(self):
+        snapshot = dict(self.watcher.content)
+        write(os.path.join(self.content, "blog", "new.md"), "# New")
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        rescan_path(snapshot, self.content, "blog")
+        changed, removed = diff_snapshots(self.watcher.content, snapshot)
+        self.assertEqual(changed, [os.path.join("blog", "new.md")])
+        self.assertEqual(removed, [os.path.join("blog", "post.md")])
+
+    def test_inotify(self):
+        inotify = Inotify.create()
+        if inotify is None:
+            self.skipTest("inotify is not available")
+        try:
+            inotify.add_tree(self.content)
+            source = os.path.join(self.content, "blog", "post.md")
+            write(source, "# Post\n\nedited")
+            self.assertEqual(inotify.read(1.0), {source})
+            write(os.path.join(self.content, "new", "page.md"), "# New")
+            changed = inotify.read(1.0)
+            self.assertIn(os.path.join(self.content, "new"), changed)
+            self.assertTrue(self.watcher.poll(changed))
+            self.assertTrue(os.path.exists(os.path.join(self.docs, "new")))
+            self.assertEqual(inotify.read(0), set())
+        finally:
+            inotify.close()
+
+    def test_serve(self):
+        server = serve(self.docs, 0)
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/index.css"
+            with urllib.request.urlopen(url) as response:
+                self.assertEqual(response.read(), b"body {}")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    _ = unittest.main()
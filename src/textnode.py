@@ -12,6 +12,7 @@ html_node = text_node_to_html_node(text_node)
 from enum import Enum
 from typing import override
 from htmlnode import LeafNode
+from template import AssetMap, rewrite_url
 
 
 class TextType(Enum):
@@ -36,6 +37,8 @@ class TextNode:
         url: An optional string containing the URL value if it's present (e.g. "https://www.google.com.au")
     """
 
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(
         self, text: str, text_type: TextType = TextType.TEXT, url: str | None = None
     ) -> None:
@@ -67,13 +70,18 @@ class TextNode:
         return f"TextNode({self.text}, {self.text_type.value}, {self.url})"
 
 
-def text_node_to_html_node(text_node: TextNode) -> LeafNode:
+def text_node_to_html_node(
+    text_node: TextNode, base_path: str = "/", assets: AssetMap | None = None
+) -> LeafNode:
     """Converts TextNode object to LeafNode (child of HTMLNode) object
 
     Depending on the set TextType, it constructs a LeafNode instance with the applicable tag value.
 
     Args:
         text_node: TextNode instance.
+        base_path: Path prefix for root-relative link and image URLs.
+        assets: Optional AssetMap of fingerprinted static files, whose URLs
+                replace those of the files in links and images.
 
     Returns:
         LeafNode instance, setting the tag value according to the TextNode's TextType value.
@@ -94,13 +102,16 @@ def text_node_to_html_node(text_node: TextNode) -> LeafNode:
             return LeafNode(
                 tag="a",
                 value=text_node.text,
-                props={"href": str(text_node.url)},
+                props={"href": rewrite_url(str(text_node.url), base_path, assets)},
             )
         case TextType.IMAGE:
             return LeafNode(
                 tag="img",
                 value="",
-                props={"src": str(text_node.url), "alt": text_node.text},
+                props={
+                    "src": rewrite_url(str(text_node.url), base_path, assets),
+                    "alt": text_node.text,
+                },
             )
         case _:
             raise ValueError("Unhandled TextType")
@@ -0,0 +1,501 @@
+"""Module for rebuilding the site as it is edited, and serving it.
+
+SiteWatcher keeps the compiled template and the size and modification time
+of every input in memory, and only re-renders the pages whose Markdown
+changed. Every page is re-rendered when the template changes, and changed
+static files are synced into docs/. Front matter is applied as in a full
+build: drafts are left out, unless drafts is set, and slugged pages are
+generated under their slug. The output directory is served over HTTP
+from the same process.
+
+On Linux, inotify reports which paths changed, so an edit costs a stat of
+those paths plus the render. Elsewhere the inputs are rescanned every
+interval, which costs a stat of every file.
+
+Typical usage example:
+
+./watch.sh
+python3 src/watch.py --port 8888 --interval 0.1
+"""
+
+from argparse import ArgumentParser
+from collections.abc import Iterable
+import ctypes
+import ctypes.util
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+import os
+from os import fsdecode, path, remove, stat
+from select import select
+import struct
+from threading import Thread
+from time import perf_counter, sleep
+
+from file_manipulation import (
+    remove_empty_dirs,
+    scan_tree,
+    sync_directory,
+    sync_file,
+)
+from build_plan import BuildPlan, PlannedPage
+from fragment_cache import FragmentCache
+from generate_files import generate_page
+from highlight import HighlightCache
+from metadata_index import METADATA_INDEX_PATH, MetadataIndex
+from template import Template
+
+# Size and modification time of a file, keyed by its path relative to a root
+Snapshot = dict[str, tuple[int, int]]
+
+
+def snapshot_tree(root: str) -> Snapshot:
+    """Returns the size and modification time of every file under root."""
+    if not path.isdir(root):
+        return {}
+    files, _ = scan_tree(root)
+    return {name: (st.st_size, st.st_mtime_ns) for name, st in files.items()}
+
+
+def snapshot_file(file_path: str) -> tuple[int, int] | None:
+    """Returns the size and modification time of file_path, or None."""
+    try:
+        st = stat(file_path)
+    except FileNotFoundError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def rescan_path(snapshot: Snapshot, root: str, name: str) -> None:
+    """Updates the entries of snapshot at or under the relative path name.
+
+    Args:
+        snapshot: Snapshot of root to update in place.
+        root: Directory path the snapshot was taken of.
+        name: Path relative to root of a file or directory that changed,
+              or "." for all of root.
+    """
+    if name == ".":
+        snapshot.clear()
+        snapshot.update(snapshot_tree(root))
+        return
+    prefix = name + path.sep
+    for stale in [n for n in snapshot if n == name or n.startswith(prefix)]:
+        del snapshot[stale]
+    full_path = path.join(root, name)
+    if path.isdir(full_path):
+        for child, child_stat in snapshot_tree(full_path).items():
+            snapshot[path.join(name, child)] = child_stat
+    elif (file_stat := snapshot_file(full_path)) is not None:
+        snapshot[name] = file_stat
+
+
+def diff_snapshots(old: Snapshot, new: Snapshot) -> tuple[list[str], list[str]]:
+    """Compares two snapshots of the same tree.
+
+    Returns:
+        Sorted lists of the paths added or modified, and of the paths removed.
+    """
+    changed = sorted(name for name, st in new.items() if old.get(name) != st)
+    removed = sorted(name for name in old if name not in new)
+    return changed, removed
+
+
+class SiteWatcher:
+    """Rebuilds the pages and static files affected by each edit.
+
+    Attributes:
+        content_dir: Directory path to get the Markdown files from.
+        static_dir: Directory path to get the static files from.
+        template_path: File path to get the HTML template text from.
+        dest_dir: Directory path to write the site to.
+        base_path: Path prefix for root-relative links.
+        drafts: Whether to generate draft pages too.
+        template: Template compiled from template_path.
+        content: Snapshot of content_dir as of the last rebuild.
+        static: Snapshot of static_dir as of the last rebuild.
+        template_stat: Size and modification time of the template.
+        cache: FragmentCache of rendered blocks, kept across rebuilds so an
+               edit only re-parses the blocks that changed.
+        highlight_cache: HighlightCache of highlighted code, kept across
+                         rebuilds.
+        metadata: MetadataIndex of the content, kept in memory, so only the
+                  front matter of changed pages is read again.
+        dests: Dictionary of the relative path of each published content
+               file to the output path of its page.
+    """
+
+    def __init__(
+        self,
+        content_dir: str,
+        static_dir: str,
+        template_path: str,
+        dest_dir: str,
+        base_path: str = "/",
+        drafts: bool = False,
+    ) -> None:
+        self.content_dir: str = content_dir
+        self.static_dir: str = static_dir
+        self.template_path: str = template_path
+        self.dest_dir: str = dest_dir
+        self.base_path: str = base_path
+        self.drafts: bool = drafts
+        self.template: Template = Template.load(template_path, base_path)
+        self.content: Snapshot = {}
+        self.static: Snapshot = {}
+        self.template_stat: tuple[int, int] | None = snapshot_file(template_path)
+        self.cache: FragmentCache = FragmentCache()
+        self.highlight_cache: HighlightCache = HighlightCache()
+        self.metadata: MetadataIndex = MetadataIndex(METADATA_INDEX_PATH)
+        self.dests: dict[str, str] = {}
+
+    def page_path(self, name: str) -> str:
+        """Returns the output path of the content file at relative path name,
+        unless its front matter has a slug, see publish()."""
+        return path.join(self.dest_dir, name.rsplit(".", 1)[0] + ".html")
+
+    def publish(self) -> tuple[dict[str, str], int]:
+        """Works out the pages to generate from the content snapshot.
+
+        The snapshot is turned into a BuildPlan without scanning content_dir
+        again, and published through the MetadataIndex as in a full build.
+
+        Returns:
+            Tuple of the output path of each published page, keyed by its
+            relative path, and the number of pages whose front matter
+            couldn't be read, which are left out.
+        """
+        pages: list[PlannedPage] = []
+        dest_dirs: dict[str, None] = {self.dest_dir: None}
+        failed: int = 0
+        for name, (size, mtime_ns) in sorted(self.content.items()):
+            page = PlannedPage(
+                path.join(self.content_dir, name),
+                self.page_path(name),
+                size,
+                mtime_ns,
+                (self.template_path,),
+            )
+            try:
+                _ = self.metadata.index(page)
+            except (OSError, ValueError) as e:
+                print(f"Error: {e}")
+                failed += 1
+                continue
+            pages.append(page)
+            dest_dirs[path.dirname(page.dest)] = None
+        plan = BuildPlan(tuple(pages), tuple(dest_dirs))
+        self.metadata.update(plan)
+        try:
+            plan = self.metadata.publish(plan, self.drafts)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return dict(self.dests), failed + 1
+        root = path.join(self.content_dir, "")
+        dests = {page.source.removeprefix(root): page.dest for page in plan.pages}
+        return dests, failed
+
+    def build(self) -> int:
+        """Syncs the static files and renders every published page.
+
+        Returns:
+            Number of pages that failed to render.
+        """
+        self.content = snapshot_tree(self.content_dir)
+        self.static = snapshot_tree(self.static_dir)
+        self.dests, failed = self.publish()
+        _ = sync_directory(self.static_dir, self.dest_dir, set(self.dests.values()))
+        return failed + self._render(sorted(self.dests))
+
+    def poll(self, dirty: Iterable[str] | None = None) -> bool:
+        """Rebuilds whatever changed since the last build or poll.
+
+        Args:
+            dirty: Paths known to have changed, such as from Inotify.read(),
+                   so that only they are rescanned. If None, content_dir and
+                   static_dir are rescanned in full.
+
+        Returns:
+            True if anything was rebuilt.
+        """
+        start = perf_counter()
+        if dirty is None:
+            content = snapshot_tree(self.content_dir)
+            static = snapshot_tree(self.static_dir)
+        else:
+            content, static = dict(self.content), dict(self.static)
+            for dirty_path in dirty:
+                for root, snapshot in (
+                    (self.content_dir, content),
+                    (self.static_dir, static),
+                ):
+                    name = path.relpath(dirty_path, root)
+                    if name != ".." and not name.startswith(".." + path.sep):
+                        rescan_path(snapshot, root, name)
+        template_stat = snapshot_file(self.template_path)
+        changed, removed = diff_snapshots(self.content, content)
+        static_changed, static_removed = diff_snapshots(self.static, static)
+        template_changed = template_stat != self.template_stat
+        if not (
+            changed or removed or static_changed or static_removed or template_changed
+        ):
+            return False
+        self.content, self.static = content, static
+        self.template_stat = template_stat
+
+        dests = self.dests
+        self.dests, failed = self.publish()
+        if template_changed:
+            try:
+                self.template = Template.load(self.template_path, self.base_path)
+                changed = sorted(content)
+                print(f"Template {self.template_path} changed, rendering every page")
+            except FileNotFoundError as e:
+                print(f"Error: {e}")
+        outputs = set(self.dests.values())
+        for name, dest_path in dests.items():
+            if dest_path in outputs:
+                continue
+            if name in removed:
+                print(f"Removing {dest_path}, its source no longer exists")
+            else:
+                print(f"Removing {dest_path}, its page is no longer generated there")
+            if path.exists(dest_path):
+                remove(dest_path)
+            remove_empty_dirs(path.dirname(dest_path), self.dest_dir)
+        # Drafts and pages whose front matter moved them are left out or added
+        changed = sorted(
+            {name for name in changed if name in self.dests}
+            | {name for name, dest in self.dests.items() if dests.get(name) != dest}
+        )
+        for name in static_changed:
+            source_path = path.join(self.static_dir, name)
+            dest_path = path.join(self.dest_dir, name)
+            try:
+                if sync_file(source_path, dest_path):
+                    print(f"Copying {source_path} to {dest_path}")
+            except OSError as e:
+                print(f"Error: {source_path}: {e}")
+        for name in static_removed:
+            dest_path = path.join(self.dest_dir, name)
+            if path.isdir(dest_path):
+                continue
+            print(f"Removing {dest_path}, it is no longer in {self.static_dir}")
+            if path.exists(dest_path):
+                remove(dest_path)
+            remove_empty_dirs(path.dirname(dest_path), self.dest_dir)
+        render_failed = self._render(changed)
+        failed += render_failed
+        elapsed = (perf_counter() - start) * 1000
+        print(
+            f"Rebuilt {len(changed) - render_failed} page(s) in {elapsed:.1f} ms"
+            + (f", {failed} failed" if failed else "")
+        )
+        return True
+
+    def watch(self, interval: float = 0.1) -> None:
+        """Rebuilds on every change until interrupted.
+
+        Waits on inotify events where available, otherwise rescans every
+        interval seconds.
+        """
+        inotify = Inotify.create()
+        if inotify is None:
+            print(f"Checking for changes every {interval} s")
+            while True:
+                _ = self.poll()
+                sleep(interval)
+        print("Watching for changes with inotify")
+        inotify.add_tree(self.content_dir)
+        inotify.add_tree(self.static_dir)
+        inotify.add_watch(path.dirname(self.template_path) or ".", recursive=False)
+        while True:
+            _ = self.poll(inotify.read())
+
+    def _render(self, names: list[str]) -> int:
+        """Renders the given content files, returning how many failed.
+
+        Errors are printed rather than raised, so that a typo in one page
+        doesn't stop the watcher.
+        """
+        failed: int = 0
+        for name in names:
+            source_path = path.join(self.content_dir, name)
+            try:
+                generate_page(
+                    source_path,
+                    self.template_path,
+                    self.dests[name],
+                    self.base_path,
+                    self.template,
+                    cache=self.cache,
+                    highlight_cache=self.highlight_cache,
+                )
+            except (OSError, ValueError, IndexError) as e:
+                print(f"Error: {source_path}: {e}")
+                failed += 1
+        return failed
+
+
+class Inotify:
+    """Minimal binding to the Linux inotify API, for watching directories.
+
+    Attributes:
+        fd: File descriptor of the inotify instance.
+        watches: Dictionary of watch descriptor to (directory path, whether
+                 its new subdirectories are watched too).
+    """
+
+    IN_ATTRIB = 0x4
+    IN_CLOSE_WRITE = 0x8
+    IN_MOVED_FROM = 0x40
+    IN_MOVED_TO = 0x80
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_Q_OVERFLOW = 0x4000
+    IN_IGNORED = 0x8000
+    IN_ISDIR = 0x40000000
+    IN_CLOEXEC = 0o2000000
+    MASK = IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+    MASK |= IN_CREATE | IN_DELETE
+    EVENT = struct.Struct("iIII")
+
+    def __init__(self, libc: ctypes.CDLL, fd: int) -> None:
+        self._libc: ctypes.CDLL = libc
+        self.fd: int = fd
+        self.watches: dict[int, tuple[str, bool]] = {}
+
+    @classmethod
+    def create(cls) -> "Inotify | None":
+        """Returns a new Inotify, or None where inotify isn't available."""
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            fd: int = libc.inotify_init1(cls.IN_CLOEXEC)
+        except (AttributeError, OSError):
+            return None
+        if fd < 0:
+            return None
+        return cls(libc, fd)
+
+    def add_watch(self, directory: str, recursive: bool = True) -> None:
+        """Watches directory for changes to the entries in it.
+
+        Raises:
+            OSError: If the watch can't be added, e.g. when the limit in
+                     /proc/sys/fs/inotify/max_user_watches is reached.
+        """
+        wd: int = self._libc.inotify_add_watch(
+            self.fd, os.fsencode(directory), self.MASK
+        )
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"Cannot watch {directory}: {os.strerror(errno)}")
+        self.watches[wd] = (directory, recursive)
+
+    def add_tree(self, root: str) -> None:
+        """Watches root and every directory under it."""
+        if not path.isdir(root):
+            return
+        self.add_watch(root)
+        _, dirs = scan_tree(root)
+        for directory in dirs:
+            self.add_watch(path.join(root, directory))
+
+    def read(self, timeout: float | None = None) -> set[str] | None:
+        """Waits for events and returns the paths they happened to.
+
+        New directories under a recursive watch are watched as they appear.
+
+        Args:
+            timeout: Seconds to wait for events, or None to wait forever.
+
+        Returns:
+            Set of changed paths, empty if the timeout passed, or None if
+            the kernel dropped events and everything should be rescanned.
+        """
+        ready, _, _ = select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        data = os.read(self.fd, 1 << 16)
+        changed: set[str] | None = set()
+        offset: int = 0
+        while offset < len(data):
+            wd, mask, _, length = self.EVENT.unpack_from(data, offset)
+            offset += self.EVENT.size
+            name = fsdecode(data[offset : offset + length].rstrip(b"\0"))
+            offset += length
+            if mask & self.IN_Q_OVERFLOW:
+                changed = None
+                continue
+            if mask & self.IN_IGNORED:
+                _ = self.watches.pop(wd, None)
+                continue
+            if wd not in self.watches:
+                continue
+            directory, recursive = self.watches[wd]
+            if mask & self.IN_CREATE and not mask & self.IN_ISDIR:
+                continue  # Wait for the file to be written and closed
+            event_path = path.join(directory, name)
+            if mask & self.IN_ISDIR and mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                if recursive:
+                    self.add_tree(event_path)
+            if changed is not None:
+                changed.add(event_path)
+        return changed
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def serve(directory: str, port: int) -> ThreadingHTTPServer:
+    """Serves directory over HTTP from a background thread.
+
+    Args:
+        directory: Directory path to serve files from.
+        port: Port to listen on, or 0 for any free port.
+
+    Returns:
+        The running server, whose server_address holds the bound port.
+    """
+    handler = partial(SimpleHTTPRequestHandler, directory=directory)
+    server = ThreadingHTTPServer(("", port), handler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Rebuild the site on every edit and serve it.")
+    _ = parser.add_argument(
+        "base_path",
+        nargs="?",
+        default="/",
+        help='path prefix for root-relative links (default: "/")',
+    )
+    _ = parser.add_argument("--port", type=int, default=8888)
+    _ = parser.add_argument(
+        "--drafts",
+        action="store_true",
+        help="also generate pages marked as drafts in their front matter",
+    )
+    _ = parser.add_argument(
+        "--interval",
+        type=float,
+        default=0.1,
+        help="seconds between checks for changes (default: 0.1)",
+    )
+    args = parser.parse_args()
+
+    base_path: str = args.base_path if args.base_path != "" else "/"
+    watcher = SiteWatcher(
+        "content", "static", "template.html", "docs", base_path, args.drafts
+    )
+    _ = watcher.build()
+    server = serve("docs", args.port)
+    print(f"Serving docs/ on http://localhost:{server.server_address[1]}/")
+    try:
+        watcher.watch(args.interval)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()